@@ -2,6 +2,7 @@
 # @Average Reward: -0.1 In 10 matches, you Win 2, Tie 5 and Lose 3, scored 6 goals, and conceded 7 goals.
 # @Model: Deepseek v3
 # @Description: 使用Coder-Planner-Summarizer迭代多次
+import functools
 import gfootball.env as football_env
 import logging
 import os
@@ -56,13 +57,21 @@ class PlayerObservationWrapper:
         self.steps_left = observation['steps_left']
         self.sticky_actions = observation['sticky_actions']
 
-        # Precomputed distances
-        self.distance_to_ball = self.compute_distance(self.player_position, self.ball_position)
-        self.distances_to_teammates = [
+    # Distances are computed on first access only
+    @functools.cached_property
+    def distance_to_ball(self):
+        return self.compute_distance(self.player_position, self.ball_position)
+
+    @functools.cached_property
+    def distances_to_teammates(self):
+        return [
             self.compute_distance(self.player_position, teammate_pos)
             for i, teammate_pos in enumerate(self.left_team_positions) if i != self.active_player
         ]
-        self.distances_to_opponents = [
+
+    @functools.cached_property
+    def distances_to_opponents(self):
+        return [
             self.compute_distance(self.player_position, opponent_pos)
             for opponent_pos in self.right_team_positions
         ]
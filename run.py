@@ -11,13 +11,15 @@ import os
 # 添加src目录到Python路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from src.main import main
+# src.main 在解析完参数后才导入，--help 和参数错误不需要加载决策包
 
 
 def parse_args():
     """解析命令行参数"""
     parser = argparse.ArgumentParser(description='Google Research Football 决策树智能体')
 
+    parser.add_argument('--env', type=str, default='gfootball', choices=['gfootball', 'stand_in'],
+                       help='比赛环境: gfootball 为真实引擎, stand_in 为轻量级替身环境 (默认: gfootball)')
     parser.add_argument('--render', action='store_true', default=True,
                        help='启用渲染 (默认: True)')
     parser.add_argument('--write_video', action='store_true', default=False,
@@ -28,6 +30,16 @@ def parse_args():
                        help='比赛局数 (默认: 1)')
     parser.add_argument('--max_steps', type=int, default=3000,
                        help='每局最大步数 (默认: 3000)')
+    parser.add_argument('--evaluate', action='store_true', default=False,
+                       help='多进程并行评估模式，汇总胜平负统计 (默认: False)')
+    parser.add_argument('--num_workers', type=int, default=None,
+                       help='并行评估的工作进程数 (默认: CPU核心数)')
+    parser.add_argument('--num_envs', type=int, default=1,
+                       help='评估时同步推进的环境数，大于1时每步对所有比赛批量决策 (默认: 1)')
+    parser.add_argument('--trace_dir', type=str, default=None,
+                       help='把每局比赛的观测、动作、奖励和决策分支保存为 trace 文件的目录 (默认: 不保存)')
+    parser.add_argument('--startup_report', action='store_true', default=False,
+                       help='只启动到第一次决策，打印导入/创建环境/第一次决策的耗时分解 (默认: False)')
     
     return parser.parse_args()
 
@@ -47,13 +59,26 @@ if __name__ == "__main__":
     
     # 打印配置信息
     print("环境配置:")
+    print(f"  比赛环境: {args.env}")
     print(f"  渲染模式: {'启用' if args.render else '禁用'}")
     print(f"  视频录制: {'启用' if args.write_video else '禁用'}")
     print(f"  日志目录: {args.logdir if args.logdir else '无'}")
     print(f"运行配置:")
     print(f"  比赛局数: {args.num_episodes}")
     print(f"  最大步数: {args.max_steps}")
+    if args.trace_dir:
+        print(f"  比赛轨迹: {args.trace_dir}")
+    if args.evaluate:
+        print(f"  并行评估: 启用 ({args.num_workers or os.cpu_count()} 个工作进程)")
+        if args.num_envs > 1:
+            print(f"  同步环境: {args.num_envs}")
     print("=" * 60)
     
+    if args.startup_report:
+        from src.tools.startup import run_startup_report
+        run_startup_report(args)
+        sys.exit(0)
+    
     # 运行主程序
+    from src.main import main
     main(args)
\ No newline at end of file
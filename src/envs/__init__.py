@@ -0,0 +1,6 @@
+"""
+Environments Package
+环境包
+"""
+
+from src.envs.stand_in_env import StandInFootballEnv
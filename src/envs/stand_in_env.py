@@ -0,0 +1,512 @@
+"""
+轻量级替身环境 - 纯 Python/NumPy 实现的简化比赛模拟器
+
+输出与 env_info/data_format.md 一致的 raw 观测（每名受控球员一个观测字典），
+接受 FootballAgent.get_actions 返回的 11 个动作。
+只模拟简单的运动学、控球权转换和定位球流程，用于在没有真实引擎的机器上
+测量和回归测试智能体的决策吞吐量，比赛结果不代表真实引擎下的表现。
+"""
+
+import numpy as np
+
+from src.gfootball_agent.config import Action, Field, GameMode, StickyActions
+
+# 默认阵型（左队视角，与 data_format.md 示例中的开球站位一致）
+FORMATION = np.array([
+    [-1.011, 0.0],
+    [0.0, 0.019],
+    [-0.002, -0.020],
+    [-0.428, -0.199],
+    [-0.506, -0.065],
+    [-0.506, 0.065],
+    [-0.426, 0.199],
+    [-0.186, -0.107],
+    [-0.271, 0.0],
+    [-0.186, 0.107],
+    [-0.010, -0.220],
+])
+ROLES = np.array([0, 7, 9, 2, 1, 1, 3, 5, 5, 5, 6])
+
+# 非开球时的常规站位（在己方半场内展开）
+BASE_POSITIONS = np.array([
+    [-0.95, 0.0],
+    [-0.05, 0.25],
+    [0.05, 0.0],
+    [-0.55, -0.25],
+    [-0.6, -0.08],
+    [-0.6, 0.08],
+    [-0.55, 0.25],
+    [-0.3, -0.12],
+    [-0.35, 0.0],
+    [-0.3, 0.12],
+    [-0.05, -0.25],
+])
+
+# 移动动作对应的方向向量（y 轴向下为正）
+MOVEMENT_DIRECTIONS = {
+    Action.LEFT: (-1.0, 0.0),
+    Action.TOP_LEFT: (-1.0, -1.0),
+    Action.TOP: (0.0, -1.0),
+    Action.TOP_RIGHT: (1.0, -1.0),
+    Action.RIGHT: (1.0, 0.0),
+    Action.BOTTOM_RIGHT: (1.0, 1.0),
+    Action.BOTTOM: (0.0, 1.0),
+    Action.BOTTOM_LEFT: (-1.0, 1.0),
+}
+MOVEMENT_TO_STICKY = {
+    Action.LEFT: StickyActions.LEFT,
+    Action.TOP_LEFT: StickyActions.TOP_LEFT,
+    Action.TOP: StickyActions.TOP,
+    Action.TOP_RIGHT: StickyActions.TOP_RIGHT,
+    Action.RIGHT: StickyActions.RIGHT,
+    Action.BOTTOM_RIGHT: StickyActions.BOTTOM_RIGHT,
+    Action.BOTTOM: StickyActions.BOTTOM,
+    Action.BOTTOM_LEFT: StickyActions.BOTTOM_LEFT,
+}
+# 粘性动作索引 -> 单位方向向量
+STICKY_DIRECTIONS = np.zeros((len(StickyActions.MOVEMENT_ACTIONS), 2))
+for _action, _sticky in MOVEMENT_TO_STICKY.items():
+    _vector = np.array(MOVEMENT_DIRECTIONS[_action])
+    STICKY_DIRECTIONS[_sticky] = _vector / np.linalg.norm(_vector)
+
+# 运动学参数（每步位移）
+PLAYER_SPEED = 0.008
+SPRINT_SPEED = 0.012
+DRIBBLE_SPEED = 0.006
+OPPONENT_SPEED = 0.007
+BALL_FRICTION = 0.96
+BALL_STOP_SPEED = 0.001
+
+# 传球/射门速度
+PASS_SPEEDS = {
+    Action.SHORT_PASS: 0.03,
+    Action.LONG_PASS: 0.045,
+    Action.HIGH_PASS: 0.045,
+}
+SHOT_SPEED = 0.06
+
+# 控球和抢断
+CONTROL_DISTANCE = 0.015
+TACKLE_DISTANCE = 0.015
+TACKLE_PROBABILITY = 0.08
+SLIDING_DISTANCE = 0.03
+SLIDING_SUCCESS_PROBABILITY = 0.5
+SLIDING_FOUL_PROBABILITY = 0.2
+KICK_COOLDOWN_STEPS = 4
+
+# 定位球最长持续步数，超时后自动恢复常规模式
+SET_PIECE_TIMEOUT = 20
+OPPONENT_SET_PIECE_DELAY = 5
+
+NUM_PLAYERS = 11
+STICKY_SIZE = 10
+
+
+class StandInFootballEnv:
+    """
+    替身足球环境
+
+    接口与 gfootball 环境一致：reset() 返回 11 个观测字典的列表，
+    step(actions) 返回 (observations, reward, done, info)。
+    左队 11 名球员由智能体控制，右队由内置的简单规则控制。
+    """
+
+    def __init__(self, episode_length=3000, seed=None):
+        """
+        参数:
+            episode_length: 每局总步数
+            seed: 随机种子
+        """
+        self.episode_length = episode_length
+        self.rng = np.random.default_rng(seed)
+        self._reset_state()
+
+    def _reset_state(self):
+        """初始化比赛状态"""
+        self.left_team = FORMATION.copy()
+        self.right_team = -FORMATION.copy()
+        self.left_direction = np.zeros((NUM_PLAYERS, 2))
+        self.right_direction = np.zeros((NUM_PLAYERS, 2))
+        self.left_tired = np.zeros(NUM_PLAYERS)
+        self.right_tired = np.zeros(NUM_PLAYERS)
+        self.sticky_actions = np.zeros((NUM_PLAYERS, STICKY_SIZE), dtype=np.uint8)
+
+        self.ball = np.array([0.0, 0.0, 0.11])
+        self.ball_direction = np.zeros(3)
+        self.ball_owned_team = -1
+        self.ball_owned_player = -1
+        self.last_touch_team = -1
+        self.kick_cooldown = np.zeros((2, NUM_PLAYERS), dtype=int)
+
+        self.game_mode = GameMode.NORMAL
+        self.set_piece_steps = 0
+        self.score = [0, 0]
+        self.steps_left = self.episode_length
+
+    def reset(self):
+        """开始新的一局，返回初始观测"""
+        self._reset_state()
+        self._restart(GameMode.KICK_OFF, team=0, position=(0.0, 0.0))
+        return self._observations()
+
+    def step(self, actions):
+        """
+        推进一步
+
+        参数:
+            actions: 左队 11 名球员的动作列表
+
+        返回:
+            (observations, reward, done, info)
+        """
+        self._apply_left_actions(actions)
+        self._apply_right_policy()
+        self._move_players()
+        self._move_ball()
+        self._update_possession()
+        score_reward = self._check_ball_out()
+        self._update_set_piece()
+
+        self.kick_cooldown = np.maximum(self.kick_cooldown - 1, 0)
+        self.steps_left -= 1
+        done = self.steps_left <= 0
+
+        reward = np.full(NUM_PLAYERS, score_reward, dtype=np.float32)
+        return self._observations(), reward, done, {'score_reward': score_reward}
+
+    def close(self):
+        """与 gfootball 环境接口保持一致"""
+
+    # ===================== 动作处理 =====================
+
+    def _apply_left_actions(self, actions):
+        """将左队动作应用到粘性状态和球上"""
+        for player_index in range(NUM_PLAYERS):
+            action = actions[player_index] if player_index < len(actions) else Action.IDLE
+            sticky = self.sticky_actions[player_index]
+
+            if action in MOVEMENT_TO_STICKY:
+                sticky[:len(StickyActions.MOVEMENT_ACTIONS)] = 0
+                sticky[MOVEMENT_TO_STICKY[action]] = 1
+            elif action == Action.RELEASE_DIRECTION:
+                sticky[:len(StickyActions.MOVEMENT_ACTIONS)] = 0
+            elif action == Action.SPRINT:
+                sticky[StickyActions.SPRINT] = 1
+            elif action == Action.RELEASE_SPRINT:
+                sticky[StickyActions.SPRINT] = 0
+            elif action == Action.DRIBBLE:
+                sticky[StickyActions.DRIBBLE] = 1
+            elif action == Action.RELEASE_DRIBBLE:
+                sticky[StickyActions.DRIBBLE] = 0
+            elif action in PASS_SPEEDS or action == Action.SHOT:
+                if self._owns_ball(0, player_index):
+                    self._kick(0, player_index, action)
+            elif action == Action.SLIDING:
+                self._sliding(player_index)
+
+    def _owns_ball(self, team, player_index):
+        return self.ball_owned_team == team and self.ball_owned_player == player_index
+
+    def _facing(self, team, player_index):
+        """球员当前朝向（单位向量），静止时朝向对方球门"""
+        direction = self.left_direction[player_index] if team == 0 else self.right_direction[player_index]
+        norm = np.hypot(*direction)
+        if norm < 1e-9:
+            return np.array([1.0, 0.0]) if team == 0 else np.array([-1.0, 0.0])
+        return direction / norm
+
+    def _kick(self, team, player_index, action):
+        """传球或射门：球脱离控制并获得初速度"""
+        players = self.left_team if team == 0 else self.right_team
+        origin = players[player_index]
+        attack_sign = 1.0 if team == 0 else -1.0
+
+        if action == Action.SHOT:
+            target = np.array([attack_sign * Field.RIGHT_GOAL_X, self.rng.uniform(-0.06, 0.06)])
+            speed = SHOT_SPEED
+        else:
+            target = self._pass_target(team, player_index, action)
+            speed = PASS_SPEEDS[action]
+
+        offset = target - origin
+        distance = np.hypot(*offset)
+        direction = offset / distance if distance > 1e-9 else self._facing(team, player_index)
+
+        self.ball[:2] = origin
+        self.ball[2] = 0.3 if action == Action.HIGH_PASS else 0.11
+        self.ball_direction[:2] = direction * speed
+        self.ball_direction[2] = 0.0
+        self.ball_owned_team = -1
+        self.ball_owned_player = -1
+        self.last_touch_team = team
+        self.kick_cooldown[team, player_index] = KICK_COOLDOWN_STEPS
+
+        # 定位球在主罚球员出球后结束
+        if self.game_mode != GameMode.NORMAL:
+            self.game_mode = GameMode.NORMAL
+
+    def _pass_target(self, team, player_index, action):
+        """在球员朝向 60° 范围内选择接球队友：短传取最近，长传/高球取最远"""
+        players = self.left_team if team == 0 else self.right_team
+        origin = players[player_index]
+        offsets = players - origin
+        distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        facing = self._facing(team, player_index)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            alignment = (offsets @ facing) / distances
+        candidates = (alignment > 0.5) & (distances > 1e-9)
+        candidates[player_index] = False
+        if not candidates.any():
+            candidates = distances > 1e-9
+            candidates[player_index] = False
+
+        if action == Action.SHORT_PASS:
+            masked = np.where(candidates, distances, np.inf)
+            return players[int(masked.argmin())]
+        masked = np.where(candidates & (distances < 0.6), distances, -np.inf)
+        if np.isinf(masked.max()):
+            masked = np.where(candidates, distances, np.inf)
+            return players[int(masked.argmin())]
+        return players[int(masked.argmax())]
+
+    def _sliding(self, player_index):
+        """左队铲球：靠近持球对手时有概率断球，也可能犯规"""
+        if self.ball_owned_team != 1:
+            return
+        distance = np.hypot(*(self.left_team[player_index] - self.ball[:2]))
+        if distance > SLIDING_DISTANCE:
+            return
+        roll = self.rng.random()
+        if roll < SLIDING_FOUL_PROBABILITY:
+            self._restart(GameMode.FREE_KICK, team=1, position=self.ball[:2].copy())
+        elif roll < SLIDING_FOUL_PROBABILITY + SLIDING_SUCCESS_PROBABILITY:
+            self._take_possession(0, player_index)
+
+    # ===================== 右队规则 =====================
+
+    def _apply_right_policy(self):
+        """右队的简单规则：最近的球员追球，持球者带球冲向左侧球门，其余回到阵型位置"""
+        ball_xy = self.ball[:2]
+        speed = np.full(NUM_PLAYERS, OPPONENT_SPEED)
+
+        # 阵型位置随球的横向位置整体平移
+        shift = np.array([np.clip(ball_xy[0], -0.5, 0.5) * 0.5, 0.0])
+        targets = -BASE_POSITIONS + shift
+        targets[0] = -FORMATION[0]
+
+        if self.ball_owned_team == 1:
+            owner = self.ball_owned_player
+            owner_position = self.right_team[owner]
+            if self.game_mode != GameMode.NORMAL:
+                # 定位球：稍作停顿后传给最近的队友
+                targets[owner] = owner_position
+                if self.set_piece_steps >= OPPONENT_SET_PIECE_DELAY:
+                    self._kick(1, owner, Action.SHORT_PASS)
+            elif owner_position[0] < -0.7 and abs(owner_position[1]) < 0.25:
+                self._kick(1, owner, Action.SHOT)
+            else:
+                pressure = np.hypot(*(self.left_team - owner_position).T).min()
+                if pressure < 0.03 and self.rng.random() < 0.2:
+                    self._kick(1, owner, Action.SHORT_PASS)
+                else:
+                    targets[owner] = [Field.LEFT_GOAL_X, owner_position[1] * 0.8]
+        else:
+            chaser = int(np.hypot(*(self.right_team - ball_xy).T).argmin())
+            targets[chaser] = ball_xy
+
+        offsets = targets - self.right_team
+        distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        steps = np.minimum(distances, speed)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            unit = np.where(distances[:, None] > 1e-9, offsets / distances[:, None], 0.0)
+        self.right_direction = unit * steps[:, None]
+
+    def _try_tackle(self, attacker_team, player_index):
+        """普通抢断：贴近持球者时以固定概率抢下球权"""
+        players = self.left_team if attacker_team == 0 else self.right_team
+        if np.hypot(*(players[player_index] - self.ball[:2])) < TACKLE_DISTANCE:
+            if self.rng.random() < TACKLE_PROBABILITY:
+                self._take_possession(attacker_team, player_index)
+
+    # ===================== 运动学 =====================
+
+    def _move_players(self):
+        """按粘性方向移动左队球员，按规则方向移动右队球员"""
+        movement = self.sticky_actions[:, :len(StickyActions.MOVEMENT_ACTIONS)].astype(float)
+        direction = movement @ STICKY_DIRECTIONS
+        sprint = self.sticky_actions[:, StickyActions.SPRINT].astype(bool)
+        speed = np.where(sprint, SPRINT_SPEED, PLAYER_SPEED)
+        if self.ball_owned_team == 0:
+            owner = self.ball_owned_player
+            if self.sticky_actions[owner, StickyActions.DRIBBLE]:
+                speed[owner] = DRIBBLE_SPEED
+        self.left_direction = direction * speed[:, None]
+
+        # 定位球期间主罚球员原地不动
+        if self.game_mode != GameMode.NORMAL:
+            if self.ball_owned_team == 0:
+                self.left_direction[self.ball_owned_player] = 0.0
+            elif self.ball_owned_team == 1:
+                self.right_direction[self.ball_owned_player] = 0.0
+
+        self.left_team = self._clip_to_pitch(self.left_team + self.left_direction)
+        self.right_team = self._clip_to_pitch(self.right_team + self.right_direction)
+
+        # 冲刺增加疲劳，其余时间缓慢恢复
+        self.left_tired = np.clip(self.left_tired + np.where(sprint, 0.0005, -0.0002), 0.0, 1.0)
+
+    @staticmethod
+    def _clip_to_pitch(positions):
+        positions[:, 0] = np.clip(positions[:, 0], -1.1, 1.1)
+        positions[:, 1] = np.clip(positions[:, 1], -0.46, 0.46)
+        return positions
+
+    def _move_ball(self):
+        """持球时球跟随持球者，无人控球时按速度滚动并逐步减速"""
+        if self.ball_owned_team != -1:
+            players = self.left_team if self.ball_owned_team == 0 else self.right_team
+            self.ball[:2] = players[self.ball_owned_player]
+            self.ball[2] = 0.11
+            directions = self.left_direction if self.ball_owned_team == 0 else self.right_direction
+            self.ball_direction[:2] = directions[self.ball_owned_player]
+            return
+
+        self.ball[:2] += self.ball_direction[:2]
+        self.ball_direction[:2] *= BALL_FRICTION
+        if np.hypot(*self.ball_direction[:2]) < BALL_STOP_SPEED:
+            self.ball_direction[:2] = 0.0
+        self.ball[2] = max(0.11, self.ball[2] * 0.9)
+
+    def _update_possession(self):
+        """无人控球时，距离球最近且足够近的球员获得球权；持球时处理对方贴身抢断"""
+        if self.ball_owned_team != -1:
+            if self.game_mode == GameMode.NORMAL:
+                defending_team = 1 - self.ball_owned_team
+                players = self.left_team if defending_team == 0 else self.right_team
+                closest = int(np.hypot(*(players - self.ball[:2]).T).argmin())
+                self._try_tackle(attacker_team=defending_team, player_index=closest)
+            return
+        if self.ball[2] > 0.2:
+            return
+
+        distances = np.concatenate([
+            np.hypot(*(self.left_team - self.ball[:2]).T),
+            np.hypot(*(self.right_team - self.ball[:2]).T),
+        ])
+        distances[self.kick_cooldown.reshape(-1) > 0] = np.inf
+        closest = int(distances.argmin())
+        if distances[closest] < CONTROL_DISTANCE:
+            self._take_possession(closest // NUM_PLAYERS, closest % NUM_PLAYERS)
+
+    def _take_possession(self, team, player_index):
+        self.ball_owned_team = team
+        self.ball_owned_player = player_index
+        self.last_touch_team = team
+        self.ball_direction[:] = 0.0
+
+    # ===================== 出界与定位球 =====================
+
+    def _check_ball_out(self):
+        """处理进球、底线球和边线球，返回左队视角的得分奖励"""
+        x, y = self.ball[0], self.ball[1]
+        in_goal_mouth = Field.GOAL_TOP_Y < y < Field.GOAL_BOTTOM_Y
+
+        if x > Field.RIGHT_BOUNDARY:
+            if in_goal_mouth:
+                self.score[0] += 1
+                self._restart(GameMode.KICK_OFF, team=1, position=(0.0, 0.0))
+                return 1
+            if self.last_touch_team == 0:
+                self._restart(GameMode.GOAL_KICK, team=1, position=(0.95, 0.0))
+            else:
+                self._restart(GameMode.CORNER, team=0, position=(1.0, np.sign(y) * 0.42))
+            return 0
+
+        if x < Field.LEFT_BOUNDARY:
+            if in_goal_mouth:
+                self.score[1] += 1
+                self._restart(GameMode.KICK_OFF, team=0, position=(0.0, 0.0))
+                return -1
+            if self.last_touch_team == 1:
+                self._restart(GameMode.GOAL_KICK, team=0, position=(-0.95, 0.0))
+            else:
+                self._restart(GameMode.CORNER, team=1, position=(-1.0, np.sign(y) * 0.42))
+            return 0
+
+        if abs(y) > Field.BOTTOM_BOUNDARY:
+            team = 1 if self.last_touch_team == 0 else 0
+            self._restart(GameMode.THROW_IN, team=team, position=(x, np.sign(y) * Field.BOTTOM_BOUNDARY))
+        return 0
+
+    def _restart(self, game_mode, team, position):
+        """设置定位球：球放到指定位置，由该队距离最近的球员主罚"""
+        position = np.asarray(position, dtype=float)
+        if game_mode == GameMode.KICK_OFF:
+            self.left_team = FORMATION.copy()
+            self.right_team = -FORMATION.copy()
+            self.sticky_actions[:] = 0
+
+        players = self.left_team if team == 0 else self.right_team
+        if game_mode == GameMode.GOAL_KICK:
+            taker = 0
+        else:
+            taker = int(np.hypot(*(players - position).T).argmin())
+        players[taker] = position
+
+        self.ball[:2] = position
+        self.ball[2] = 0.11
+        self.ball_direction[:] = 0.0
+        self.kick_cooldown[:] = 0
+        self._take_possession(team, taker)
+        self.game_mode = game_mode
+        self.set_piece_steps = 0
+
+    def _update_set_piece(self):
+        """定位球超时后恢复常规模式"""
+        if self.game_mode == GameMode.NORMAL:
+            return
+        self.set_piece_steps += 1
+        if self.set_piece_steps >= SET_PIECE_TIMEOUT:
+            self.game_mode = GameMode.NORMAL
+
+    # ===================== 观测 =====================
+
+    def _observations(self):
+        """构建 11 名受控球员的 raw 观测"""
+        if self.ball_owned_team == 0:
+            designated = self.ball_owned_player
+        else:
+            designated = int(np.hypot(*(self.left_team - self.ball[:2]).T).argmin())
+
+        base = {
+            'left_team': self.left_team.copy(),
+            'left_team_direction': self.left_direction.copy(),
+            'left_team_tired_factor': self.left_tired.copy(),
+            'left_team_yellow_card': np.zeros(NUM_PLAYERS, dtype=bool),
+            'left_team_active': np.ones(NUM_PLAYERS, dtype=bool),
+            'left_team_roles': ROLES.copy(),
+            'right_team': self.right_team.copy(),
+            'right_team_direction': self.right_direction.copy(),
+            'right_team_tired_factor': self.right_tired.copy(),
+            'right_team_yellow_card': np.zeros(NUM_PLAYERS, dtype=bool),
+            'right_team_active': np.ones(NUM_PLAYERS, dtype=bool),
+            'right_team_roles': ROLES.copy(),
+            'ball': self.ball.copy(),
+            'ball_direction': self.ball_direction.copy(),
+            'ball_rotation': np.zeros(3),
+            'ball_owned_team': self.ball_owned_team,
+            'ball_owned_player': self.ball_owned_player,
+            'game_mode': self.game_mode,
+            'score': list(self.score),
+            'steps_left': self.steps_left,
+            'designated': designated,
+        }
+
+        observations = []
+        for player_index in range(NUM_PLAYERS):
+            obs = dict(base)
+            obs['active'] = player_index
+            obs['sticky_actions'] = self.sticky_actions[player_index].copy()
+            observations.append(obs)
+        return observations
@@ -0,0 +1,173 @@
+"""
+向量化环境 - 把 K 个环境（真实或替身）分布到多个子进程中，同步地一起推进
+
+每个工作进程持有若干个环境，主进程每步把所有环境的动作一次发出、
+一次收回，使智能体可以对 K 场比赛一起做决策。
+环境结束（或达到最大步数）时在工作进程内自动重置，并在 info 中附带该局统计。
+"""
+
+import multiprocessing as mp
+import time
+
+import numpy as np
+
+
+def _worker(connection, env_args, num_envs, max_steps):
+    """工作进程主循环：按命令重置/推进自己持有的环境"""
+    from src.main import create_environment
+
+    envs = [create_environment(env_args) for _ in range(num_envs)]
+    observations = [None] * num_envs
+    episode_rewards = [0.0] * num_envs
+    episode_lengths = [0] * num_envs
+    episode_starts = [0.0] * num_envs
+
+    def reset(k):
+        observations[k] = envs[k].reset()
+        episode_rewards[k] = 0.0
+        episode_lengths[k] = 0
+        episode_starts[k] = time.perf_counter()
+        return observations[k]
+
+    try:
+        while True:
+            command, data = connection.recv()
+
+            if command == 'reset':
+                connection.send([reset(k) for k in range(num_envs)])
+
+            elif command == 'step':
+                results = []
+                for k, actions in enumerate(data):
+                    obs, reward, done, info = envs[k].step(list(actions))
+                    score_reward = float(np.asarray(reward).reshape(-1)[0])
+                    episode_rewards[k] += score_reward
+                    episode_lengths[k] += 1
+
+                    info = dict(info)
+                    if done or episode_lengths[k] >= max_steps:
+                        done = True
+                        info['episode'] = {
+                            'score': list(obs[0]['score']),
+                            'reward': episode_rewards[k],
+                            'length': episode_lengths[k],
+                            'wall_time': time.perf_counter() - episode_starts[k],
+                        }
+                        obs = reset(k)
+                    observations[k] = obs
+                    results.append((obs, score_reward, done, info))
+                connection.send(results)
+
+            elif command == 'close':
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for env in envs:
+            env.close()
+        connection.close()
+
+
+class VectorFootballEnv:
+    """
+    K 个环境的同步向量化封装
+
+    reset() 返回 K 个观测列表；step(actions) 接受 (K,11) 动作数组，
+    返回 (obs_batch, rewards, dones, infos)，其中 rewards/dones 形状为 (K,)。
+    """
+
+    def __init__(self, env_args, num_envs, num_workers=None, max_steps=3000):
+        """
+        参数:
+            env_args: 传给 create_environment 的环境参数
+            num_envs: 环境总数 K
+            num_workers: 子进程数，None 表示每个环境一个子进程
+            max_steps: 每局最大步数，达到后视为结束并自动重置
+        """
+        if num_workers is None:
+            num_workers = num_envs
+        num_workers = max(1, min(num_workers, num_envs))
+        self.num_envs = num_envs
+
+        # 把环境尽量均匀地分配给各个工作进程
+        counts = [num_envs // num_workers + (1 if w < num_envs % num_workers else 0)
+                  for w in range(num_workers)]
+        self._slices = []
+        start = 0
+        for count in counts:
+            self._slices.append(slice(start, start + count))
+            start += count
+
+        # gfootball 引擎不能在 fork 后安全使用，统一用 spawn 启动
+        context = mp.get_context('spawn')
+        self._connections = []
+        self._processes = []
+        for count in counts:
+            parent_connection, child_connection = context.Pipe()
+            process = context.Process(
+                target=_worker,
+                args=(child_connection, env_args, count, max_steps),
+                daemon=True
+            )
+            process.start()
+            child_connection.close()
+            self._connections.append(parent_connection)
+            self._processes.append(process)
+        self._closed = False
+
+    def reset(self):
+        """重置所有环境，返回 K 个观测列表"""
+        for connection in self._connections:
+            connection.send(('reset', None))
+        obs_batch = []
+        for connection in self._connections:
+            obs_batch.extend(connection.recv())
+        return obs_batch
+
+    def step(self, actions):
+        """
+        所有环境同步推进一步
+
+        参数:
+            actions: (K,11) 动作数组
+
+        返回:
+            obs_batch: K 个观测列表（已结束的环境为重置后的新观测）
+            rewards: (K,) 本步得分奖励
+            dones: (K,) 本步是否结束了一局
+            infos: K 个 info 字典，结束时包含 'episode' 统计
+        """
+        actions = np.asarray(actions)
+        for connection, env_slice in zip(self._connections, self._slices):
+            connection.send(('step', actions[env_slice]))
+
+        results = []
+        for connection in self._connections:
+            results.extend(connection.recv())
+
+        obs_batch = [result[0] for result in results]
+        rewards = np.array([result[1] for result in results], dtype=np.float32)
+        dones = np.array([result[2] for result in results], dtype=bool)
+        infos = [result[3] for result in results]
+        return obs_batch, rewards, dones, infos
+
+    def close(self):
+        """关闭所有工作进程"""
+        if self._closed:
+            return
+        for connection in self._connections:
+            try:
+                connection.send(('close', None))
+            except (BrokenPipeError, EOFError):
+                pass
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,247 @@
+"""
+并行评估模块 - 使用进程池在多个环境中同时运行多局比赛，并汇总胜平负统计
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+# 每个工作进程各自持有的环境、智能体和轨迹记录器
+_worker_env = None
+_worker_agent = None
+_worker_recorder = None
+
+
+def _init_worker(env_args):
+    """工作进程初始化：创建独立的环境和智能体"""
+    global _worker_env, _worker_agent, _worker_recorder
+    from src.main import create_environment
+    from src.gfootball_agent.agent import FootballAgent
+
+    _worker_env = create_environment(env_args)
+    _worker_agent = FootballAgent()
+    if getattr(env_args, 'trace_dir', None):
+        from src.traces import TraceRecorder
+        _worker_recorder = TraceRecorder(env_args.trace_dir)
+
+
+def _run_worker_episode(episode_index, max_steps):
+    """在工作进程中运行一局比赛，返回该局结果"""
+    from src.main import run_episode
+
+    start_time = time.perf_counter()
+    episode_reward, episode_length, score = run_episode(
+        _worker_env, max_steps, football_agent=_worker_agent, verbose=False,
+        recorder=_worker_recorder, episode_index=episode_index
+    )
+    wall_time = time.perf_counter() - start_time
+
+    return {
+        'episode': episode_index,
+        'score': score,
+        'reward': episode_reward,
+        'length': episode_length,
+        'wall_time': wall_time,
+        'pid': os.getpid(),
+    }
+
+
+def get_match_result(score):
+    """根据比分判断胜负：'win' / 'draw' / 'loss'"""
+    if score[0] > score[1]:
+        return 'win'
+    if score[0] < score[1]:
+        return 'loss'
+    return 'draw'
+
+
+def summarize_results(results):
+    """汇总多局比赛结果"""
+    num_episodes = len(results)
+    if num_episodes == 0:
+        return {'episodes': 0}
+
+    outcomes = [get_match_result(result['score']) for result in results]
+    goals_for = sum(result['score'][0] for result in results)
+    goals_against = sum(result['score'][1] for result in results)
+
+    return {
+        'episodes': num_episodes,
+        'win': outcomes.count('win'),
+        'draw': outcomes.count('draw'),
+        'loss': outcomes.count('loss'),
+        'win_rate': outcomes.count('win') / num_episodes,
+        'goals_for': goals_for,
+        'goals_against': goals_against,
+        'average_reward': sum(result['reward'] for result in results) / num_episodes,
+        'average_length': sum(result['length'] for result in results) / num_episodes,
+        'average_wall_time': sum(result['wall_time'] for result in results) / num_episodes,
+    }
+
+
+def evaluate(env_args, num_episodes, max_steps=3000, num_workers=None, on_result=None):
+    """
+    在多个工作进程中并行运行多局比赛
+
+    参数:
+        env_args: 传给 create_environment 的环境参数
+        num_episodes: 比赛局数
+        max_steps: 每局最大步数
+        num_workers: 工作进程数，None表示使用全部CPU核心
+        on_result: 每局结束时的回调，参数为该局结果字典
+
+    返回:
+        (results, failures): 每局结果列表（按局号排序）和失败的局
+    """
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    num_workers = max(1, min(num_workers, num_episodes))
+
+    results = []
+    failures = []
+
+    # 与 VectorFootballEnv 一致用 spawn 启动：gfootball 引擎不能在 fork 后安全使用
+    with ProcessPoolExecutor(max_workers=num_workers,
+                             mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker,
+                             initargs=(env_args,)) as executor:
+        futures = {
+            executor.submit(_run_worker_episode, episode, max_steps): episode
+            for episode in range(num_episodes)
+        }
+
+        # 每局结束后立即返回结果，不等待全部完成
+        for future in as_completed(futures):
+            episode = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                failures.append({'episode': episode, 'error': repr(e)})
+                continue
+
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+
+    results.sort(key=lambda result: result['episode'])
+    return results, failures
+
+
+def evaluate_vectorized(env_args, num_episodes, max_steps=3000, num_envs=8,
+                        num_workers=None, on_result=None):
+    """
+    同步推进 num_envs 个环境，每步用一次批量决策为所有比赛生成动作
+
+    参数:
+        env_args: 传给 create_environment 的环境参数
+        num_episodes: 比赛局数
+        max_steps: 每局最大步数
+        num_envs: 同时进行的比赛数
+        num_workers: 承载环境的子进程数，None表示使用全部CPU核心
+        on_result: 每局结束时的回调，参数为该局结果字典
+
+    返回:
+        (results, total_steps): 每局结果列表（按完成顺序）和推进的总步数
+    """
+    from src.envs.vector_env import VectorFootballEnv
+    from src.gfootball_agent.agent import FootballAgent
+
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    num_envs = max(1, min(num_envs, num_episodes))
+
+    football_agent = FootballAgent()
+    results = []
+    total_steps = 0
+
+    with VectorFootballEnv(env_args, num_envs, num_workers, max_steps=max_steps) as vec_env:
+        obs_batch = vec_env.reset()
+        while len(results) < num_episodes:
+            actions = football_agent.get_actions_batch(obs_batch)
+            obs_batch, _, dones, infos = vec_env.step(actions)
+            total_steps += num_envs
+
+            for env_index in np.flatnonzero(dones):
+                if len(results) >= num_episodes:
+                    break
+                result = dict(infos[env_index]['episode'], episode=len(results), env=int(env_index))
+                results.append(result)
+                if on_result is not None:
+                    on_result(result)
+
+    return results, total_steps
+
+
+def print_episode_result(result):
+    """打印单局结果"""
+    score = result['score']
+    print(f"第 {result['episode'] + 1} 局: 比分 {score[0]} - {score[1]} "
+          f"({get_match_result(score)}), 奖励 {result['reward']:.3f}, "
+          f"步数 {result['length']}, 耗时 {result['wall_time']:.1f}秒 {_episode_source(result)}")
+
+
+def _episode_source(result):
+    if 'pid' in result:
+        return f"(进程 {result['pid']})"
+    return f"(环境 {result['env']})"
+
+
+def print_summary(summary, failures, total_time):
+    """打印评估汇总"""
+    print("=" * 60)
+    print("评估结果汇总:")
+    print(f"  完成局数: {summary['episodes']}")
+    if summary['episodes'] > 0:
+        print(f"  胜/平/负: {summary['win']} / {summary['draw']} / {summary['loss']} "
+              f"(胜率 {summary['win_rate']:.1%})")
+        print(f"  进球/失球: {summary['goals_for']} / {summary['goals_against']}")
+        print(f"  平均奖励: {summary['average_reward']:.3f}")
+        print(f"  平均步数: {summary['average_length']:.1f}")
+        print(f"  平均每局耗时: {summary['average_wall_time']:.1f}秒")
+    if failures:
+        print(f"  失败局数: {len(failures)}")
+        for failure in failures:
+            print(f"    第 {failure['episode'] + 1} 局: {failure['error']}")
+    print(f"  总耗时: {total_time:.1f}秒")
+    print("=" * 60)
+
+
+def run_evaluation(args):
+    """评估模式入口：根据命令行参数并行运行多局比赛"""
+    # 工作进程中不渲染、不录像
+    env_args = argparse.Namespace(**vars(args))
+    env_args.render = False
+    env_args.write_video = False
+
+    num_workers = args.num_workers or os.cpu_count() or 1
+    num_envs = getattr(args, 'num_envs', 1) or 1
+
+    start_time = time.perf_counter()
+    if num_envs > 1:
+        # 多场比赛同步推进，每步批量决策（批量决策不记录动作历史，也不录制轨迹）
+        if getattr(args, 'trace_dir', None):
+            print("提示: 向量化评估不录制比赛轨迹，忽略 --trace_dir")
+        print(f"向量化评估: {args.num_episodes} 局比赛, {num_envs} 个同步环境, "
+              f"{num_workers} 个工作进程")
+        results, total_steps = evaluate_vectorized(
+            env_args, args.num_episodes, args.max_steps, num_envs=num_envs,
+            num_workers=num_workers, on_result=print_episode_result
+        )
+        failures = []
+        total_time = time.perf_counter() - start_time
+        print(f"吞吐量: {total_steps / total_time:.0f} 步/秒 (所有环境合计)")
+    else:
+        print(f"并行评估: {args.num_episodes} 局比赛, {num_workers} 个工作进程")
+        results, failures = evaluate(
+            env_args, args.num_episodes, args.max_steps,
+            num_workers=num_workers, on_result=print_episode_result
+        )
+        total_time = time.perf_counter() - start_time
+
+    summary = summarize_results(results)
+    print_summary(summary, failures, total_time)
+    return summary
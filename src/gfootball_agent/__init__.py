@@ -1,11 +1,30 @@
 """
 GFootball Agent Package
 足球智能体包
+
+agent / FootballAgent 在第一次访问时才导入：只用到配置常量的模块
+（以及评估工作进程、工具脚本）不必加载整个决策包，
+也避免了 utils.features -> config -> agent -> roles -> utils.features 的循环导入
 """
 
-from src.gfootball_agent.agent import agent, FootballAgent
+import importlib
+
 from src.gfootball_agent.config import *
 
 __version__ = "1.0.0"
 __author__ = "AI Assistant"
-__description__ = "基于决策树的Google Research Football智能体" 
\ No newline at end of file
+__description__ = "基于决策树的Google Research Football智能体"
+
+_LAZY_ATTRIBUTES = {
+    'agent': 'src.gfootball_agent.agent',
+    'FootballAgent': 'src.gfootball_agent.agent',
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
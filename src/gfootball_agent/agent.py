@@ -2,8 +2,19 @@
 定义核心Agent类,负责调用决策逻辑
 """ 
 
-from src.gfootball_agent.decision_logic.top_level_logic import get_player_action
-from src.utils.actions import action_manager, validate_action_for_situation
+import logging
+
+import numpy as np
+
+from src.gfootball_agent.decision_logic.top_level_logic import get_player_action, get_decision_table
+from src.gfootball_agent.role_registry import RoleRegistry
+from src.utils.action_history import ActionHistory, DEFAULT_DEPTH
+from src.utils.actions import filter_actions, owns_ball_mask
+from src.utils.feature_cache import feature_cache
+from src.utils.profiling import profiler
+from src.utils.step_context import StepContext, build_step_contexts, stack_observations
+
+logger = logging.getLogger(__name__)
 
 
 class FootballAgent:
@@ -12,90 +23,107 @@ class FootballAgent:
     负责管理11名球员的决策并返回动作数组
     """
     
-    def __init__(self):
-        """初始化智能体"""
+    def __init__(self, history_depth=DEFAULT_DEPTH):
+        """
+        初始化智能体
+        
+        参数:
+            history_depth: 每个球员保存的动作历史条数
+        """
         self.team_size = 11
-        self.action_history = {}  # 记录每个球员的动作历史
+        self.action_history = ActionHistory(self.team_size, history_depth)  # 全队动作历史环形缓冲区
+        self.error_count = 0  # 决策异常次数
+        self.role_registry = RoleRegistry()  # 角色索引表，角色或场上状态变化时重建
+        self.batch_role_registries = []  # 批量决策时每场比赛各自的角色索引表
         
-    def get_actions(self, obs_list):
+    def get_actions(self, obs_list, record_history=True):
         """
         获取所有球员的动作
         
         参数:
             obs_list: 观测数据列表，每个元素对应一个球员的观测
+            record_history: 是否记录动作历史
         
         返回:
             actions: 动作列表，每个元素对应一个球员的动作
         """
-        actions = []
-        
-        # 为每个球员生成动作
-        for player_index in range(self.team_size):
-            if player_index < len(obs_list):
-                obs = obs_list[player_index]
-                action = self._get_single_player_action(obs, player_index)
-                actions.append(action)
-            else:
-                # 如果观测数据不足，返回默认动作
-                actions.append(0)  # IDLE
+        # 上一步缓存的特征全部失效
+        feature_cache.new_step()
+        
+        # 每步只构建一次共享特征上下文，供所有球员的决策共用
+        ctx = StepContext(obs_list)
+        self.role_registry.update(ctx.left_team_roles, ctx.left_team_active)
+        ctx.role_registry = self.role_registry
+        
+        # 为每个球员生成期望动作（观测数据不足的球员保持 IDLE）
+        num_players = min(len(obs_list), self.team_size)
+        desired_actions = np.zeros(self.team_size, dtype=np.int64)
+        branches = [None] * self.team_size
+        for player_index in range(num_players):
+            desired_actions[player_index] = self._run_decision(get_player_action, ctx, player_index)
+            # 剖析开启时可以得知动作来自哪个叶子分支
+            if profiler.enabled:
+                branches[player_index] = profiler.last_leaf
+        
+        # 动作验证和粘性动作过滤对全队一次完成
+        owns_ball = owns_ball_mask(ctx['ball_owned_team'], ctx['ball_owned_player'], self.team_size)
+        rows = min(len(ctx.sticky_actions), self.team_size)
+        actions = desired_actions.copy()
+        actions[:rows] = filter_actions(desired_actions[:rows], ctx.sticky_actions[:rows], owns_ball[:rows])
+        actions = actions.tolist()
+        
+        # 记录动作历史（观测数据不足的球员不记录）
+        if record_history:
+            recorded = None if num_players == self.team_size else np.arange(self.team_size) < num_players
+            self.action_history.record_step(actions, branches, recorded)
         
         return actions
     
-    def _get_single_player_action(self, obs, player_index):
+    def get_actions_batch(self, obs_batch):
         """
-        获取单个球员的动作
+        同时获取多场比赛中所有球员的动作
+        
+        几何特征对所有比赛一次性计算，按角色掩码直接分发到角色决策函数，
+        动作验证和粘性动作过滤也以数组形式完成。
         
         参数:
-            obs: 球员的观测数据
-            player_index: 球员索引
+            obs_batch: B 场比赛的观测列表（每个元素是一场比赛的 obs_list），
+                       或 stack_observations 得到的堆叠观测（left_team 为 (B,11,2) 等）
         
         返回:
-            action: 球员应该执行的动作
+            actions: (B, 11) 动作数组
         """
+        feature_cache.new_step()
+        stacked = obs_batch if isinstance(obs_batch, dict) else stack_observations(obs_batch)
+        contexts = build_step_contexts(stacked)
+        while len(self.batch_role_registries) < len(contexts):
+            self.batch_role_registries.append(RoleRegistry())
+        for ctx, registry in zip(contexts, self.batch_role_registries):
+            registry.update(ctx.left_team_roles, ctx.left_team_active)
+            ctx.role_registry = registry
+        decisions, table = get_decision_table(stacked['game_mode'], stacked['left_team_roles'])
+        
+        desired_actions = np.zeros(table.shape, dtype=np.int64)
+        for match_index, ctx in enumerate(contexts):
+            for player_index in range(table.shape[1]):
+                decision = decisions[table[match_index, player_index]]
+                desired_actions[match_index, player_index] = self._run_decision(decision, ctx, player_index)
+        
+        owns_ball = owns_ball_mask(np.asarray(stacked['ball_owned_team']),
+                                   np.asarray(stacked['ball_owned_player']), table.shape[1])
+        # 动作历史按单场比赛记录，批量决策时不记录
+        return filter_actions(desired_actions, stacked['sticky_actions'], owns_ball)
+    
+    def _run_decision(self, decision, ctx, player_index):
+        """调用决策函数，出现异常时返回 IDLE"""
         try:
-            # 调用顶层决策逻辑获取期望动作
-            desired_action = get_player_action(obs, player_index)
-            
-            # 验证动作的合法性
-            is_valid, corrected_action = validate_action_for_situation(
-                desired_action, obs, player_index
-            )
-            
-            if not is_valid:
-                desired_action = corrected_action
-            
-            # 通过动作管理器处理粘性动作
-            final_action = action_manager.get_action_with_sticky_management(
-                player_index, desired_action, obs
-            )
-            
-            # 记录动作历史
-            self._record_action_history(player_index, final_action)
-            
-            return final_action
-            
+            return decision(ctx, player_index)
         except Exception as e:
-            # 出现异常时返回安全的默认动作
-            print(f"球员 {player_index} 决策出现异常: {e}")
+            self.error_count += 1
+            profiler.record_error(e)
+            logger.exception(f"球员 {player_index} 决策出现异常: {e}")
             return 0  # IDLE
     
-    def _record_action_history(self, player_index, action):
-        """
-        记录球员的动作历史
-        
-        参数:
-            player_index: 球员索引
-            action: 执行的动作
-        """
-        if player_index not in self.action_history:
-            self.action_history[player_index] = []
-        
-        self.action_history[player_index].append(action)
-        
-        # 只保留最近的10个动作
-        if len(self.action_history[player_index]) > 10:
-            self.action_history[player_index].pop(0)
-    
     def get_action_history(self, player_index):
         """
         获取球员的动作历史
@@ -104,13 +132,16 @@ class FootballAgent:
             player_index: 球员索引
         
         返回:
-            history: 动作历史列表
+            history: 动作历史列表（从旧到新，最多 history_depth 条）
         """
-        return self.action_history.get(player_index, [])
+        return self.action_history.get(player_index)
     
     def reset(self):
         """重置智能体状态"""
         self.action_history.clear()
+        self.error_count = 0
+        self.role_registry.reset()
+        self.batch_role_registries.clear()
 
 
 # 创建全局智能体实例
@@ -95,6 +95,7 @@ class Tactics:
     # Mid-Block防守参数
     MID_BLOCK_X_THRESHOLD = -0.2  # Mid-Block防守的X坐标阈值
     DEFENSIVE_LINE_Y_SPREAD = 0.3  # 防线的Y轴展开范围
+    LINE_HOLD_MARGIN = 0.1  # 支援的后卫最多比我方后卫线平均高度前压的距离
     
     # 进攻参数
     ATTACK_X_THRESHOLD = 0.2  # 进攻区域的X坐标阈值
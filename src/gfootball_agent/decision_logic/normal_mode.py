@@ -2,35 +2,69 @@
 常规比赛模式决策逻辑
 """
 
+import numpy as np
+
 from src.gfootball_agent.config import PlayerRole
+from src.gfootball_agent.role_registry import get_role_registry
+from src.utils.step_context import as_step_context
+from src.utils.profiling import decision_node
 from src.gfootball_agent.roles.goalkeeper import goalkeeper_decision
 from src.gfootball_agent.roles.defender import defender_decision
 from src.gfootball_agent.roles.midfielder import midfielder_decision
 from ..roles.forward import forward_decision
 
 
+@decision_node
 def normal_mode_decision(obs, player_index):
     """
     常规比赛模式下的球员决策
     根据球员角色分发到对应的决策函数
     """
-    player_role = obs['left_team_roles'][player_index]
-    
-    # 根据球员角色选择对应的决策逻辑
-    if player_role == PlayerRole.GOALKEEPER:
-        return goalkeeper_decision(obs, player_index)
-    
-    elif player_role in [PlayerRole.CENTRE_BACK, PlayerRole.LEFT_BACK, PlayerRole.RIGHT_BACK]:
-        return defender_decision(obs, player_index)
-    
-    elif player_role in [PlayerRole.CENTRAL_MIDFIELD, PlayerRole.LEFT_MIDFIELD, 
-                         PlayerRole.RIGHT_MIDFIELD, PlayerRole.ATTACK_MIDFIELD,
-                         PlayerRole.DEFENCE_MIDFIELD]:
-        return midfielder_decision(obs, player_index)
+    obs = as_step_context(obs)
     
-    elif player_role == PlayerRole.CENTRAL_FORWARD:
-        return forward_decision(obs, player_index)
+    # 根据球员角色选择对应的决策逻辑（分发表随角色注册表重建）
+    return get_dispatch_table(obs)[player_index](obs, player_index)
+
+
+def get_dispatch_table(obs):
+    """
+    每名球员的角色决策函数列表，按局缓存在角色注册表中
     
-    else:
-        # 未知角色，默认使用中场逻辑
-        return midfielder_decision(obs, player_index) 
\ No newline at end of file
+    未知角色默认使用中场逻辑，规则见 get_role_decision_masks
+    """
+    registry = get_role_registry(obs)
+    table = registry.cache.get('normal_mode_dispatch')
+    if table is None:
+        table = [midfielder_decision] * len(registry.roles)
+        for decision, mask in get_role_decision_masks(registry.roles):
+            for player_index in np.flatnonzero(mask):
+                table[player_index] = decision
+        registry.cache['normal_mode_dispatch'] = table
+    return table
+
+
+DEFENDER_ROLES = [PlayerRole.CENTRE_BACK, PlayerRole.LEFT_BACK, PlayerRole.RIGHT_BACK]
+
+
+def get_role_decision_masks(roles):
+    """
+    按角色批量分组，与 normal_mode_decision 的分发规则一致
+
+    参数:
+        roles: 任意形状的角色数组，如 (B,11)
+
+    返回:
+        [(decision_function, mask), ...]，各 mask 互斥且覆盖所有球员
+    """
+    roles = np.asarray(roles)
+    goalkeeper = roles == PlayerRole.GOALKEEPER
+    defender = np.isin(roles, DEFENDER_ROLES)
+    forward = roles == PlayerRole.CENTRAL_FORWARD
+    # 中场角色以及未知角色都使用中场逻辑
+    midfielder = ~(goalkeeper | defender | forward)
+    return [
+        (goalkeeper_decision, goalkeeper),
+        (defender_decision, defender),
+        (midfielder_decision, midfielder),
+        (forward_decision, forward),
+    ]
@@ -2,20 +2,30 @@
 所有定位球模式的逻辑
 """ 
 
+import random
+
+import numpy as np
+
 from src.utils.features import (
     get_ball_info, get_player_info, distance_to, 
     find_closest_teammate, get_movement_direction,
     is_in_opponent_half, can_shoot
 )
+from src.utils.geometry import first_argmax_above
+from src.utils.step_context import as_step_context
+from src.utils.profiling import decision_node
 from src.gfootball_agent.config import Action, GameMode, PlayerRole, Field, Distance
+from src.gfootball_agent.pressing import get_press_assignment
 
 
+@decision_node
 def set_piece_decision(obs, player_index):
     """
     定位球模式决策
     根据具体的定位球类型分发到对应的处理函数
     """
-    game_mode = obs['game_mode']
+    obs = as_step_context(obs)
+    game_mode = obs.game_mode
     
     if game_mode == GameMode.KICK_OFF:
         return kick_off_logic(obs, player_index)
@@ -34,10 +44,11 @@ def set_piece_decision(obs, player_index):
         return Action.IDLE
 
 
+@decision_node
 def kick_off_logic(obs, player_index):
     """开球逻辑"""
     ball_info = get_ball_info(obs)
-    player_pos = obs['left_team'][player_index]
+    player_pos = obs.left_team[player_index]
     ball_pos = ball_info['position']
     
     # 检查是否是主罚球员（最接近球的球员）
@@ -55,10 +66,11 @@ def kick_off_logic(obs, player_index):
     return kick_off_support_movement(obs, player_index)
 
 
+@decision_node
 def kick_off_support_movement(obs, player_index):
     """开球时的支援跑位"""
-    player_role = obs['left_team_roles'][player_index]
-    player_pos = obs['left_team'][player_index]
+    player_role = obs.left_team_roles[player_index]
+    player_pos = obs.left_team[player_index]
     
     # 根据角色确定跑位位置
     if player_role == PlayerRole.GOALKEEPER:
@@ -87,12 +99,13 @@ def kick_off_support_movement(obs, player_index):
     return movement_action if movement_action else Action.IDLE
 
 
+@decision_node
 def goal_kick_logic(obs, player_index):
     """球门球逻辑"""
     ball_info = get_ball_info(obs)
-    player_pos = obs['left_team'][player_index]
+    player_pos = obs.left_team[player_index]
     ball_pos = ball_info['position']
-    player_role = obs['left_team_roles'][player_index]
+    player_role = obs.left_team_roles[player_index]
     
     # 守门员主罚球门球
     if player_role == PlayerRole.GOALKEEPER and is_main_set_piece_taker(obs, player_index, ball_pos):
@@ -100,8 +113,7 @@ def goal_kick_logic(obs, player_index):
         safest_target = find_safest_goal_kick_target(obs, player_index)
         
         if safest_target != -1:
-            target_pos = obs['left_team'][safest_target]
-            pass_distance = distance_to(player_pos, target_pos)
+            pass_distance = obs.team_distances[player_index, safest_target]
             
             if pass_distance < Distance.SHORT_PASS_RANGE:
                 return Action.SHORT_PASS
@@ -115,10 +127,11 @@ def goal_kick_logic(obs, player_index):
     return goal_kick_support_movement(obs, player_index)
 
 
+@decision_node
 def goal_kick_support_movement(obs, player_index):
     """球门球支援跑位"""
-    player_role = obs['left_team_roles'][player_index]
-    player_pos = obs['left_team'][player_index]
+    player_role = obs.left_team_roles[player_index]
+    player_pos = obs.left_team[player_index]
     
     if player_role in [PlayerRole.CENTRE_BACK, PlayerRole.LEFT_BACK, PlayerRole.RIGHT_BACK]:
         # 后卫拉开接应
@@ -148,10 +161,11 @@ def goal_kick_support_movement(obs, player_index):
     return movement_action if movement_action else Action.IDLE
 
 
+@decision_node
 def free_kick_logic(obs, player_index):
     """任意球逻辑"""
     ball_info = get_ball_info(obs)
-    player_pos = obs['left_team'][player_index]
+    player_pos = obs.left_team[player_index]
     ball_pos = ball_info['position']
     
     # 检查是否是主罚球员
@@ -168,7 +182,7 @@ def free_kick_logic(obs, player_index):
         best_target = find_free_kick_target(obs, player_index)
         
         if best_target != -1:
-            target_pos = obs['left_team'][best_target]
+            target_pos = obs.left_team[best_target]
             pass_distance = distance_to(ball_pos, target_pos)
             
             # 根据距离选择传球方式
@@ -184,10 +198,11 @@ def free_kick_logic(obs, player_index):
     return free_kick_support_movement(obs, player_index)
 
 
+@decision_node
 def free_kick_support_movement(obs, player_index):
     """任意球支援跑位"""
-    player_role = obs['left_team_roles'][player_index]
-    player_pos = obs['left_team'][player_index]
+    player_role = obs.left_team_roles[player_index]
+    player_pos = obs.left_team[player_index]
     ball_pos = get_ball_info(obs)['position']
     
     if is_in_opponent_half(ball_pos):
@@ -212,11 +227,12 @@ def free_kick_support_movement(obs, player_index):
     return movement_action if movement_action else Action.IDLE
 
 
+@decision_node
 def corner_logic(obs, player_index):
     """角球逻辑"""
     ball_info = get_ball_info(obs)
     ball_pos = ball_info['position']
-    player_pos = obs['left_team'][player_index]
+    player_pos = obs.left_team[player_index]
     
     # 检查是否是主罚球员
     if is_main_set_piece_taker(obs, player_index, ball_pos):
@@ -227,10 +243,11 @@ def corner_logic(obs, player_index):
     return corner_support_movement(obs, player_index)
 
 
+@decision_node
 def corner_support_movement(obs, player_index):
     """角球支援跑位"""
-    player_role = obs['left_team_roles'][player_index]
-    player_pos = obs['left_team'][player_index]
+    player_role = obs.left_team_roles[player_index]
+    player_pos = obs.left_team[player_index]
     ball_pos = get_ball_info(obs)['position']
     
     if player_role == PlayerRole.CENTRAL_FORWARD:
@@ -253,11 +270,12 @@ def corner_support_movement(obs, player_index):
     return movement_action if movement_action else Action.IDLE
 
 
+@decision_node
 def throw_in_logic(obs, player_index):
     """界外球逻辑"""
     ball_info = get_ball_info(obs)
     ball_pos = ball_info['position']
-    player_pos = obs['left_team'][player_index]
+    player_pos = obs.left_team[player_index]
     
     # 检查是否是主罚球员
     if is_main_set_piece_taker(obs, player_index, ball_pos):
@@ -274,10 +292,11 @@ def throw_in_logic(obs, player_index):
     return throw_in_support_movement(obs, player_index)
 
 
+@decision_node
 def throw_in_support_movement(obs, player_index):
     """界外球支援跑位"""
-    player_role = obs['left_team_roles'][player_index]
-    player_pos = obs['left_team'][player_index]
+    player_role = obs.left_team_roles[player_index]
+    player_pos = obs.left_team[player_index]
     ball_pos = get_ball_info(obs)['position']
     
     # 简单的接应跑位：向球的方向移动一点
@@ -293,16 +312,16 @@ def throw_in_support_movement(obs, player_index):
     return movement_action if movement_action else Action.IDLE
 
 
+@decision_node
 def penalty_logic(obs, player_index):
     """点球逻辑"""
     ball_info = get_ball_info(obs)
     ball_pos = ball_info['position']
-    player_role = obs['left_team_roles'][player_index]
+    player_role = obs.left_team_roles[player_index]
     
     # 守门员防守点球
     if player_role == PlayerRole.GOALKEEPER:
         # 随机选择扑救方向
-        import random
         directions = [Action.LEFT, Action.RIGHT, Action.IDLE]
         return random.choice(directions)
     
@@ -315,53 +334,29 @@ def penalty_logic(obs, player_index):
 
 
 def is_main_set_piece_taker(obs, player_index, ball_pos):
-    """判断是否是主罚球员（距离球最近的球员）"""
-    player_pos = obs['left_team'][player_index]
-    player_distance = distance_to(player_pos, ball_pos)
-    
-    # 检查是否是距离球最近的球员
-    for i, pos in enumerate(obs['left_team']):
-        if i == player_index:
-            continue
-        
-        if distance_to(pos, ball_pos) < player_distance:
-            return False
-    
-    return True
+    """判断是否是主罚球员（距离球最近的球员，距离相同时只有一人主罚）"""
+    return get_press_assignment(obs).set_piece_taker == player_index
 
 
 def find_safest_goal_kick_target(obs, player_index):
     """为球门球寻找最安全的传球目标"""
-    player_pos = obs['left_team'][player_index]
-    safest_target = -1
-    max_safety = 0
+    obs = as_step_context(obs)
     
-    for i, teammate_pos in enumerate(obs['left_team']):
-        if i == player_index or not obs['left_team_active'][i]:
-            continue
-        
-        # 计算安全性（距离最近对手的距离）
-        min_distance_to_opponent = float('inf')
-        for opp_pos in obs['right_team']:
-            dist = distance_to(teammate_pos, opp_pos)
-            if dist < min_distance_to_opponent:
-                min_distance_to_opponent = dist
-        
-        if min_distance_to_opponent > max_safety:
-            max_safety = min_distance_to_opponent
-            safest_target = i
+    # 安全性 = 队友到最近对手的距离，排除自己和非活跃球员
+    safety = np.where(obs.left_team_active, obs.nearest_opponent_distance, -np.inf)
+    safety[player_index] = -np.inf
     
-    return safest_target
+    return first_argmax_above(safety, 0)
 
 
 def find_free_kick_target(obs, player_index):
     """为任意球寻找最佳传球目标"""
-    ball_pos = get_ball_info(obs)['position']
+    obs = as_step_context(obs)
     best_target = -1
     best_score = -1
     
-    for i, teammate_pos in enumerate(obs['left_team']):
-        if i == player_index or not obs['left_team_active'][i]:
+    for i, teammate_pos in enumerate(obs.left_team):
+        if i == player_index or not obs.left_team_active[i]:
             continue
         
         # 评分标准：距离球门近 + 距离对手远 + 在对方半场
@@ -372,7 +367,7 @@ def find_free_kick_target(obs, player_index):
         score += (1.0 - goal_distance) * 2
         
         # 距离对手越远越好
-        min_distance_to_opponent = min(distance_to(teammate_pos, opp_pos) for opp_pos in obs['right_team'])
+        min_distance_to_opponent = obs.nearest_opponent_distance[i]
         score += min_distance_to_opponent
         
         # 在对方半场加分
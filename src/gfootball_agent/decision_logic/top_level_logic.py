@@ -2,23 +2,29 @@
 顶层决策逻辑 - 根据游戏模式分发任务
 """
 
+import numpy as np
+
 from src.gfootball_agent.config import GameMode
-from src.gfootball_agent.decision_logic.normal_mode import normal_mode_decision
+from src.utils.step_context import as_step_context
+from src.utils.profiling import decision_node
+from src.gfootball_agent.decision_logic.normal_mode import normal_mode_decision, get_role_decision_masks
 from src.gfootball_agent.decision_logic.set_pieces import set_piece_decision
 
 
+@decision_node
 def get_player_action(obs, player_index):
     """
     顶层决策函数 - 根据当前游戏模式分发到对应的决策逻辑
     
     参数:
-        obs: 观测数据
+        obs: 本步的 StepContext（也接受原始观测数据）
         player_index: 球员索引
     
     返回:
         action: 球员应该执行的动作
     """
-    game_mode = obs['game_mode']
+    obs = as_step_context(obs)
+    game_mode = obs.game_mode
     
     # 根据游戏模式选择对应的决策逻辑
     if game_mode == GameMode.NORMAL:
@@ -26,4 +32,27 @@ def get_player_action(obs, player_index):
         return normal_mode_decision(obs, player_index)
     else:
         # 定位球模式（开球、球门球、任意球、角球、界外球、点球）
-        return set_piece_decision(obs, player_index) 
\ No newline at end of file
+        return set_piece_decision(obs, player_index)
+
+
+def get_decision_table(game_modes, roles):
+    """
+    批量计算每名球员使用的决策函数，替代逐个球员的 if 分发
+
+    参数:
+        game_modes: (B,) 每场比赛的游戏模式
+        roles: (B,11) 我方球员角色
+
+    返回:
+        (decisions, table): decisions 为决策函数列表，
+        table 为 (B,11) 整数数组，值为 decisions 中的下标
+    """
+    roles = np.asarray(roles)
+    normal = (np.asarray(game_modes) == GameMode.NORMAL)[:, None]
+
+    decisions = [set_piece_decision]
+    table = np.zeros(roles.shape, dtype=np.int64)
+    for decision, mask in get_role_decision_masks(roles):
+        decisions.append(decision)
+        table[normal & mask] = len(decisions) - 1
+    return decisions, table
@@ -0,0 +1,341 @@
+"""
+声明式决策树 - 用节点图描述角色逻辑，并编译成扁平的 Python 决策函数
+
+树由三类元素组成：
+    Feature   特征：从 (obs, player_index, ball_info, player_info) 和依赖的特征计算一个值，
+              声明代价 cost，供编译器排序
+    Condition 谓词：只读取声明的特征，返回布尔值；可用 All / Any / Not 组合
+    节点      If(条件, 成立分支, 不成立分支)、Leaf(动作)、Call(子决策函数)
+
+编译器把树展开成一个扁平的 Python 函数：
+    - 特征保存在局部变量中，每次决策最多计算一次；编译期能确定已计算的特征直接复用，
+      只在部分路径上算过的特征才在运行时检查
+    - All / Any 编译为短路的 and / or，谓词按“在当前路径上还需付出的特征代价”
+      从低到高排序，因此组合中的谓词必须无副作用、可以任意顺序求值
+    - 生成的函数没有解释开销，编译后的源码可通过 .source 查看
+"""
+
+from src.gfootball_agent.config import Action
+
+ACTION_NAMES = {value: name for name, value in vars(Action).items() if not name.startswith('_')}
+
+# 生成代码中表示“特征尚未计算”的标记
+_UNSET = object()
+
+
+class Feature:
+    """
+    特征节点
+
+    参数:
+        name: 特征名
+        fn: fn(obs, player_index, ball_info, player_info, *依赖特征的值)
+        requires: 依赖的特征名
+        cost: 计算代价（相对值，只用于排序）
+    """
+
+    def __init__(self, name, fn, requires=(), cost=1):
+        self.name = name
+        self.fn = fn
+        self.requires = tuple(requires)
+        self.cost = cost
+
+
+class Condition:
+    """谓词：test(*特征值) -> bool"""
+
+    def __init__(self, requires, test, name=None):
+        self.requires = (requires,) if isinstance(requires, str) else tuple(requires)
+        self.test = test
+        self.name = name or f"{getattr(test, '__name__', 'test')}({', '.join(self.requires)})"
+
+
+class All:
+    """所有谓词都成立（按代价从低到高短路求值）"""
+
+    def __init__(self, *terms):
+        self.terms = terms
+
+
+class Any:
+    """任一谓词成立（按代价从低到高短路求值）"""
+
+    def __init__(self, *terms):
+        self.terms = terms
+
+
+class Not:
+    """谓词取反"""
+
+    def __init__(self, term):
+        self.term = term
+
+
+class If:
+    """分支节点"""
+
+    def __init__(self, condition, then, otherwise):
+        self.condition = condition
+        self.then = then
+        self.otherwise = otherwise
+
+
+class Leaf:
+    """叶子节点：返回固定动作"""
+
+    def __init__(self, action):
+        self.action = action
+
+
+class Call:
+    """叶子节点：调用子决策函数 fn(obs, player_index, ball_info, player_info)"""
+
+    def __init__(self, fn, name=None):
+        self.fn = fn
+        self.name = name or getattr(fn, '__name__', 'call')
+
+
+def _term_name(term):
+    if isinstance(term, Condition):
+        return term.name
+    if isinstance(term, Not):
+        return f"not {_term_name(term.term)}"
+    joiner = ' and ' if isinstance(term, All) else ' or '
+    return '(' + joiner.join(_term_name(t) for t in term.terms) + ')'
+
+
+def _term_requires(term):
+    if isinstance(term, Condition):
+        return set(term.requires)
+    if isinstance(term, Not):
+        return _term_requires(term.term)
+    requires = set()
+    for t in term.terms:
+        requires |= _term_requires(t)
+    return requires
+
+
+class DecisionTree:
+    """
+    可编译的声明式决策树
+
+    参数:
+        name: 生成的决策函数名
+        features: Feature 列表
+        root: 根节点
+    """
+
+    ARGS = 'obs, player_index, ball_info, player_info'
+
+    def __init__(self, name, features, root):
+        self.name = name
+        self.features = {feature.name: feature for feature in features}
+        self.root = root
+        self.source = None
+
+    # ===================== 代价 =====================
+
+    def _closure(self, names, known):
+        """names 及其传递依赖中尚未计算的特征"""
+        missing = set()
+        stack = list(names)
+        while stack:
+            name = stack.pop()
+            if name in known or name in missing:
+                continue
+            missing.add(name)
+            stack.extend(self.features[name].requires)
+        return missing
+
+    def _cost(self, term, known):
+        return sum(self.features[name].cost for name in self._closure(_term_requires(term), known))
+
+    # ===================== 代码生成 =====================
+
+    def compile(self):
+        """编译为决策函数 fn(obs, player_index, ball_info, player_info)"""
+        self._namespace = {'_UNSET': _UNSET}
+        self._counter = 0
+        self._guarded = set()
+        body = self._emit_node(self.root, frozenset(), frozenset(), 1)
+
+        # 只在部分路径上计算过的特征需要先置为未计算
+        init = [f"    f_{name} = _UNSET" for name in sorted(self._guarded)]
+        lines = [f"def {self.name}({self.ARGS}):"] + init + body
+        self.source = '\n'.join(lines) + '\n'
+
+        code = compile(self.source, f"<decision_tree:{self.name}>", 'exec')
+        exec(code, self._namespace)
+        function = self._namespace[self.name]
+        function.source = self.source
+        function.tree = self
+        return function
+
+    def _bind(self, prefix, value):
+        """把 Python 对象放进生成代码的命名空间，返回其名字"""
+        self._counter += 1
+        name = f"_{prefix}{self._counter}"
+        self._namespace[name] = value
+        return name
+
+    def _feature_call(self, name, dependency_exprs):
+        feature = self.features[name]
+        fn_name = self._bind('f', feature.fn)
+        return f"{fn_name}({', '.join([self.ARGS] + dependency_exprs)})"
+
+    def _feature_expr(self, name, known, maybe):
+        """
+        生成读取特征的表达式（必要时就地计算并赋值），
+        返回 (表达式, 求值后的已知集合, 可能已计算集合)
+        """
+        if name in known:
+            return f"f_{name}", known, maybe
+
+        dependency_exprs = []
+        for dependency in self.features[name].requires:
+            expr, known, maybe = self._feature_expr(dependency, known, maybe)
+            dependency_exprs.append(expr)
+        call = self._feature_call(name, dependency_exprs)
+
+        if name in maybe:
+            # 只在部分路径上计算过，运行时检查
+            self._guarded.add(name)
+            expr = f"(f_{name} if f_{name} is not _UNSET else (f_{name} := {call}))"
+        else:
+            expr = f"(f_{name} := {call})"
+        return expr, known | {name}, maybe | {name}
+
+    def _ensure_statements(self, names, known, maybe, indent):
+        """在判断前以赋值语句计算一定会用到的特征"""
+        lines = []
+        pad = '    ' * indent
+        for name in names:
+            if name in known:
+                continue
+            known, maybe, new_lines = self._ensure_statement(name, known, maybe, pad)
+            lines.extend(new_lines)
+        return lines, known, maybe
+
+    def _ensure_statement(self, name, known, maybe, pad):
+        lines = []
+        for dependency in self.features[name].requires:
+            if dependency not in known:
+                known, maybe, dependency_lines = self._ensure_statement(dependency, known, maybe, pad)
+                lines.extend(dependency_lines)
+        if name not in known:
+            call = self._feature_call(name, [f"f_{dep}" for dep in self.features[name].requires])
+            if name in maybe:
+                self._guarded.add(name)
+                lines.append(pad + f"if f_{name} is _UNSET:")
+                lines.append(pad + f"    f_{name} = {call}")
+            else:
+                lines.append(pad + f"f_{name} = {call}")
+            known = known | {name}
+            maybe = maybe | {name}
+        return known, maybe, lines
+
+    def _condition_expr(self, term, known, maybe, negate=False):
+        """
+        生成条件表达式
+
+        返回:
+            (表达式, 条件为真时一定已计算的特征, 条件为假时一定已计算的特征, 可能已计算的特征)
+        """
+        if isinstance(term, Not):
+            return self._condition_expr(term.term, known, maybe, not negate)
+
+        if isinstance(term, Condition):
+            exprs = []
+            for name in term.requires:
+                expr, known, maybe = self._feature_expr(name, known, maybe)
+                exprs.append(expr)
+            test_name = self._bind('t', term.test)
+            expr = f"{test_name}({', '.join(exprs)})"
+            if negate:
+                expr = f"not {expr}"
+            return expr, known, known, maybe
+
+        # 取反时按德摩根定律把 Not 下推到谓词
+        is_all = isinstance(term, All) != negate
+        parts = []
+        remaining = list(term.terms)
+        current = known
+        true_known = known
+        false_known = known
+        first = True
+        while remaining:
+            # 在当前路径上按还需付出的代价选下一个谓词
+            remaining.sort(key=lambda t: self._cost(t, current))
+            sub = remaining.pop(0)
+            expr, sub_true, sub_false, maybe = self._condition_expr(sub, current, maybe, negate)
+            parts.append(expr)
+            if is_all:
+                # 继续求值意味着前面的谓词都为真
+                current = sub_true
+                true_known = sub_true
+                if first:
+                    false_known = sub_false
+            else:
+                current = sub_false
+                false_known = sub_false
+                if first:
+                    true_known = sub_true
+            first = False
+
+        joiner = ' and ' if is_all else ' or '
+        return '(' + joiner.join(parts) + ')', true_known, false_known, maybe
+
+    def _emit_node(self, node, known, maybe, indent):
+        pad = '    ' * indent
+        if isinstance(node, Leaf):
+            comment = ACTION_NAMES.get(node.action, '')
+            return [pad + f"return {node.action!r}" + (f"  # {comment}" if comment else '')]
+        if isinstance(node, Call):
+            fn_name = self._bind('call', node.fn)
+            return [pad + f"return {fn_name}({self.ARGS})  # {node.name}"]
+        if not isinstance(node, If):
+            raise TypeError(f"未知的决策树节点: {node!r}")
+
+        # 条件中第一个被求值的谓词一定会执行，它的特征提前用赋值语句计算
+        first = self._first_term(node.condition, known)
+        lines, known, maybe = self._ensure_statements(
+            sorted(self._closure(_term_requires(first), known)), known, maybe, indent
+        ) if first is not None else ([], known, maybe)
+
+        expr, true_known, false_known, maybe = self._condition_expr(node.condition, known, maybe)
+        if expr.startswith('(') and expr.endswith(')') and isinstance(node.condition, (All, Any)):
+            expr = expr[1:-1]
+        lines.append(pad + f"if {expr}:  # {_term_name(node.condition)}")
+        lines.extend(self._emit_node(node.then, true_known, maybe, indent + 1))
+        lines.extend(self._emit_node(node.otherwise, false_known, maybe, indent))
+        return lines
+
+    def _first_term(self, term, known):
+        """组合条件中第一个被求值的谓词"""
+        while isinstance(term, (All, Any, Not)):
+            if isinstance(term, Not):
+                term = term.term
+                continue
+            term = min(term.terms, key=lambda t: self._cost(t, known))
+        return term
+
+    # ===================== 查看结构 =====================
+
+    def describe(self):
+        """以缩进文本描述树结构"""
+        lines = []
+
+        def visit(node, indent):
+            pad = '  ' * indent
+            if isinstance(node, Leaf):
+                lines.append(pad + f"-> {ACTION_NAMES.get(node.action, node.action)}")
+            elif isinstance(node, Call):
+                lines.append(pad + f"-> {node.name}()")
+            else:
+                lines.append(pad + f"if {_term_name(node.condition)}:")
+                visit(node.then, indent + 1)
+                lines.append(pad + "else:")
+                visit(node.otherwise, indent + 1)
+
+        visit(self.root, 0)
+        return '\n'.join(lines)
@@ -0,0 +1,164 @@
+"""
+压迫分配 - 每步为全队一次性决定谁去抢球
+
+原来每名球员各自判断自己是否上抢/争抢，每个判断都扫描一遍全队，
+而且后卫、中场、前锋可能同时冲向球。这里每步只做一次：
+先按各角色原有的规则筛出有资格去抢球的球员，再按到球的预计到达时间
+（乘以角色代价）排序，前几名分别担任 presser / cover，其余球员为 support。
+各角色的上抢、争抢和定位球主罚判断都读取这份分配。
+"""
+
+import numpy as np
+
+from src.gfootball_agent.config import Distance, PlayerRole
+from src.gfootball_agent.role_registry import get_role_registry
+from src.utils.features import is_ball_in_penalty_area, is_in_opponent_half
+from src.utils.space_grid import PLAYER_MAX_SPEED, REACTION_STEPS
+from src.utils.step_context import as_step_context
+
+# 分配结果
+PRESSER = 0  # 第一个冲向球的球员
+COVER = 1    # 第二个到球的球员
+SUPPORT = 2  # 其余球员，按角色逻辑站位
+
+DEFENDER_ROLES = [PlayerRole.CENTRE_BACK, PlayerRole.LEFT_BACK, PlayerRole.RIGHT_BACK]
+# 判断"离球最近的中场"时参与比较的角色（与原 is_closest_midfielder_to_ball 一致，不含防守中场）
+MIDFIELDER_ROLES = [PlayerRole.CENTRAL_MIDFIELD, PlayerRole.LEFT_MIDFIELD,
+                    PlayerRole.RIGHT_MIDFIELD, PlayerRole.ATTACK_MIDFIELD]
+
+# 同时冲向球的人数上限：对方控球时只派一人上抢，无人控球时两人争抢
+MAX_PRESSERS = 1
+MAX_CONTENDERS = 2
+
+# 各角色组去抢球的代价系数，乘在预计到达步数上（越大越不愿意离开位置）
+# 守门员的代价较高：球在己方禁区内无人控球时，若后卫/中场有两人预计比守门员
+# （按 1.5 倍计）先到球，守门员不出击而是留在门前站位，由他们去争抢
+PRESS_COST = {
+    'goalkeeper': 1.5,
+    'defender': 1.2,
+    'midfielder': 1.0,
+    'forward': 1.0,
+}
+
+
+class PressAssignment:
+    """
+    一步内的全队抢球分配
+
+    chasers: 有资格抢球的球员按代价（预计到达步数 × 角色代价）排序后的索引
+    arrival_steps: chasers 中每名球员到球的预计步数（与 space_grid 的控球权模型一致）
+    set_piece_taker: 定位球主罚球员（离球最近，距离相同时取索引小的）
+    """
+
+    def __init__(self, ctx):
+        self.owned_team = ctx['ball_owned_team']
+        distances = ctx.ball_distances
+
+        groups, role_cost = get_press_groups(ctx)
+        candidates = np.flatnonzero(self._eligible(ctx, groups) & ctx.left_team_active)
+
+        # 预计到达步数：先按当前速度惯性移动 REACTION_STEPS 步，再全速直线跑向球
+        positions = ctx.left_team[candidates, :2]
+        directions = ctx.get('left_team_direction')
+        if directions is not None:
+            positions = positions + np.asarray(directions, dtype=float)[candidates, :2] * REACTION_STEPS
+        offsets = positions - ctx.ball_position[:2]
+        self.arrival_steps = REACTION_STEPS + np.hypot(offsets[:, 0], offsets[:, 1]) / PLAYER_MAX_SPEED
+
+        order = np.argsort(self.arrival_steps * role_cost[candidates], kind='stable')
+        self.chasers = candidates[order].tolist()
+        self.arrival_steps = self.arrival_steps[order]
+
+        limit = MAX_PRESSERS if self.owned_team == 1 else MAX_CONTENDERS
+        self._roles = {player_index: PRESSER if rank == 0 else COVER
+                       for rank, player_index in enumerate(self.chasers[:limit])}
+
+        self.set_piece_taker = int(distances.argmin()) if len(distances) else -1
+
+    def _eligible(self, ctx, groups):
+        """各角色原有的抢球条件"""
+        distances = ctx.ball_distances
+        ball = ctx.ball_position
+
+        def closest_in(mask, reference=None):
+            # 组内比 reference 中其他球员都离球近的球员（默认与组内比较，距离相同时都算）
+            reference = mask if reference is None else reference
+            if not mask.any() or not reference.any():
+                return mask
+            return mask & (distances <= distances[reference].min())
+
+        defender = groups['defender']
+        midfielder = groups['midfielder']
+        forward = groups['forward']
+
+        if self.owned_team == 1:
+            # 对方控球：最近的后卫/中场在压迫距离内上抢，前锋在对方后场就近逼抢
+            eligible = ((closest_in(defender) & (distances < Distance.PRESSURE_DISTANCE * 2)) |
+                        (closest_in(midfielder, groups['closest_midfielder']) &
+                         (distances < Distance.PRESSURE_DISTANCE * 1.5)))
+            if ball[0] < -0.3:
+                eligible = eligible | (forward & (distances < 0.2))
+            return eligible
+
+        if self.owned_team == -1:
+            # 无人控球：守门员只争抢禁区内的球，前锋只争抢前场的球
+            eligible = closest_in(defender) | closest_in(midfielder, groups['closest_midfielder'])
+            if is_ball_in_penalty_area(ball):
+                eligible = eligible | groups['goalkeeper']
+            if is_in_opponent_half(ball):
+                eligible = eligible | closest_in(forward)
+            return eligible
+
+        return np.zeros(len(distances), dtype=bool)
+
+    @property
+    def presser(self):
+        """第一个冲向球的球员，没有时为 -1"""
+        return self.chasers[0] if self.chasers else -1
+
+    def role_of(self, player_index):
+        """该球员的分配结果 PRESSER / COVER / SUPPORT"""
+        return self._roles.get(player_index, SUPPORT)
+
+    def goes_to_ball(self, player_index):
+        """该球员本步是否冲向球（PRESSER 或 COVER）"""
+        return player_index in self._roles
+
+
+def get_press_groups(obs):
+    """
+    按角色决策分发规则把球员分组（未知角色归入中场），并给出每名球员的角色代价
+
+    另有 closest_midfielder: 判断中场是否离球最近时参与比较的球员（MIDFIELDER_ROLES）
+
+    结果随角色注册表按局缓存
+    """
+    registry = get_role_registry(obs)
+    cached = registry.cache.get('press_groups')
+    if cached is None:
+        goalkeeper = registry.mask([PlayerRole.GOALKEEPER])
+        defender = registry.mask(DEFENDER_ROLES)
+        forward = registry.mask([PlayerRole.CENTRAL_FORWARD])
+        groups = {
+            'goalkeeper': goalkeeper,
+            'defender': defender,
+            'midfielder': ~(goalkeeper | defender | forward),
+            'forward': forward,
+            'closest_midfielder': registry.mask(MIDFIELDER_ROLES),
+        }
+        role_cost = np.zeros(len(registry.roles))
+        for name, cost in PRESS_COST.items():
+            role_cost[groups[name]] = cost
+        cached = (groups, role_cost)
+        registry.cache['press_groups'] = cached
+    return cached
+
+
+def get_press_assignment(obs):
+    """获取本步的抢球分配（每步只计算一次）"""
+    ctx = as_step_context(obs)
+    assignment = ctx.cache.get('press_assignment')
+    if assignment is None:
+        assignment = PressAssignment(ctx)
+        ctx.cache['press_assignment'] = assignment
+    return assignment
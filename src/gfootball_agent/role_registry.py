@@ -0,0 +1,109 @@
+"""
+角色注册表 - 按局维护 角色组 -> 球员索引 的映射表
+
+角色和场上状态（红牌下场）只在少数时刻变化，注册表在第一次观测时构建，
+之后只有 left_team_roles 或 left_team_active 变化时才重建。
+每步的按角色筛选变成数组下标，"角色组内离球最近" 这类查询每步每组只做一次 argmin。
+"""
+
+import numpy as np
+
+
+class RoleRegistry:
+    """
+    我方球员的角色索引表
+
+    indices(roles) / mask(roles) 的结果按角色组缓存到下次重建，
+    返回的数组在调用方之间共享，不能原地修改。
+    cache 供其他模块保存随角色变化的派生表（如每名球员的分发函数）。
+    """
+
+    def __init__(self):
+        self.roles = None
+        self.active = None
+        self.version = 0
+        self.cache = {}
+
+    def update(self, roles, active):
+        """
+        用本步的角色和场上状态刷新注册表
+
+        返回:
+            是否发生了重建
+        """
+        roles = np.asarray(roles)
+        active = np.asarray(active, dtype=bool)
+        if (self.roles is not None and np.array_equal(roles, self.roles)
+                and np.array_equal(active, self.active)):
+            return False
+
+        self.roles = roles.copy()
+        self.active = active.copy()
+        self.version += 1
+        self.cache = {}
+        return True
+
+    def reset(self):
+        """清空注册表，下一次观测时重建"""
+        self.roles = None
+        self.active = None
+        self.cache = {}
+
+    def mask(self, roles):
+        """球员角色是否属于给定角色组的布尔数组"""
+        key = ('mask', tuple(roles))
+        mask = self.cache.get(key)
+        if mask is None:
+            mask = np.zeros(len(self.roles), dtype=bool)
+            for role in roles:
+                mask |= self.roles == role
+            self.cache[key] = mask
+        return mask
+
+    def indices(self, roles, active_only=False):
+        """角色属于给定角色组的球员索引数组"""
+        key = ('indices', tuple(roles), active_only)
+        indices = self.cache.get(key)
+        if indices is None:
+            mask = self.mask(roles)
+            if active_only:
+                mask = mask & self.active
+            indices = np.flatnonzero(mask)
+            self.cache[key] = indices
+        return indices
+
+
+def get_role_registry(obs):
+    """
+    获取观测对应的角色注册表
+
+    FootballAgent 每步把自己维护的注册表挂到 StepContext 上；
+    单独调用决策函数时为该步临时构建一个。
+    """
+    registry = getattr(obs, 'role_registry', None)
+    if registry is None:
+        registry = RoleRegistry()
+        registry.update(obs.left_team_roles, obs.left_team_active)
+        obs.role_registry = registry
+    return registry
+
+
+def closest_to_ball(obs, roles):
+    """
+    角色组内离球最近的球员（本步内缓存）
+
+    返回:
+        (player_index, distance)，角色组为空时为 (-1, inf)
+    """
+    key = ('closest_to_ball', tuple(roles))
+    result = obs.cache.get(key)
+    if result is None:
+        indices = get_role_registry(obs).indices(roles)
+        if len(indices) == 0:
+            result = (-1, float('inf'))
+        else:
+            distances = obs.ball_distances[indices]
+            closest = int(distances.argmin())
+            result = (int(indices[closest]), distances[closest])
+        obs.cache[key] = result
+    return result
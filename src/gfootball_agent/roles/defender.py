@@ -2,19 +2,36 @@
 后卫的决策逻辑
 """ 
 
+import numpy as np
+
 from src.utils.features import (
     get_ball_info, get_player_info, distance_to, 
     get_defensive_position, find_closest_teammate,
     find_closest_opponent, get_best_pass_target,
     get_movement_direction, is_player_tired,
-    is_in_opponent_half, can_shoot, debug_field_visualization
+    is_in_opponent_half, can_shoot, debug_field_visualization,
+    is_safe_to_clear_ball
 )
+from src.utils.line_model import get_line_model
+from src.utils.pass_lanes import get_pass_table
+from src.utils.step_context import as_step_context
+from src.utils.profiling import decision_node
 from src.utils.actions import action_manager, validate_action_for_situation
 from src.gfootball_agent.config import Action, Distance, Field, PlayerRole, Tactics
+from src.gfootball_agent.decision_tree import All, Any, Call, Condition, DecisionTree, If, Leaf
+from src.gfootball_agent.pressing import get_press_assignment
+from src.gfootball_agent.role_registry import get_role_registry
+from src.gfootball_agent.roles.tree_features import (
+    WITH_BALL_FEATURES, UNDER_PRESSURE, HAS_DRIBBLE_SPACE, HAS_PASS_TARGET, NO_PASS_TARGET,
+    SHORT_PASS_DISTANCE, space_greater_than, pass_progress_greater_than, small_pass_progress,
+    role_in, wide_position
+)
 
 
+@decision_node
 def defender_decision(obs, player_index):
     """后卫决策逻辑"""
+    obs = as_step_context(obs)
     ball_info = get_ball_info(obs)
     player_info = get_player_info(obs, player_index)
     ball_owned_team = ball_info['owned_team']
@@ -28,6 +45,7 @@ def defender_decision(obs, player_index):
         return defender_contention_logic(obs, player_index, ball_info, player_info)
 
 
+@decision_node
 def defender_offensive_logic(obs, player_index, ball_info, player_info):
     """后卫进攻逻辑"""
     player_pos = player_info['position']
@@ -46,143 +64,65 @@ def defender_offensive_logic(obs, player_index, ball_info, player_info):
         return defender_support_movement(obs, player_index, player_info)
 
 
-def defender_with_ball_logic(obs, player_index, ball_info, player_info):
-    """后卫持球时的决策逻辑 - 优化版本，优先考虑盘带"""
-    player_pos = player_info['position']
-    player_role = player_info['role']
-    
-    # 检查是否被对手逼抢
-    closest_opponent_idx, closest_opponent_dist = find_closest_opponent(obs, player_index)
-    
+# 持球决策树 - 优化版本，优先考虑盘带
+_defender_dribble = Call(lambda obs, i, ball_info, player_info:
+                         defender_dribble_forward(obs, i, player_info),
+                         name='defender_dribble_forward')
+
+DEFENDER_WITH_BALL_TREE = DecisionTree('defender_with_ball_tree', WITH_BALL_FEATURES, If(
     # 如果被紧逼，优先安全出球
-    if closest_opponent_dist < Distance.PRESSURE_DISTANCE:
-        return defender_under_pressure(obs, player_index, ball_info, player_info)
-    
-    # 优先检查前方是否有盘带空间
-    from src.utils.features import check_dribble_space
-    has_dribble_space, space_distance = check_dribble_space(obs, player_index)
-    
-    # 如果前方有空间且不在危险区域，优先盘带
-    danger_zone_x = Field.LEFT_GOAL_X + 0.15  # 禁区附近为危险区域
-    if has_dribble_space and player_pos[0] > danger_zone_x:
-        # 检查盘带是否比传球更有价值
-        best_target = get_best_pass_target(obs, player_index)
-        
-        should_dribble = False
-        
-        if best_target == -1:
+    UNDER_PRESSURE, Call(lambda obs, i, ball_info, player_info:
+                         defender_under_pressure(obs, i, ball_info, player_info),
+                         name='defender_under_pressure'), If(
+    # 前方有空间且不在危险区域（禁区附近）时，比较盘带和传球的价值
+    All(HAS_DRIBBLE_SPACE,
+        Condition('player_pos', lambda pos: pos[0] > Field.LEFT_GOAL_X + 0.15, name='outside_danger_zone'),
+        Any(
             # 没有好的传球选择，果断盘带
-            should_dribble = True
-        else:
-            # 比较盘带和传球的价值
-            target_pos = obs['left_team'][best_target]
-            forward_progress_pass = target_pos[0] - player_pos[0]
-            
-            # 如果传球的前进幅度不大，优先盘带
-            if forward_progress_pass < 0.12:  # 传球前进不明显
-                should_dribble = True
-            
+            NO_PASS_TARGET,
+            # 传球前进不明显
+            small_pass_progress(0.12),
             # 边后卫在边路有空间时，积极盘带助攻
-            if player_role in [PlayerRole.LEFT_BACK, PlayerRole.RIGHT_BACK]:
-                if abs(player_pos[1]) > 0.15 and space_distance > 0.08:
-                    should_dribble = True
-        
-        if should_dribble:
-            return defender_dribble_forward(obs, player_index, player_info)
-    
+            All(role_in([PlayerRole.LEFT_BACK, PlayerRole.RIGHT_BACK], 'full_back'),
+                wide_position(0.15), space_greater_than(0.08)),
+        )), _defender_dribble, If(
     # 寻找最佳传球目标
-    best_target = get_best_pass_target(obs, player_index)
-
-    # debug_field_visualization(obs, title="后卫持球时的决策逻辑")
-    
-    if best_target != -1:
-        target_pos = obs['left_team'][best_target]
-        pass_distance = distance_to(player_pos, target_pos)
-        target_role = obs['left_team_roles'][best_target]
-        
-        # 优先向前传球
-        forward_progress = target_pos[0] - player_pos[0]
-        
-        if forward_progress > 0.1:  # 显著向前的传球
-            if pass_distance < Distance.SHORT_PASS_RANGE:
-                return Action.SHORT_PASS
-            else:
-                return Action.HIGH_PASS  # 高球传向前场
-        elif pass_distance < Distance.SHORT_PASS_RANGE:
-            # 横传或回传
-            return Action.SHORT_PASS
-    
+    HAS_PASS_TARGET, If(
+        # 显著向前的传球，远距离用高球
+        pass_progress_greater_than(0.1),
+        If(SHORT_PASS_DISTANCE, Leaf(Action.SHORT_PASS), Leaf(Action.HIGH_PASS)),
+        # 横传或回传
+        If(SHORT_PASS_DISTANCE, Leaf(Action.SHORT_PASS), _defender_dribble)),
     # 没有好的传球选择，带球前进寻找机会
-    return defender_dribble_forward(obs, player_index, player_info)
+    _defender_dribble))))
+
+_defender_with_ball = DEFENDER_WITH_BALL_TREE.compile()
+
+
+@decision_node
+def defender_with_ball_logic(obs, player_index, ball_info, player_info):
+    """后卫持球时的决策逻辑（见 DEFENDER_WITH_BALL_TREE）"""
+    return _defender_with_ball(obs, player_index, ball_info, player_info)
 
 
+@decision_node
 def defender_under_pressure(obs, player_index, ball_info, player_info):
     """后卫被逼抢时的处理 - 优化版本，避免乌龙球"""
     player_pos = player_info['position']
     
     # 首先检查是否在危险区域，应该解围
-    from src.utils.features import is_safe_to_clear_ball
     if is_safe_to_clear_ball(obs, player_index):
         # 解围到对方半场边路
         return Action.HIGH_PASS  # 高球解围
     
     # 寻找安全的传球目标，严格避免乌龙球
-    best_target = -1
-    best_score = -1
-    
-    for i, teammate_pos in enumerate(obs['left_team']):
-        if i == player_index or not obs['left_team_active'][i]:
-            continue
-        
-        teammate_role = obs['left_team_roles'][i]
-        
-        # 计算安全评分
-        score = 0
-        
-        # 1. 绝对不传给守门员（除非自己是守门员）
-        if teammate_role == PlayerRole.GOALKEEPER and player_info['role'] != PlayerRole.GOALKEEPER:
-            continue
-        
-        # 2. 绝对不传给比自己更接近球门的队友
-        teammate_to_goal_dist = distance_to(teammate_pos, [Field.LEFT_GOAL_X, Field.CENTER_Y])
-        player_to_goal_dist = distance_to(player_pos, [Field.LEFT_GOAL_X, Field.CENTER_Y])
-        
-        if teammate_to_goal_dist <= player_to_goal_dist + 0.02:
-            continue  # 跳过太接近球门的队友
-        
-        # 3. 队友距离对手的远近（安全性）
-        closest_opp_to_teammate, dist_to_opp = find_closest_opponent(obs, i)
-        score += dist_to_opp * 5  # 距离对手越远越安全
-        
-        # 4. 队友距离球门越远越安全
-        score += teammate_to_goal_dist * 3
-        
-        # 5. 优先传给边路队友（边路相对安全）
-        if abs(teammate_pos[1]) > 0.2:
-            score += 1.0
-        
-        # 6. 不要传给Y位置太接近的队友（可能造成拥挤）
-        if abs(teammate_pos[1] - player_pos[1]) < 0.1:
-            score -= 0.5
-        
-        # 7. 传球距离不能太远（紧急情况）
-        pass_distance = distance_to(player_pos, teammate_pos)
-        if pass_distance > Distance.SHORT_PASS_RANGE * 1.5:
-            score -= 1.0
-        
-        # 8. 检查传球路线
-        from src.utils.features import check_pass_path_clear
-        if not check_pass_path_clear(player_pos, teammate_pos, obs['right_team']):
-            score -= 2.0  # 路线不清晰严重扣分
-        
-        if score > best_score:
-            best_score = score
-            best_target = i
+    # 评分规则见 pass_lanes.PassTable：不传给守门员和更接近球门的队友，
+    # 优先远离对手、远离球门的边路队友，路线不清晰严重扣分
+    best_target, best_score = get_pass_table(obs).under_pressure_target(player_index)
     
     # 有安全的传球目标
     if best_target != -1 and best_score > 0:
-        target_pos = obs['left_team'][best_target]
-        pass_distance = distance_to(player_pos, target_pos)
+        pass_distance = obs.team_distances[player_index, best_target]
         
         if pass_distance < Distance.SHORT_PASS_RANGE:
             return Action.SHORT_PASS
@@ -193,6 +133,7 @@ def defender_under_pressure(obs, player_index, ball_info, player_info):
     return Action.HIGH_PASS  # 高球解围到前场
 
 
+@decision_node
 def defender_dribble_forward(obs, player_index, player_info):
     """后卫带球前进"""
     player_pos = player_info['position']
@@ -216,7 +157,7 @@ def defender_dribble_forward(obs, player_index, player_info):
     target_pos = [target_x, target_y]
     
     # 开始盘带
-    current_sticky = obs['sticky_actions']
+    current_sticky = obs.sticky_actions[player_index]
     if not current_sticky[9]:  # 没有在盘带
         return Action.DRIBBLE
     
@@ -228,6 +169,7 @@ def defender_dribble_forward(obs, player_index, player_info):
     return Action.IDLE
 
 
+@decision_node
 def defender_defensive_logic(obs, player_index, ball_info, player_info):
     """后卫防守逻辑"""
     ball_pos = ball_info['position']
@@ -260,13 +202,14 @@ def defender_defensive_logic(obs, player_index, ball_info, player_info):
     return Action.IDLE
 
 
+@decision_node
 def defender_pressure_logic(obs, player_index, ball_info, player_info):
     """后卫上抢逻辑"""
     ball_pos = ball_info['position']
     player_pos = player_info['position']
     
     # 计算到球的距离
-    distance_to_ball = distance_to(player_pos, ball_pos)
+    distance_to_ball = obs.ball_distances[player_index]
     
     # 如果非常接近球，尝试铲球
     if distance_to_ball < Distance.BALL_VERY_CLOSE:
@@ -290,16 +233,17 @@ def defender_pressure_logic(obs, player_index, ball_info, player_info):
     return Action.IDLE
 
 
+@decision_node
 def defender_contention_logic(obs, player_index, ball_info, player_info):
     """后卫争抢逻辑（无人控球时）"""
     ball_pos = ball_info['position']
     player_pos = player_info['position']
     
     # 计算到球的距离
-    distance_to_ball = distance_to(player_pos, ball_pos)
+    distance_to_ball = obs.ball_distances[player_index]
     
-    # 检查是否是最接近球的后卫
-    if is_closest_defender_to_ball(obs, player_index, ball_pos):
+    # 检查是否被分配去争抢（见 pressing.PressAssignment）
+    if get_press_assignment(obs).goes_to_ball(player_index):
         # 积极争抢球
         if distance_to_ball < Distance.BALL_CLOSE:
             movement_action = get_movement_direction(player_pos, ball_pos)
@@ -341,6 +285,7 @@ def should_defender_attack(obs, player_index, player_role):
     return check_flank_needs_support(obs, player_index, player_role)
 
 
+@decision_node
 def defender_attacking_movement(obs, player_index, player_info):
     """后卫前插助攻的移动"""
     player_pos = player_info['position']
@@ -367,14 +312,18 @@ def defender_attacking_movement(obs, player_index, player_info):
     return Action.IDLE
 
 
+@decision_node
 def defender_support_movement(obs, player_index, player_info):
     """后卫支援移动（保持安全位置）"""
     player_pos = player_info['position']
     ball_info = get_ball_info(obs)
     ball_pos = ball_info['position']
     
-    # 保持在安全的支援位置
+    # 保持在安全的支援位置，并与后卫线齐平，不单独前压
     target_x = max(ball_pos[0] - 0.15, Field.LEFT_GOAL_X + 0.2)
+    own_line_x = get_line_model(obs).own_line_x
+    if own_line_x is not None:
+        target_x = min(target_x, own_line_x + Tactics.LINE_HOLD_MARGIN)
     target_y = player_pos[1]  # 保持当前Y位置
     
     target_pos = [target_x, target_y]
@@ -387,72 +336,25 @@ def defender_support_movement(obs, player_index, player_info):
 
 
 def should_defender_pressure(obs, player_index, ball_pos):
-    """判断后卫是否应该上抢"""
-    player_pos = obs['left_team'][player_index]
-    
-    # 检查是否是离球最近的后卫
-    min_distance = float('inf')
-    closest_defender = -1
-    
-    for i, pos in enumerate(obs['left_team']):
-        role = obs['left_team_roles'][i]
-        if role in [PlayerRole.CENTRE_BACK, PlayerRole.LEFT_BACK, PlayerRole.RIGHT_BACK]:
-            dist = distance_to(pos, ball_pos)
-            if dist < min_distance:
-                min_distance = dist
-                closest_defender = i
-    
-    return closest_defender == player_index and min_distance < Distance.PRESSURE_DISTANCE * 2
-
-
-def is_closest_defender_to_ball(obs, player_index, ball_pos):
-    """判断是否是离球最近的后卫"""
-    player_pos = obs['left_team'][player_index]
-    player_distance = distance_to(player_pos, ball_pos)
-    
-    for i, pos in enumerate(obs['left_team']):
-        if i == player_index:
-            continue
-        
-        role = obs['left_team_roles'][i]
-        if role in [PlayerRole.CENTRE_BACK, PlayerRole.LEFT_BACK, PlayerRole.RIGHT_BACK]:
-            if distance_to(pos, ball_pos) < player_distance:
-                return False
-    
-    return True
+    """判断后卫是否应该上抢（离球最近且在压迫距离内的后卫参与全队分配）"""
+    return get_press_assignment(obs).goes_to_ball(player_index)
 
 
 def count_centre_backs_in_position(obs):
-    """统计在位的中后卫数量"""
-    count = 0
-    for i, pos in enumerate(obs['left_team']):
-        role = obs['left_team_roles'][i]
-        if role == PlayerRole.CENTRE_BACK:
-            # 检查是否在合理的防守位置
-            if pos[0] < Tactics.MID_BLOCK_X_THRESHOLD:
-                count += 1
-    return count
+    """统计在位的中后卫数量（位于中场防守线以内，见 line_model.LineModel）"""
+    return get_line_model(obs).centre_backs_in_position
 
 
 def check_flank_needs_support(obs, player_index, player_role):
     """检查边路是否需要支援"""
-    # 简化判断：检查该边路的中场球员位置
-    player_pos = obs['left_team'][player_index]
+    obs = as_step_context(obs)
     
+    # 简化判断：检查该边路的中场球员位置
     if player_role == PlayerRole.LEFT_BACK:
-        # 检查左中场位置
-        for i, pos in enumerate(obs['left_team']):
-            role = obs['left_team_roles'][i]
-            if role == PlayerRole.LEFT_MIDFIELD:
-                # 如果左中场前压很多，边后卫可以考虑支援
-                if pos[0] > Tactics.ATTACK_X_THRESHOLD:
-                    return True
+        flank_role = PlayerRole.LEFT_MIDFIELD
     else:  # RIGHT_BACK
-        # 检查右中场位置
-        for i, pos in enumerate(obs['left_team']):
-            role = obs['left_team_roles'][i]
-            if role == PlayerRole.RIGHT_MIDFIELD:
-                if pos[0] > Tactics.ATTACK_X_THRESHOLD:
-                    return True
-    
-    return False 
\ No newline at end of file
+        flank_role = PlayerRole.RIGHT_MIDFIELD
+    
+    # 如果边路中场前压很多，边后卫可以考虑支援
+    flank_midfielders = get_role_registry(obs).indices([flank_role])
+    return bool((obs.left_team[flank_midfielders, 0] > Tactics.ATTACK_X_THRESHOLD).any())
@@ -2,18 +2,36 @@
 前锋决策逻辑
 """
 
+import math
+
+import numpy as np
+
 from src.utils.features import (
     get_ball_info, get_player_info, distance_to, 
     find_closest_teammate, find_closest_opponent, 
     get_best_pass_target, get_movement_direction, 
-    is_player_tired, is_in_opponent_half, can_shoot
+    is_player_tired, is_in_opponent_half, can_shoot,
+    check_pass_path_clear
 )
 from src.utils.actions import action_manager, validate_action_for_situation
+from src.utils.geometry import first_argmax_above, offset_points
+from src.utils.line_model import get_line_model
+from src.utils.space_grid import get_space_grid
+from src.utils.spatial_index import RIGHT_TEAM, get_spatial_index
+from src.utils.step_context import as_step_context
+from src.utils.profiling import decision_node
 from src.gfootball_agent.config import Action, Distance, Field, PlayerRole
+from src.gfootball_agent.decision_tree import All, Any, Call, Condition, DecisionTree, If, Leaf
+from src.gfootball_agent.pressing import get_press_assignment
+from src.gfootball_agent.roles.tree_features import (
+    WITH_BALL_FEATURES, CAN_SHOOT, IN_OPTIMAL_SHOT_RANGE, UNDER_PRESSURE
+)
 
 
+@decision_node
 def forward_decision(obs, player_index):
     """前锋决策逻辑"""
+    obs = as_step_context(obs)
     ball_info = get_ball_info(obs)
     player_info = get_player_info(obs, player_index)
     ball_owned_team = ball_info['owned_team']
@@ -27,6 +45,7 @@ def forward_decision(obs, player_index):
         return forward_contention_logic(obs, player_index, ball_info, player_info)
 
 
+@decision_node
 def forward_offensive_logic(obs, player_index, ball_info, player_info):
     """前锋进攻逻辑"""
     player_pos = player_info['position']
@@ -39,37 +58,34 @@ def forward_offensive_logic(obs, player_index, ball_info, player_info):
     return forward_off_ball_movement(obs, player_index, player_info)
 
 
-def forward_with_ball_logic(obs, player_index, ball_info, player_info):
-    """前锋持球时的决策逻辑"""
-    player_pos = player_info['position']
-    ball_pos = ball_info['position']
-    
-    # 优先考虑射门
-    if can_shoot(player_pos, ball_pos, obs):
-        goal_distance = distance_to(player_pos, [Field.RIGHT_GOAL_X, Field.CENTER_Y])
-        
-        # 在最佳射门范围内，直接射门
-        if goal_distance < Distance.OPTIMAL_SHOT_RANGE:
-            return Action.SHOT
-        
-        # 在射门范围内，检查射门角度和压力
-        if goal_distance < Distance.SHOT_RANGE:
-            closest_opponent_idx, closest_opponent_dist = find_closest_opponent(obs, player_index)
-            
-            # 如果没有被紧逼，可以射门
-            if closest_opponent_dist > Distance.PRESSURE_DISTANCE:
-                return Action.SHOT
-    
-    # 检查是否被对手逼抢
-    closest_opponent_idx, closest_opponent_dist = find_closest_opponent(obs, player_index)
-    
-    if closest_opponent_dist < Distance.PRESSURE_DISTANCE:
-        return forward_under_pressure(obs, player_index, ball_info, player_info)
-    
+# 持球决策树
+FORWARD_WITH_BALL_TREE = DecisionTree('forward_with_ball_tree', WITH_BALL_FEATURES, If(
+    # 优先考虑射门：最佳射门范围内直接射门，射门范围内没有被紧逼也可以射门
+    All(CAN_SHOOT, Any(
+        IN_OPTIMAL_SHOT_RANGE,
+        All(Condition('goal_distance', lambda d: d < Distance.SHOT_RANGE, name='in_shot_range'),
+            Condition('opponent_distance', lambda d: d > Distance.PRESSURE_DISTANCE,
+                      name='not_pressed')),
+    )), Leaf(Action.SHOT), If(
+    # 被对手逼抢
+    UNDER_PRESSURE, Call(lambda obs, i, ball_info, player_info:
+                         forward_under_pressure(obs, i, ball_info, player_info),
+                         name='forward_under_pressure'),
     # 寻找更好的射门位置或传球机会
-    return forward_create_opportunity(obs, player_index, ball_info, player_info)
+    Call(lambda obs, i, ball_info, player_info:
+         forward_create_opportunity(obs, i, ball_info, player_info),
+         name='forward_create_opportunity'))))
+
+_forward_with_ball = FORWARD_WITH_BALL_TREE.compile()
+
+
+@decision_node
+def forward_with_ball_logic(obs, player_index, ball_info, player_info):
+    """前锋持球时的决策逻辑（见 FORWARD_WITH_BALL_TREE）"""
+    return _forward_with_ball(obs, player_index, ball_info, player_info)
 
 
+@decision_node
 def forward_under_pressure(obs, player_index, ball_info, player_info):
     """前锋被逼抢时的处理"""
     player_pos = player_info['position']
@@ -78,9 +94,9 @@ def forward_under_pressure(obs, player_index, ball_info, player_info):
     best_target = get_best_pass_target(obs, player_index)
     
     if best_target != -1:
-        target_pos = obs['left_team'][best_target]
-        target_role = obs['left_team_roles'][best_target]
-        pass_distance = distance_to(player_pos, target_pos)
+        target_pos = obs.left_team[best_target]
+        target_role = obs.left_team_roles[best_target]
+        pass_distance = obs.team_distances[player_index, best_target]
         
         # 优先回传给中场，做球给后插上的队友
         if target_role in [PlayerRole.CENTRAL_MIDFIELD, PlayerRole.ATTACK_MIDFIELD]:
@@ -102,6 +118,7 @@ def forward_under_pressure(obs, player_index, ball_info, player_info):
     return forward_protect_ball(obs, player_index, player_info)
 
 
+@decision_node
 def forward_create_opportunity(obs, player_index, ball_info, player_info):
     """前锋创造机会"""
     player_pos = player_info['position']
@@ -115,15 +132,14 @@ def forward_create_opportunity(obs, player_index, ball_info, player_info):
     best_target = get_best_pass_target(obs, player_index)
     
     if best_target != -1:
-        target_pos = obs['left_team'][best_target]
-        target_role = obs['left_team_roles'][best_target]
+        target_pos = obs.left_team[best_target]
         
         # 如果有队友在更好的位置
         target_goal_distance = distance_to(target_pos, goal_center)
         player_goal_distance = distance_to(player_pos, goal_center)
         
         if target_goal_distance < player_goal_distance and is_in_opponent_half(target_pos):
-            pass_distance = distance_to(player_pos, target_pos)
+            pass_distance = obs.team_distances[player_index, best_target]
             if pass_distance < Distance.SHORT_PASS_RANGE:
                 return Action.SHORT_PASS
     
@@ -131,6 +147,7 @@ def forward_create_opportunity(obs, player_index, ball_info, player_info):
     return Action.IDLE
 
 
+@decision_node
 def forward_protect_ball(obs, player_index, player_info):
     """前锋护球"""
     player_pos = player_info['position']
@@ -145,7 +162,7 @@ def forward_protect_ball(obs, player_index, player_info):
         ]
         
         # 开始盘带
-        current_sticky = obs['sticky_actions']
+        current_sticky = obs.sticky_actions[player_index]
         if not current_sticky[9]:  # 没有在盘带
             return Action.DRIBBLE
         
@@ -156,6 +173,7 @@ def forward_protect_ball(obs, player_index, player_info):
     return Action.IDLE
 
 
+@decision_node
 def forward_dribble_to_goal(obs, player_index, player_info):
     """前锋向球门盘带"""
     player_pos = player_info['position']
@@ -178,7 +196,7 @@ def forward_dribble_to_goal(obs, player_index, player_info):
         ]
         
         # 开始盘带
-        current_sticky = obs['sticky_actions']
+        current_sticky = obs.sticky_actions[player_index]
         if not current_sticky[9]:
             return Action.DRIBBLE
         
@@ -189,6 +207,7 @@ def forward_dribble_to_goal(obs, player_index, player_info):
     return Action.IDLE
 
 
+@decision_node
 def forward_off_ball_movement(obs, player_index, player_info):
     """前锋无球跑位"""
     player_pos = player_info['position']
@@ -204,6 +223,7 @@ def forward_off_ball_movement(obs, player_index, player_info):
         return forward_counter_attack_run(obs, player_index, player_info, ball_pos)
 
 
+@decision_node
 def forward_attacking_run(obs, player_index, player_info, ball_pos):
     """前锋在对方半场的跑位 - 优化版本，创造更好的传球选项"""
     player_pos = player_info['position']
@@ -215,8 +235,8 @@ def forward_attacking_run(obs, player_index, player_info, ball_pos):
     
     # 根据持球球员位置调整跑位策略
     if ball_carrier_index != -1:
-        ball_carrier_pos = obs['left_team'][ball_carrier_index]
-        ball_carrier_role = obs['left_team_roles'][ball_carrier_index]
+        ball_carrier_pos = obs.left_team[ball_carrier_index]
+        ball_carrier_role = obs.left_team_roles[ball_carrier_index]
         
         # 寻找最佳的接球位置，考虑创造传球线路
         best_position = find_best_receiving_position_enhanced(obs, player_index, ball_pos, ball_carrier_pos)
@@ -253,6 +273,7 @@ def forward_attacking_run(obs, player_index, player_info, ball_pos):
     return Action.IDLE
 
 
+@decision_node
 def forward_counter_attack_run(obs, player_index, player_info, ball_pos):
     """前锋反击跑位"""
     player_pos = player_info['position']
@@ -277,6 +298,7 @@ def forward_counter_attack_run(obs, player_index, player_info, ball_pos):
     return Action.IDLE
 
 
+@decision_node
 def forward_defensive_logic(obs, player_index, ball_info, player_info):
     """前锋防守逻辑"""
     ball_pos = ball_info['position']
@@ -296,12 +318,13 @@ def forward_defensive_logic(obs, player_index, ball_info, player_info):
     return Action.IDLE
 
 
+@decision_node
 def forward_pressure_logic(obs, player_index, ball_info, player_info):
     """前锋逼抢逻辑"""
     ball_pos = ball_info['position']
     player_pos = player_info['position']
     
-    distance_to_ball = distance_to(player_pos, ball_pos)
+    distance_to_ball = obs.ball_distances[player_index]
     
     # 如果接近球，进行骚扰
     if distance_to_ball < Distance.BALL_CLOSE:
@@ -316,15 +339,16 @@ def forward_pressure_logic(obs, player_index, ball_info, player_info):
     return Action.IDLE
 
 
+@decision_node
 def forward_contention_logic(obs, player_index, ball_info, player_info):
     """前锋争抢逻辑（无人控球时）"""
     ball_pos = ball_info['position']
     player_pos = player_info['position']
     
-    distance_to_ball = distance_to(player_pos, ball_pos)
+    distance_to_ball = obs.ball_distances[player_index]
     
-    # 如果球在前场且前锋是最接近的，积极争抢
-    if is_in_opponent_half(ball_pos) and is_closest_forward_to_ball(obs, player_index, ball_pos):
+    # 如果球在前场且前锋被分配去争抢，积极争抢（见 pressing.PressAssignment）
+    if get_press_assignment(obs).goes_to_ball(player_index):
         if distance_to_ball < Distance.BALL_CLOSE:
             movement_action = get_movement_direction(player_pos, ball_pos)
             if movement_action:
@@ -356,17 +380,15 @@ def can_dribble_towards_goal(obs, player_index, player_pos):
         return False
     
     # 检查前方是否有对手阻挡
-    for i, opp_pos in enumerate(obs['right_team']):
-        # 计算对手是否在前进路径上
-        to_opponent = [opp_pos[0] - player_pos[0], opp_pos[1] - player_pos[1]]
-        
-        # 简化判断：如果对手在前方较近位置，不建议盘带
-        if (to_opponent[0] > 0 and  # 对手在前方
-            abs(to_opponent[1]) < 0.1 and  # 在合理的Y轴范围内
-            (to_opponent[0]**2 + to_opponent[1]**2)**0.5 < 0.08):  # 距离较近
-            return False
+    obs = as_step_context(obs)
+    to_opponent = obs.right_team - np.asarray(player_pos, dtype=float)
     
-    return True
+    # 简化判断：如果对手在前方较近位置，不建议盘带
+    blocking = ((to_opponent[:, 0] > 0) &  # 对手在前方
+                (np.abs(to_opponent[:, 1]) < 0.1) &  # 在合理的Y轴范围内
+                (obs.opponent_distances[player_index] < 0.08))  # 距离较近
+    
+    return not blocking.any()
 
 
 def find_escape_direction(obs, player_index, player_pos):
@@ -376,37 +398,25 @@ def find_escape_direction(obs, player_index, player_pos):
         [0.02, 0.02], [0.02, -0.02], [-0.02, 0.02], [-0.02, -0.02]
     ]
     
-    best_direction = None
-    max_space = 0
+    obs = as_step_context(obs)
     
-    for direction in directions:
-        test_pos = [player_pos[0] + direction[0], player_pos[1] + direction[1]]
-        
-        # 计算该方向的空间
-        min_distance_to_opponent = float('inf')
-        for opp_pos in obs['right_team']:
-            dist = distance_to(test_pos, opp_pos)
-            if dist < min_distance_to_opponent:
-                min_distance_to_opponent = dist
-        
-        if min_distance_to_opponent > max_space:
-            max_space = min_distance_to_opponent
-            best_direction = direction
+    # 一次性计算所有方向的空间
+    test_positions = offset_points(player_pos, directions)
+    spaces = obs.min_opponent_distances(test_positions)
+    best = first_argmax_above(spaces, 0)
     
-    return best_direction
+    return directions[best] if best != -1 else None
 
 
 def adjust_direction_to_avoid_opponents(obs, player_pos, desired_direction):
     """调整方向以避开对手"""
+    obs = as_step_context(obs)
+    
     # 检查期望方向上是否有对手
     test_pos = [player_pos[0] + desired_direction[0] * 0.05, 
                 player_pos[1] + desired_direction[1] * 0.05]
     
-    min_distance = float('inf')
-    for opp_pos in obs['right_team']:
-        dist = distance_to(test_pos, opp_pos)
-        if dist < min_distance:
-            min_distance = dist
+    min_distance = obs.opponent_distances_from(test_pos).min()
     
     # 如果前方空间足够，保持原方向
     if min_distance > 0.04:
@@ -422,8 +432,8 @@ def adjust_direction_to_avoid_opponents(obs, player_pos, desired_direction):
     test_right = [player_pos[0] + right_direction[0] * 0.05, 
                   player_pos[1] + right_direction[1] * 0.05]
     
-    left_space = min(distance_to(test_left, opp_pos) for opp_pos in obs['right_team'])
-    right_space = min(distance_to(test_right, opp_pos) for opp_pos in obs['right_team'])
+    left_space = obs.opponent_distances_from(test_left).min()
+    right_space = obs.opponent_distances_from(test_right).min()
     
     # 选择空间更大的方向
     if left_space > right_space:
@@ -434,7 +444,8 @@ def adjust_direction_to_avoid_opponents(obs, player_pos, desired_direction):
 
 def find_best_receiving_position(obs, player_index, ball_pos):
     """寻找最佳接球位置"""
-    player_pos = obs['left_team'][player_index]
+    obs = as_step_context(obs)
+    player_pos = obs.left_team[player_index]
     goal_center = [Field.RIGHT_GOAL_X, Field.CENTER_Y]
     
     # 候选位置：在球的前方和侧方
@@ -449,7 +460,13 @@ def find_best_receiving_position(obs, player_index, ball_pos):
     best_position = None
     best_score = -1
     
-    for pos in candidate_positions:
+    # 从本步的空间网格一次性查询所有候选位置到最近对手的距离和我方控球权
+    grid = get_space_grid(obs)
+    candidate_spaces = grid.space_at(candidate_positions)
+    candidate_controls = grid.control_at(candidate_positions)
+    
+    for pos, min_distance_to_opponent, control in zip(candidate_positions, candidate_spaces,
+                                                      candidate_controls):
         # 确保位置在场地内
         if pos[0] > Field.RIGHT_BOUNDARY or pos[0] < Field.LEFT_BOUNDARY:
             continue
@@ -464,9 +481,11 @@ def find_best_receiving_position(obs, player_index, ball_pos):
         score += (1.0 - distance_to_goal) * 2
         
         # 距离对手越远越好
-        min_distance_to_opponent = min(distance_to(pos, opp_pos) for opp_pos in obs['right_team'])
         score += min_distance_to_opponent * 3
         
+        # 我方能先到的位置更好
+        score += control * 2
+        
         # 不要距离当前位置太远
         distance_to_current = distance_to(pos, player_pos)
         if distance_to_current < 0.15:
@@ -481,7 +500,8 @@ def find_best_receiving_position(obs, player_index, ball_pos):
 
 def find_best_receiving_position_enhanced(obs, player_index, ball_pos, ball_carrier_pos):
     """增强版寻找最佳接球位置，考虑传球线路"""
-    player_pos = obs['left_team'][player_index]
+    obs = as_step_context(obs)
+    player_pos = obs.left_team[player_index]
     goal_center = [Field.RIGHT_GOAL_X, Field.CENTER_Y]
     
     # 扩展候选位置，包括更多的跑位选项
@@ -508,7 +528,12 @@ def find_best_receiving_position_enhanced(obs, player_index, ball_pos, ball_carr
     best_position = None
     best_score = -1
     
-    for pos in candidate_positions:
+    # 从本步的空间网格一次性查询所有候选位置的空间和我方控球权
+    grid = get_space_grid(obs)
+    candidate_spaces = grid.space_at(candidate_positions)
+    candidate_controls = grid.control_at(candidate_positions)
+    
+    for pos, space, control in zip(candidate_positions, candidate_spaces, candidate_controls):
         # 确保位置在场地内且合理
         if pos[0] > Field.RIGHT_BOUNDARY or pos[0] < Field.LEFT_BOUNDARY:
             continue
@@ -518,7 +543,8 @@ def find_best_receiving_position_enhanced(obs, player_index, ball_pos, ball_carr
             continue
         
         # 计算综合评分
-        score = calculate_receiving_position_score(obs, pos, player_pos, ball_carrier_pos, goal_center)
+        score = calculate_receiving_position_score(obs, pos, player_pos, ball_carrier_pos, goal_center,
+                                                   space=space, control=control)
         
         if score > best_score:
             best_score = score
@@ -527,8 +553,14 @@ def find_best_receiving_position_enhanced(obs, player_index, ball_pos, ball_carr
     return best_position
 
 
-def calculate_receiving_position_score(obs, position, current_pos, ball_carrier_pos, goal_center):
-    """计算接球位置的评分"""
+def calculate_receiving_position_score(obs, position, current_pos, ball_carrier_pos, goal_center, space=None,
+                                       control=None):
+    """
+    计算接球位置的评分
+
+    space 为该位置到最近对手的距离，control 为该位置的我方控球权，None 时从本步的空间网格查询
+    """
+    obs = as_step_context(obs)
     score = 0
     
     # 1. 距离球门越近越好（主要因素）
@@ -536,12 +568,17 @@ def calculate_receiving_position_score(obs, position, current_pos, ball_carrier_
     score += (1.5 - distance_to_goal) * 3
     
     # 2. 与对手的距离（安全性）
-    min_distance_to_opponent = min(distance_to(position, opp_pos) for opp_pos in obs['right_team'])
-    score += min_distance_to_opponent * 4
+    if space is None:
+        space = get_space_grid(obs).space_at_point(position)
+    score += space * 4
+    
+    # 2b. 控球权：双方最快到达时间之差，我方能先到的位置更安全
+    if control is None:
+        control = get_space_grid(obs).control_at([position])[0]
+    score += control * 2
     
     # 3. 传球路线的清晰度
-    from src.utils.features import check_pass_path_clear
-    if check_pass_path_clear(ball_carrier_pos, position, obs['right_team']):
+    if check_pass_path_clear(ball_carrier_pos, position, obs.right_team):
         score += 2.0
     else:
         score -= 1.0
@@ -571,30 +608,11 @@ def calculate_receiving_position_score(obs, position, current_pos, ball_carrier_
 
 def find_defensive_gap(obs, player_index, ball_pos):
     """寻找防守空隙"""
-    player_pos = obs['left_team'][player_index]
-    
-    # 分析对手防线
-    defenders = []
-    for i, opp_pos in enumerate(obs['right_team']):
-        role = obs['right_team_roles'][i]
-        if role in [PlayerRole.CENTRE_BACK, PlayerRole.LEFT_BACK, PlayerRole.RIGHT_BACK]:
-            defenders.append(opp_pos)
-    
-    if len(defenders) < 2:
-        return None
-    
-    # 寻找防守队员之间的空隙
-    gaps = []
-    for i in range(len(defenders)):
-        for j in range(i + 1, len(defenders)):
-            gap_center = [
-                (defenders[i][0] + defenders[j][0]) / 2,
-                (defenders[i][1] + defenders[j][1]) / 2
-            ]
-            gap_width = distance_to(defenders[i], defenders[j])
-            
-            if gap_width > 0.15:  # 足够大的空隙
-                gaps.append((gap_center, gap_width))
+    obs = as_step_context(obs)
+    player_pos = obs.left_team[player_index]
+    
+    # 对手后卫之间足够大的空隙（见 line_model.LineModel）
+    gaps = get_line_model(obs).gaps_wider_than(0.15)
     
     # 选择最好的空隙
     best_gap = None
@@ -622,10 +640,11 @@ def find_defensive_gap(obs, player_index, ball_pos):
 
 def calculate_optimal_y_position(obs, player_pos, ball_pos):
     """计算最优的Y轴位置"""
+    obs = as_step_context(obs)
     # 分析场上的分布，避免扎堆
     teammates_y = []
-    for i, teammate_pos in enumerate(obs['left_team']):
-        if obs['left_team_active'][i] and teammate_pos[0] > Field.CENTER_X - 0.1:
+    for i, teammate_pos in enumerate(obs.left_team):
+        if obs.left_team_active[i] and teammate_pos[0] > Field.CENTER_X - 0.1:
             teammates_y.append(teammate_pos[1])
     
     # 寻找人员稀少的区域
@@ -644,23 +663,15 @@ def calculate_optimal_y_position(obs, player_pos, ball_pos):
 
 def is_too_crowded_ahead(obs, ball_pos):
     """判断前方是否过于拥挤"""
-    crowded_area_count = 0
-    for opp_pos in obs['right_team']:
-        if (opp_pos[0] > ball_pos[0] and 
-            opp_pos[0] < ball_pos[0] + 0.15 and
-            abs(opp_pos[1] - ball_pos[1]) < 0.2):
-            crowded_area_count += 1
-    
-    return crowded_area_count >= 3
+    crowded = get_spatial_index(obs).in_rect(
+        ball_pos[0], ball_pos[0] + 0.15, ball_pos[1] - 0.2, ball_pos[1] + 0.2, team=RIGHT_TEAM
+    )
+    return len(crowded) >= 3
 
 
 def is_offside_position(obs, position):
-    """简单的越位判断"""
-    # 找到最后一名对方防守球员的位置
-    last_defender_x = min(opp_pos[0] for opp_pos in obs['right_team'])
-    
-    # 如果前锋位置超过最后一名防守球员，可能越位
-    return position[0] > last_defender_x - 0.02
+    """简单的越位判断（越位线为对方倒数第二名防守球员，见 line_model.LineModel）"""
+    return get_line_model(obs).is_offside(position)
 
 
 def calculate_shot_angle(position, goal_center):
@@ -672,7 +683,6 @@ def calculate_shot_angle(position, goal_center):
     vector2 = [goal_posts[1][0] - position[0], goal_posts[1][1] - position[1]]
     
     # 计算夹角
-    import math
     dot_product = vector1[0] * vector2[0] + vector1[1] * vector2[1]
     magnitude1 = (vector1[0]**2 + vector1[1]**2)**0.5
     magnitude2 = (vector2[0]**2 + vector2[1]**2)**0.5
@@ -690,32 +700,8 @@ def calculate_shot_angle(position, goal_center):
 
 
 def should_forward_pressure(obs, player_index, ball_pos):
-    """判断前锋是否应该逼抢"""
-    player_pos = obs['left_team'][player_index]
-    distance_to_ball = distance_to(player_pos, ball_pos)
-    
-    # 只有在对方后场且距离较近时才逼抢
-    if ball_pos[0] < -0.3:  # 球在对方后场
-        return distance_to_ball < 0.2
-    
-    return False
-
-
-def is_closest_forward_to_ball(obs, player_index, ball_pos):
-    """判断是否是离球最近的前锋"""
-    player_pos = obs['left_team'][player_index]
-    player_distance = distance_to(player_pos, ball_pos)
-    
-    for i, pos in enumerate(obs['left_team']):
-        if i == player_index:
-            continue
-        
-        role = obs['left_team_roles'][i]
-        if role == PlayerRole.CENTRAL_FORWARD:
-            if distance_to(pos, ball_pos) < player_distance:
-                return False
-    
-    return True
+    """判断前锋是否应该逼抢（球在对方后场且距离较近的前锋参与全队分配）"""
+    return get_press_assignment(obs).goes_to_ball(player_index)
 
 
 def get_forward_defensive_position(ball_pos):
@@ -6,14 +6,26 @@ from src.utils.features import (
     get_ball_info, get_player_info, distance_to, 
     get_goalkeeper_position, find_closest_teammate,
     find_closest_opponent, get_best_pass_target,
-    get_movement_direction, is_player_tired
+    get_movement_direction, is_player_tired, is_safe_to_clear_ball,
+    is_ball_in_penalty_area
 )
 from src.utils.actions import action_manager, validate_action_for_situation
+from src.utils.pass_lanes import get_pass_table
+from src.utils.spatial_index import LEFT_TEAM, get_spatial_index
+from src.utils.step_context import as_step_context
+from src.utils.profiling import decision_node
 from src.gfootball_agent.config import Action, Distance, Field, PlayerRole
+from src.gfootball_agent.pressing import get_press_assignment
+from src.gfootball_agent.decision_tree import All, Call, Condition, DecisionTree, Feature, If, Leaf, Not
+from src.gfootball_agent.roles.tree_features import (
+    WITH_BALL_FEATURES, UNDER_PRESSURE, HAS_PASS_TARGET, SHORT_PASS_DISTANCE, target_role_in
+)
 
 
+@decision_node
 def goalkeeper_decision(obs, player_index):
     """守门员决策逻辑"""
+    obs = as_step_context(obs)
     ball_info = get_ball_info(obs)
     player_info = get_player_info(obs, player_index)
     ball_owned_team = ball_info['owned_team']
@@ -27,6 +39,7 @@ def goalkeeper_decision(obs, player_index):
         return goalkeeper_contention_logic(obs, player_index, ball_info, player_info)
 
 
+@decision_node
 def goalkeeper_offensive_logic(obs, player_index, ball_info, player_info):
     """守门员进攻逻辑"""
     ball_pos = ball_info['position']
@@ -47,110 +60,64 @@ def goalkeeper_offensive_logic(obs, player_index, ball_info, player_info):
     return Action.IDLE
 
 
-def goalkeeper_with_ball_logic(obs, player_index, ball_info, player_info):
-    """守门员持球时的决策逻辑 - 优化版本，避免危险传球"""
-    player_pos = player_info['position']
-    
-    # 检查是否被对手紧逼
-    closest_opponent_idx, closest_opponent_dist = find_closest_opponent(obs, player_index)
-    is_under_pressure = closest_opponent_dist < Distance.PRESSURE_DISTANCE
-    
-    # 如果受压，优先检查是否应该解围
-    if is_under_pressure:
-        from src.utils.features import is_safe_to_clear_ball, get_clearance_target_position
-        if is_safe_to_clear_ball(obs, player_index):
-            # 解围到对方半场边路
-            return Action.LONG_PASS
-    
+# 守门员的持球特征：传球目标只考虑安全的目标，避免乌龙球
+GOALKEEPER_WITH_BALL_FEATURES = [
+    feature for feature in WITH_BALL_FEATURES if feature.name != 'best_target'
+] + [
+    Feature('best_target',
+            lambda obs, i, ball_info, player_info: get_safe_goalkeeper_pass_target(obs, i), cost=5),
+    Feature('safe_to_clear',
+            lambda obs, i, ball_info, player_info: is_safe_to_clear_ball(obs, i), cost=3),
+    Feature('target_opponent_distance',
+            lambda obs, i, ball_info, player_info, target: obs.nearest_opponent_distance[target],
+            requires=['best_target'], cost=0),
+    Feature('alternative_target',
+            lambda obs, i, ball_info, player_info, target:
+                find_alternative_pass_target(obs, i, exclude=[target]),
+            requires=['best_target'], cost=3),
+]
+
+TARGET_UNDER_PRESSURE = Condition('target_opponent_distance',
+                                  lambda d: d < Distance.PRESSURE_DISTANCE * 1.2,
+                                  name='target_under_pressure')
+
+_goalkeeper_move = Call(lambda obs, i, ball_info, player_info:
+                        goalkeeper_move_with_ball(obs, i, player_info),
+                        name='goalkeeper_move_with_ball')
+
+# 持球决策树 - 优化版本，避免危险传球
+GOALKEEPER_WITH_BALL_TREE = DecisionTree('goalkeeper_with_ball_tree', GOALKEEPER_WITH_BALL_FEATURES, If(
+    # 受压时优先检查是否应该解围（解围到对方半场边路）
+    All(UNDER_PRESSURE, Condition('safe_to_clear', lambda safe: safe, name='safe_to_clear')),
+    Leaf(Action.LONG_PASS), If(
     # 寻找安全的传球目标
-    best_target = get_safe_goalkeeper_pass_target(obs, player_index)
-    
-    if best_target != -1:
-        target_pos = obs['left_team'][best_target]
-        pass_distance = distance_to(player_pos, target_pos)
-        target_role = obs['left_team_roles'][best_target]
-        
-        # 检查目标队友是否也受压
-        target_closest_opp_idx, target_closest_opp_dist = find_closest_opponent(obs, best_target)
-        target_under_pressure = target_closest_opp_dist < Distance.PRESSURE_DISTANCE * 1.2
-        
-        # 如果目标队友受压，考虑其他选择
-        if target_under_pressure and not is_under_pressure:
-            # 守门员没受压但队友受压，寻找其他目标或长传
-            alternative_target = find_alternative_pass_target(obs, player_index, exclude=[best_target])
-            if alternative_target != -1:
-                return Action.LONG_PASS  # 长传给替代目标
-        
-        # 正常传球决策
-        if pass_distance < Distance.SHORT_PASS_RANGE and not target_under_pressure:
-            # 短传给后卫（确保后卫不受压）
-            return Action.SHORT_PASS
-        elif target_role in [PlayerRole.CENTRAL_MIDFIELD, PlayerRole.LEFT_MIDFIELD, PlayerRole.RIGHT_MIDFIELD]:
-            # 长传到中场
-            return Action.LONG_PASS
-    
+    HAS_PASS_TARGET, If(
+        # 守门员没受压但队友受压，有替代目标时长传
+        All(TARGET_UNDER_PRESSURE, Not(UNDER_PRESSURE),
+            Condition('alternative_target', lambda target: target != -1, name='has_alternative_target')),
+        Leaf(Action.LONG_PASS), If(
+        # 短传给不受压的后卫
+        All(SHORT_PASS_DISTANCE, Not(TARGET_UNDER_PRESSURE)), Leaf(Action.SHORT_PASS), If(
+        # 长传到中场
+        target_role_in([PlayerRole.CENTRAL_MIDFIELD, PlayerRole.LEFT_MIDFIELD,
+                        PlayerRole.RIGHT_MIDFIELD], 'target_is_midfielder'),
+        Leaf(Action.LONG_PASS),
+        _goalkeeper_move))),
     # 没有好的传球选择，持球移动寻找机会
-    return goalkeeper_move_with_ball(obs, player_index, player_info)
+    _goalkeeper_move)))
+
+
+@decision_node
+def goalkeeper_with_ball_logic(obs, player_index, ball_info, player_info):
+    """守门员持球时的决策逻辑（见 GOALKEEPER_WITH_BALL_TREE）"""
+    return _goalkeeper_with_ball(obs, player_index, ball_info, player_info)
 
 
 def get_safe_goalkeeper_pass_target(obs, player_index):
     """为守门员寻找安全的传球目标，避免乌龙球"""
-    player_pos = obs['left_team'][player_index]
-    
-    best_target = -1
-    best_score = -1
-    
-    for i, teammate_pos in enumerate(obs['left_team']):
-        if i == player_index or not obs['left_team_active'][i]:
-            continue
-        
-        teammate_role = obs['left_team_roles'][i]
-        
-        # 计算基础安全评分
-        score = 0
-        
-        # 1. 绝对不传给距离己方球门更近的队友（防止乌龙球）
-        teammate_to_goal_dist = distance_to(teammate_pos, [Field.LEFT_GOAL_X, Field.CENTER_Y])
-        keeper_to_goal_dist = distance_to(player_pos, [Field.LEFT_GOAL_X, Field.CENTER_Y])
-        
-        if teammate_to_goal_dist <= keeper_to_goal_dist + 0.02:  # 加小的缓冲
-            continue  # 跳过太接近球门的队友
-        
-        # 2. 队友距离己方球门越远越安全
-        score += teammate_to_goal_dist * 3
-        
-        # 3. 优先传给后卫
-        if teammate_role in [PlayerRole.CENTRE_BACK, PlayerRole.LEFT_BACK, PlayerRole.RIGHT_BACK]:
-            score += 2.0
-        elif teammate_role in [PlayerRole.CENTRAL_MIDFIELD, PlayerRole.LEFT_MIDFIELD, PlayerRole.RIGHT_MIDFIELD]:
-            score += 1.5
-        
-        # 4. 检查队友周围的空间
-        from src.utils.features import get_space_around_player
-        teammate_space = get_space_around_player(obs, i)
-        score += teammate_space * 2
-        
-        # 5. 传球距离因素
-        pass_distance = distance_to(player_pos, teammate_pos)
-        if Distance.SHORT_PASS_RANGE * 0.5 < pass_distance < Distance.SHORT_PASS_RANGE * 1.2:
-            score += 1.0  # 适中距离
-        
-        # 6. 检查传球路线是否清晰
-        from src.utils.features import check_pass_path_clear
-        if check_pass_path_clear(player_pos, teammate_pos, obs['right_team']):
-            score += 1.5
-        else:
-            score -= 1.0
-        
-        # 7. 避免传给在边线的队友（容易失误）
-        if abs(teammate_pos[1]) > 0.35:
-            score -= 0.5
-        
-        if score > best_score:
-            best_score = score
-            best_target = i
-    
-    return best_target
+    # 评分规则见 pass_lanes.PassTable：不传给更接近球门的队友，
+    # 优先后卫和中场，考虑接球空间、传球距离和路线
+    return get_pass_table(obs).goalkeeper_target(player_index)
 
 
 def find_alternative_pass_target(obs, player_index, exclude=None):
@@ -158,24 +125,27 @@ def find_alternative_pass_target(obs, player_index, exclude=None):
     if exclude is None:
         exclude = []
     
-    player_pos = obs['left_team'][player_index]
+    obs = as_step_context(obs)
     
-    for i, teammate_pos in enumerate(obs['left_team']):
-        if i == player_index or i in exclude or not obs['left_team_active'][i]:
-            continue
-        
-        # 寻找在中场的队友
-        teammate_role = obs['left_team_roles'][i]
-        if teammate_role in [PlayerRole.CENTRAL_MIDFIELD, PlayerRole.LEFT_MIDFIELD, PlayerRole.RIGHT_MIDFIELD]:
-            # 检查是否在相对安全的位置
-            if teammate_pos[0] > Field.CENTER_X - 0.2:  # 在中场或前场
-                closest_opp_idx, closest_opp_dist = find_closest_opponent(obs, i)
-                if closest_opp_dist > Distance.PRESSURE_DISTANCE:
-                    return i
+    # 在中场或前场的中场队友
+    candidates = get_spatial_index(obs).in_rect(
+        Field.CENTER_X - 0.2, float('inf'), float('-inf'), float('inf'),
+        team=LEFT_TEAM, active_only=True, exclude=[player_index, *exclude],
+        roles=[PlayerRole.CENTRAL_MIDFIELD, PlayerRole.LEFT_MIDFIELD, PlayerRole.RIGHT_MIDFIELD]
+    )
+    
+    # 检查是否在相对安全的位置
+    for _, i, _ in candidates:
+        if obs.nearest_opponent_distance[i] > Distance.PRESSURE_DISTANCE:
+            return i
     
     return -1
 
 
+_goalkeeper_with_ball = GOALKEEPER_WITH_BALL_TREE.compile()
+
+
+@decision_node
 def goalkeeper_move_with_ball(obs, player_index, player_info):
     """守门员持球移动"""
     player_pos = player_info['position']
@@ -193,6 +163,7 @@ def goalkeeper_move_with_ball(obs, player_index, player_info):
     return Action.IDLE
 
 
+@decision_node
 def goalkeeper_defensive_logic(obs, player_index, ball_info, player_info):
     """守门员防守逻辑"""
     ball_pos = ball_info['position']
@@ -222,16 +193,17 @@ def goalkeeper_defensive_logic(obs, player_index, ball_info, player_info):
     return Action.IDLE
 
 
+@decision_node
 def goalkeeper_rush_logic(obs, player_index, ball_info):
     """守门员出击逻辑"""
     ball_pos = ball_info['position']
-    player_pos = obs['left_team'][player_index]
+    player_pos = obs.left_team[player_index]
     
     # 直接冲向球的位置
     movement_action = get_movement_direction(player_pos, ball_pos)
     
     # 检查是否接近球
-    distance_to_ball = distance_to(player_pos, ball_pos)
+    distance_to_ball = obs.ball_distances[player_index]
     
     if distance_to_ball < Distance.BALL_VERY_CLOSE:
         # 尝试铲球或拿球
@@ -247,15 +219,16 @@ def goalkeeper_rush_logic(obs, player_index, ball_info):
     return Action.IDLE
 
 
+@decision_node
 def goalkeeper_contention_logic(obs, player_index, ball_info, player_info):
     """守门员争抢逻辑（无人控球时）"""
     ball_pos = ball_info['position']
     player_pos = player_info['position']
     
-    # 检查球是否在己方禁区内
-    if is_ball_in_penalty_area(ball_pos):
-        # 球在禁区内，积极出击争抢
-        distance_to_ball = distance_to(player_pos, ball_pos)
+    # 球在己方禁区内且被分配去争抢（见 pressing.PressAssignment）
+    if get_press_assignment(obs).goes_to_ball(player_index):
+        # 积极出击争抢
+        distance_to_ball = obs.ball_distances[player_index]
         
         if distance_to_ball < Distance.BALL_CLOSE:
             # 接近球时减速并准备控球
@@ -299,16 +272,6 @@ def should_goalkeeper_rush(ball_pos, obs):
     return False
 
 
-def is_ball_in_penalty_area(ball_pos):
-    """判断球是否在己方禁区内"""
-    # 简化的禁区定义（实际禁区更复杂）
-    penalty_area_x = Field.LEFT_GOAL_X + 0.165  # 禁区长度约0.165
-    penalty_area_y = 0.2  # 禁区宽度的一半
-    
-    return (ball_pos[0] < penalty_area_x and 
-            abs(ball_pos[1]) < penalty_area_y)
-
-
 def get_goalkeeper_offensive_position(ball_pos):
     """计算守门员在进攻时的位置"""
     # 进攻时守门员可以稍微向前，但不能离球门太远
@@ -2,6 +2,8 @@
 中场的决策逻辑
 """ 
 
+import numpy as np
+
 from src.utils.features import (
     get_ball_info, get_player_info, distance_to, 
     get_midfielder_defensive_position, find_closest_teammate,
@@ -10,11 +12,27 @@ from src.utils.features import (
     is_in_opponent_half, can_shoot, is_in_own_half
 )
 from src.utils.actions import action_manager, validate_action_for_situation
+from src.utils.geometry import first_argmax_above, offset_points
+from src.utils.line_model import OFFSIDE_MARGIN, get_line_model
+from src.utils.pass_lanes import get_pass_table
+from src.utils.space_grid import get_space_grid
+from src.utils.step_context import as_step_context
+from src.utils.profiling import decision_node
 from src.gfootball_agent.config import Action, Distance, Field, PlayerRole, Tactics
+from src.gfootball_agent.decision_tree import All, Any, Call, DecisionTree, If, Leaf
+from src.gfootball_agent.pressing import get_press_assignment
+from src.gfootball_agent.roles.tree_features import (
+    WITH_BALL_FEATURES, CAN_SHOOT, IN_OPTIMAL_SHOT_RANGE, UNDER_PRESSURE,
+    HAS_DRIBBLE_SPACE, IN_OPPONENT_HALF, HAS_PASS_TARGET, NO_PASS_TARGET, SHORT_PASS_DISTANCE,
+    space_greater_than, pass_progress_greater_than, small_pass_progress,
+    role_in, target_role_in, wide_position
+)
 
 
+@decision_node
 def midfielder_decision(obs, player_index):
     """中场球员决策逻辑"""
+    obs = as_step_context(obs)
     ball_info = get_ball_info(obs)
     player_info = get_player_info(obs, player_index)
     ball_owned_team = ball_info['owned_team']
@@ -28,6 +46,7 @@ def midfielder_decision(obs, player_index):
         return midfielder_contention_logic(obs, player_index, ball_info, player_info)
 
 
+@decision_node
 def midfielder_offensive_logic(obs, player_index, ball_info, player_info):
     """中场球员进攻逻辑"""
     player_pos = player_info['position']
@@ -41,91 +60,55 @@ def midfielder_offensive_logic(obs, player_index, ball_info, player_info):
     return midfielder_offensive_movement(obs, player_index, player_info)
 
 
-def midfielder_with_ball_logic(obs, player_index, ball_info, player_info):
-    """中场球员持球时的决策逻辑 - 优化版本，增加盘带优先级"""
-    player_pos = player_info['position']
-    player_role = player_info['role']
-    
+# 持球决策树 - 优化版本，增加盘带优先级
+_midfielder_dribble = Call(lambda obs, i, ball_info, player_info:
+                           midfielder_dribble_logic(obs, i, player_info),
+                           name='midfielder_dribble_logic')
+
+MIDFIELDER_WITH_BALL_TREE = DecisionTree('midfielder_with_ball_tree', WITH_BALL_FEATURES, If(
     # 首先检查射门机会
-    if can_shoot(player_pos, ball_info['position'], obs):
-        goal_distance = distance_to(player_pos, [Field.RIGHT_GOAL_X, Field.CENTER_Y])
-        if goal_distance < Distance.OPTIMAL_SHOT_RANGE:
-            return Action.SHOT
-    
-    # 检查是否被对手逼抢
-    closest_opponent_idx, closest_opponent_dist = find_closest_opponent(obs, player_index)
-    
+    All(CAN_SHOOT, IN_OPTIMAL_SHOT_RANGE), Leaf(Action.SHOT), If(
     # 如果被紧逼，快速处理球
-    if closest_opponent_dist < Distance.PRESSURE_DISTANCE:
-        return midfielder_under_pressure(obs, player_index, ball_info, player_info)
-    
-    # 优先检查盘带机会（在传球之前）
-    from src.utils.features import check_dribble_space
-    has_dribble_space, space_distance = check_dribble_space(obs, player_index)
-    
-    # 在对方半场有空间时，积极盘带
-    if has_dribble_space and space_distance > 0.06:
-        should_dribble = False
-        
+    UNDER_PRESSURE, Call(lambda obs, i, ball_info, player_info:
+                         midfielder_under_pressure(obs, i, ball_info, player_info),
+                         name='midfielder_under_pressure'), If(
+    # 前方有空间时比较盘带和传球价值
+    All(HAS_DRIBBLE_SPACE, space_greater_than(0.06), Any(
         # 在对方半场更积极盘带
-        if is_in_opponent_half(player_pos):
-            should_dribble = True
+        IN_OPPONENT_HALF,
         # 攻击型中场即使在己方半场也要积极
-        elif player_role == PlayerRole.ATTACK_MIDFIELD and space_distance > 0.08:
-            should_dribble = True
+        All(role_in([PlayerRole.ATTACK_MIDFIELD], 'attack_midfield'), space_greater_than(0.08)),
         # 边路中场在边路有空间时积极盘带
-        elif player_role in [PlayerRole.LEFT_MIDFIELD, PlayerRole.RIGHT_MIDFIELD]:
-            if abs(player_pos[1]) > 0.15 and space_distance > 0.07:
-                should_dribble = True
-        
-        # 比较盘带和传球价值
-        if not should_dribble:
-            best_target = get_best_pass_target(obs, player_index)
-            if best_target != -1:
-                target_pos = obs['left_team'][best_target]
-                forward_progress = target_pos[0] - player_pos[0]
-                # 如果传球前进不明显，优先盘带
-                if forward_progress < 0.08:
-                    should_dribble = True
-            else:
-                # 没有好的传球选择，优先盘带
-                should_dribble = True
-        
-        if should_dribble:
-            return midfielder_dribble_logic(obs, player_index, player_info)
-    
+        All(role_in([PlayerRole.LEFT_MIDFIELD, PlayerRole.RIGHT_MIDFIELD], 'wing_midfield'),
+            wide_position(0.15), space_greater_than(0.07)),
+        # 没有好的传球选择，或传球前进不明显
+        NO_PASS_TARGET,
+        small_pass_progress(0.08),
+    )), _midfielder_dribble, If(
     # 寻找最佳传球机会
-    best_target = get_best_pass_target(obs, player_index)
-    
-    if best_target != -1:
-        target_pos = obs['left_team'][best_target]
-        target_role = obs['left_team_roles'][best_target]
-        pass_distance = distance_to(player_pos, target_pos)
-        forward_progress = target_pos[0] - player_pos[0]
-        
-        # 优先考虑向前的传球
-        if target_role == PlayerRole.CENTRAL_FORWARD and forward_progress > 0.05:
-            # 传给前锋，根据距离选择传球方式
-            if pass_distance < Distance.SHORT_PASS_RANGE:
-                return Action.SHORT_PASS
-            else:
-                return Action.HIGH_PASS  # 高球找前锋
-        
-        # 传给其他位置的队友
-        if forward_progress > 0.03:  # 向前传球
-            if pass_distance < Distance.SHORT_PASS_RANGE:
-                return Action.SHORT_PASS
-            else:
-                return Action.LONG_PASS
-        
+    HAS_PASS_TARGET, If(
+        # 优先向前传给前锋，根据距离选择传球方式
+        All(target_role_in([PlayerRole.CENTRAL_FORWARD], 'target_is_forward'),
+            pass_progress_greater_than(0.05)),
+        If(SHORT_PASS_DISTANCE, Leaf(Action.SHORT_PASS), Leaf(Action.HIGH_PASS)), If(
+        # 向前传给其他位置的队友
+        pass_progress_greater_than(0.03),
+        If(SHORT_PASS_DISTANCE, Leaf(Action.SHORT_PASS), Leaf(Action.LONG_PASS)),
         # 横传或回传保持控球
-        if pass_distance < Distance.SHORT_PASS_RANGE:
-            return Action.SHORT_PASS
-    
+        If(SHORT_PASS_DISTANCE, Leaf(Action.SHORT_PASS), _midfielder_dribble))),
     # 没有好的传球选择，考虑盘带突破
-    return midfielder_dribble_logic(obs, player_index, player_info)
+    _midfielder_dribble)))))
+
+_midfielder_with_ball = MIDFIELDER_WITH_BALL_TREE.compile()
+
+
+@decision_node
+def midfielder_with_ball_logic(obs, player_index, ball_info, player_info):
+    """中场球员持球时的决策逻辑（见 MIDFIELDER_WITH_BALL_TREE）"""
+    return _midfielder_with_ball(obs, player_index, ball_info, player_info)
 
 
+@decision_node
 def midfielder_under_pressure(obs, player_index, ball_info, player_info):
     """中场球员被逼抢时的处理"""
     player_pos = player_info['position']
@@ -141,8 +124,7 @@ def midfielder_under_pressure(obs, player_index, ball_info, player_info):
     safest_target = find_safest_pass_target(obs, player_index)
     
     if safest_target != -1:
-        target_pos = obs['left_team'][safest_target]
-        pass_distance = distance_to(player_pos, target_pos)
+        pass_distance = obs.team_distances[player_index, safest_target]
         
         if pass_distance < Distance.SHORT_PASS_RANGE:
             return Action.SHORT_PASS
@@ -153,6 +135,7 @@ def midfielder_under_pressure(obs, player_index, ball_info, player_info):
     return midfielder_escape_dribble(obs, player_index, player_info)
 
 
+@decision_node
 def midfielder_dribble_logic(obs, player_index, player_info):
     """中场球员盘带逻辑"""
     player_pos = player_info['position']
@@ -178,7 +161,7 @@ def midfielder_dribble_logic(obs, player_index, player_info):
     target_pos = [target_x, target_y]
     
     # 开始或继续盘带
-    current_sticky = obs['sticky_actions']
+    current_sticky = obs.sticky_actions[player_index]
     if not current_sticky[9]:  # 没有在盘带
         return Action.DRIBBLE
     
@@ -190,6 +173,7 @@ def midfielder_dribble_logic(obs, player_index, player_info):
     return Action.IDLE
 
 
+@decision_node
 def midfielder_escape_dribble(obs, player_index, player_info):
     """中场球员摆脱盘带"""
     player_pos = player_info['position']
@@ -200,23 +184,17 @@ def midfielder_escape_dribble(obs, player_index, player_info):
         [0.04, 0.04], [0.04, -0.04], [-0.04, 0.04], [-0.04, -0.04]  # 四个斜向
     ]
     
-    best_direction = None
-    max_space = 0
-    
-    for direction in directions:
-        test_pos = [player_pos[0] + direction[0], player_pos[1] + direction[1]]
-        
-        # 检查该方向的空间
-        space = calculate_space_in_direction(obs, test_pos)
-        if space > max_space:
-            max_space = space
-            best_direction = direction
+    # 一次性计算所有方向的空间
+    test_positions = offset_points(player_pos, directions)
+    spaces = obs.min_opponent_distances(test_positions)
+    best = first_argmax_above(spaces, 0)
+    best_direction = directions[best] if best != -1 else None
     
     if best_direction:
         target_pos = [player_pos[0] + best_direction[0], player_pos[1] + best_direction[1]]
         
         # 开始盘带
-        current_sticky = obs['sticky_actions']
+        current_sticky = obs.sticky_actions[player_index]
         if not current_sticky[9]:
             return Action.DRIBBLE
         
@@ -227,6 +205,7 @@ def midfielder_escape_dribble(obs, player_index, player_info):
     return Action.IDLE
 
 
+@decision_node
 def midfielder_defensive_logic(obs, player_index, ball_info, player_info):
     """中场球员防守逻辑"""
     ball_pos = ball_info['position']
@@ -258,12 +237,13 @@ def midfielder_defensive_logic(obs, player_index, ball_info, player_info):
     return Action.IDLE
 
 
+@decision_node
 def midfielder_pressure_logic(obs, player_index, ball_info, player_info):
     """中场球员上抢逻辑"""
     ball_pos = ball_info['position']
     player_pos = player_info['position']
     
-    distance_to_ball = distance_to(player_pos, ball_pos)
+    distance_to_ball = obs.ball_distances[player_index]
     
     # 如果非常接近球，尝试铲球
     if distance_to_ball < Distance.BALL_VERY_CLOSE:
@@ -281,15 +261,16 @@ def midfielder_pressure_logic(obs, player_index, ball_info, player_info):
     return Action.IDLE
 
 
+@decision_node
 def midfielder_contention_logic(obs, player_index, ball_info, player_info):
     """中场球员争抢逻辑（无人控球时）"""
     ball_pos = ball_info['position']
     player_pos = player_info['position']
     
-    distance_to_ball = distance_to(player_pos, ball_pos)
+    distance_to_ball = obs.ball_distances[player_index]
     
-    # 检查是否是最接近球的中场球员
-    if is_closest_midfielder_to_ball(obs, player_index, ball_pos):
+    # 检查是否被分配去争抢（见 pressing.PressAssignment）
+    if get_press_assignment(obs).goes_to_ball(player_index):
         # 积极争抢球
         if distance_to_ball < Distance.BALL_CLOSE:
             movement_action = get_movement_direction(player_pos, ball_pos)
@@ -314,6 +295,7 @@ def midfielder_contention_logic(obs, player_index, ball_info, player_info):
     return Action.IDLE
 
 
+@decision_node
 def midfielder_offensive_movement(obs, player_index, player_info):
     """中场球员进攻时的无球跑位"""
     player_pos = player_info['position']
@@ -330,13 +312,16 @@ def midfielder_offensive_movement(obs, player_index, player_info):
         return central_midfielder_movement(obs, player_index, player_info, ball_pos)
 
 
+@decision_node
 def attacking_midfielder_movement(obs, player_index, player_info, ball_pos):
     """攻击型中场的跑位"""
     player_pos = player_info['position']
     
     if is_in_opponent_half(ball_pos):
-        # 球在对方半场，积极前插寻找机会
-        target_x = min(ball_pos[0] + 0.1, Field.RIGHT_GOAL_X - 0.15)
+        # 球在对方半场，积极前插寻找机会，但不越过越位线
+        line_model = get_line_model(obs)
+        target_x = min(ball_pos[0] + 0.1, Field.RIGHT_GOAL_X - 0.15,
+                       line_model.offside_x - OFFSIDE_MARGIN)
         target_y = ball_pos[1] * 0.7  # 跟随球的横向位置
     else:
         # 球在己方半场，保持中等位置准备接应
@@ -352,6 +337,7 @@ def attacking_midfielder_movement(obs, player_index, player_info, ball_pos):
     return Action.IDLE
 
 
+@decision_node
 def wing_midfielder_movement(obs, player_index, player_info, ball_pos):
     """边路中场的跑位"""
     player_pos = player_info['position']
@@ -385,6 +371,7 @@ def wing_midfielder_movement(obs, player_index, player_info, ball_pos):
     return Action.IDLE
 
 
+@decision_node
 def central_midfielder_movement(obs, player_index, player_info, ball_pos):
     """中中场的跑位"""
     player_pos = player_info['position']
@@ -410,81 +397,25 @@ def central_midfielder_movement(obs, player_index, player_info, ball_pos):
 
 
 def should_midfielder_pressure(obs, player_index, ball_pos):
-    """判断中场球员是否应该上抢"""
-    player_pos = obs['left_team'][player_index]
-    distance_to_ball = distance_to(player_pos, ball_pos)
-    
-    # 只有最接近球的中场球员才上抢
-    if not is_closest_midfielder_to_ball(obs, player_index, ball_pos):
-        return False
-    
-    # 距离要合适
-    return distance_to_ball < Distance.PRESSURE_DISTANCE * 1.5
-
-
-def is_closest_midfielder_to_ball(obs, player_index, ball_pos):
-    """判断是否是离球最近的中场球员"""
-    player_pos = obs['left_team'][player_index]
-    player_distance = distance_to(player_pos, ball_pos)
-    
-    midfielder_roles = [
-        PlayerRole.CENTRAL_MIDFIELD, PlayerRole.LEFT_MIDFIELD, 
-        PlayerRole.RIGHT_MIDFIELD, PlayerRole.ATTACK_MIDFIELD
-    ]
-    
-    for i, pos in enumerate(obs['left_team']):
-        if i == player_index:
-            continue
-        
-        role = obs['left_team_roles'][i]
-        if role in midfielder_roles:
-            if distance_to(pos, ball_pos) < player_distance:
-                return False
-    
-    return True
+    """判断中场球员是否应该上抢（离球最近且距离合适的中场参与全队分配）"""
+    return get_press_assignment(obs).goes_to_ball(player_index)
 
 
 def find_safest_pass_target(obs, player_index):
     """寻找最安全的传球目标"""
-    player_pos = obs['left_team'][player_index]
-    safest_target = -1
-    max_safety_score = 0
-    
-    for i, teammate_pos in enumerate(obs['left_team']):
-        if i == player_index or not obs['left_team_active'][i]:
-            continue
-        
-        # 计算安全性评分
-        closest_opp_idx, dist_to_closest_opp = find_closest_opponent(obs, i)
-        pass_distance = distance_to(player_pos, teammate_pos)
-        
-        # 安全性评分：距离对手越远越安全，传球距离适中更好
-        safety_score = dist_to_closest_opp
-        if Distance.SHORT_PASS_RANGE * 0.5 < pass_distance < Distance.SHORT_PASS_RANGE:
-            safety_score += 0.02
-        
-        if safety_score > max_safety_score:
-            max_safety_score = safety_score
-            safest_target = i
-    
-    return safest_target
+    # 安全性评分：距离对手越远越安全，传球距离适中更好（见 pass_lanes.PassTable）
+    return get_pass_table(obs).safest_target(player_index)
 
 
 def calculate_space_in_direction(obs, test_pos):
-    """计算指定位置周围的空间大小"""
-    min_distance_to_opponent = float('inf')
-    
-    for opp_pos in obs['right_team']:
-        dist = distance_to(test_pos, opp_pos)
-        if dist < min_distance_to_opponent:
-            min_distance_to_opponent = dist
-    
-    return min_distance_to_opponent
+    """计算指定位置周围的空间大小（查询本步的空间网格）"""
+    return get_space_grid(obs).space_at_point(test_pos)
 
 
 def get_contention_support_position(obs, player_index, ball_pos):
     """获取争抢时的支援位置"""
-    player_role = obs['left_team_roles'][player_index]
+    obs = as_step_context(obs)
+    player_role = obs.left_team_roles[player_index]
     
     # 根据角色确定支援位置
     if player_role == PlayerRole.ATTACK_MIDFIELD:
@@ -0,0 +1,91 @@
+"""
+持球决策树共用的特征和谓词
+"""
+
+from src.utils.features import (
+    can_shoot, check_dribble_space, distance_to, find_closest_opponent,
+    get_best_pass_target, is_in_opponent_half
+)
+from src.gfootball_agent.decision_tree import Condition, Feature
+from src.gfootball_agent.config import Distance, Field
+
+RIGHT_GOAL = [Field.RIGHT_GOAL_X, Field.CENTER_Y]
+
+# 特征函数签名: fn(obs, player_index, ball_info, player_info, *依赖特征)
+# 依赖 best_target 的特征自身处理没有传球目标（-1）的情况，不依赖树中先检查 HAS_PASS_TARGET：
+# 前进幅度为 -inf、传球距离为 inf、目标角色为 None
+WITH_BALL_FEATURES = [
+    Feature('player_pos', lambda obs, i, ball_info, player_info: player_info['position'], cost=0),
+    Feature('role', lambda obs, i, ball_info, player_info: player_info['role'], cost=0),
+    Feature('opponent_distance',
+            lambda obs, i, ball_info, player_info: find_closest_opponent(obs, i)[1], cost=1),
+    Feature('goal_distance',
+            lambda obs, i, ball_info, player_info, pos: distance_to(pos, RIGHT_GOAL),
+            requires=['player_pos'], cost=1),
+    Feature('can_shoot',
+            lambda obs, i, ball_info, player_info, pos: can_shoot(pos, ball_info['position'], obs),
+            requires=['player_pos'], cost=3),
+    Feature('dribble_space',
+            lambda obs, i, ball_info, player_info: check_dribble_space(obs, i), cost=4),
+    Feature('best_target',
+            lambda obs, i, ball_info, player_info: get_best_pass_target(obs, i), cost=5),
+    Feature('pass_progress',
+            lambda obs, i, ball_info, player_info, pos, target:
+                obs.left_team[target][0] - pos[0] if target != -1 else float('-inf'),
+            requires=['player_pos', 'best_target'], cost=0),
+    Feature('pass_distance',
+            lambda obs, i, ball_info, player_info, target:
+                obs.team_distances[i, target] if target != -1 else float('inf'),
+            requires=['best_target'], cost=0),
+    Feature('target_role',
+            lambda obs, i, ball_info, player_info, target:
+                obs.left_team_roles[target] if target != -1 else None,
+            requires=['best_target'], cost=0),
+]
+
+# 常用谓词
+UNDER_PRESSURE = Condition('opponent_distance', lambda d: d < Distance.PRESSURE_DISTANCE,
+                           name='under_pressure')
+CAN_SHOOT = Condition('can_shoot', lambda shoot: shoot, name='can_shoot')
+IN_OPTIMAL_SHOT_RANGE = Condition('goal_distance', lambda d: d < Distance.OPTIMAL_SHOT_RANGE,
+                                  name='in_optimal_shot_range')
+HAS_DRIBBLE_SPACE = Condition('dribble_space', lambda space: space[0], name='has_dribble_space')
+IN_OPPONENT_HALF = Condition('player_pos', is_in_opponent_half, name='in_opponent_half')
+HAS_PASS_TARGET = Condition('best_target', lambda target: target != -1, name='has_pass_target')
+NO_PASS_TARGET = Condition('best_target', lambda target: target == -1, name='no_pass_target')
+SHORT_PASS_DISTANCE = Condition('pass_distance', lambda d: d < Distance.SHORT_PASS_RANGE,
+                                name='short_pass_distance')
+
+
+def space_greater_than(threshold):
+    """盘带空间大于阈值"""
+    return Condition('dribble_space', lambda space: space[1] > threshold,
+                     name=f'dribble_space>{threshold}')
+
+
+def pass_progress_greater_than(threshold):
+    """最佳传球目标的前进幅度大于阈值（没有传球目标时不成立）"""
+    return Condition('pass_progress', lambda progress: progress > threshold,
+                     name=f'pass_progress>{threshold}')
+
+
+def small_pass_progress(threshold):
+    """存在传球目标但前进幅度小于阈值（自身带有目标检查，可在组合中任意排序）"""
+    return Condition(('best_target', 'pass_progress'),
+                     lambda target, progress: target != -1 and progress < threshold,
+                     name=f'pass_progress<{threshold}')
+
+
+def role_in(roles, name):
+    """球员角色属于给定角色组"""
+    return Condition('role', lambda role: role in roles, name=name)
+
+
+def wide_position(threshold=0.15):
+    """球员位于边路"""
+    return Condition('player_pos', lambda pos: abs(pos[1]) > threshold, name=f'|y|>{threshold}')
+
+
+def target_role_in(roles, name):
+    """最佳传球目标的角色属于给定角色组"""
+    return Condition('target_role', lambda role: role in roles, name=name)
@@ -1,14 +1,27 @@
 """
 项目主入口，负责初始化环境和运行主循环
+
+本模块只在模块顶层导入配置：环境工作进程（vector_env、evaluation）只需要
+create_environment，决策包和 gfootball 引擎分别在第一次运行比赛、创建真实环境时才导入
 """
 
-import gfootball.env as football_env
-from src.gfootball_agent.agent import agent
+import contextlib
+
 from src.gfootball_agent.config import Action, PlayerRole
-import time
 
 def create_environment(args):
-    """创建Google Research Football环境"""
+    """
+    创建比赛环境
+    
+    args.env 为 'stand_in' 时使用纯 NumPy 实现的替身环境（不需要编译引擎），
+    否则创建 Google Research Football 环境
+    """
+    if getattr(args, 'env', 'gfootball') == 'stand_in':
+        from src.envs import StandInFootballEnv
+        return StandInFootballEnv(episode_length=args.max_steps)
+    
+    # 只有真实环境才需要 gfootball 引擎
+    import gfootball.env as football_env
     env = football_env.create_environment(
         env_name='11_vs_11_stochastic',
         representation='raw',
@@ -42,77 +55,127 @@ def get_role_name(role):
     return "UNKNOWN"
 
 
-def run_episode(env, max_steps=3000):
+def run_episode(env, max_steps=3000, football_agent=None, verbose=True, recorder=None,
+                episode_index=None):
     """
     运行一个完整的比赛回合
     
     参数:
         env: 足球环境
         max_steps: 最大步数
+        football_agent: 使用的智能体，None表示使用全局智能体
+        verbose: 是否打印过程信息
+        recorder: TraceRecorder，不为 None 时把本局写成 trace 文件
+        episode_index: 局号，决定 trace 文件名
     
     返回:
         episode_reward: 回合总奖励
         episode_length: 回合长度
+        score: 最终比分 [我方, 对方]
     """
+    if football_agent is None:
+        from src.gfootball_agent.agent import agent as football_agent
+    
     obs = env.reset()
-    agent.reset()
+    football_agent.reset()
     
     episode_reward = 0
     episode_length = 0
     
-    print("开始新的比赛回合...")
+    writer = None
+    branch_tracking = contextlib.nullcontext()
+    if recorder is not None:
+        from src.utils.profiling import profiler
+        writer = recorder.begin_episode(episode_index)
+        # 动作来自哪个叶子分支只有开启决策剖析时才知道
+        if recorder.record_branches and not profiler.enabled:
+            branch_tracking = profiler.profiling(reset=False)
     
-    for step in range(max_steps):
-        # 获取所有球员的动作
-        actions = agent.get_actions(obs)
-        # for player_index, action in enumerate(actions):
-        #     role = obs[0]['left_team_roles'][player_index]
-        #     role_name = get_role_name(role)
-        #     action_name = get_action_name(action)
-        #     print(f"  球员 {player_index}: 角色={role_name}, 动作={action_name}")
-        
-        # 执行动作
-        obs, rewards, done, info = env.step(actions)
-        
-        # 计算奖励
-        # time.sleep(0.1)
-        total_reward = sum(rewards) / 11
-        episode_reward += total_reward
-        episode_length += 1
-        
-        # 打印关键信息
-        if step % 100 == 0 or total_reward != 0:
-            print(f"步数: {step}, 奖励: {total_reward:.3f}, 比分: {obs[0]['score']}")
-            # 打印每个球员的信息
-            # for player_index, action in enumerate(actions):
-            #     role = obs['left_team_roles'][player_index]
-            #     role_name = get_role_name(role)
-            #     action_name = get_action_name(action)
-            #     print(f"  球员 {player_index}: 角色={role_name}, 动作={action_name}")
-        
-        # 检查比赛是否结束
-        if done:
-            print(f"比赛结束! 总步数: {episode_length}, 总奖励: {episode_reward:.3f}")
-            break
+    if verbose:
+        print("开始新的比赛回合...")
+    
+    try:
+        with branch_tracking:
+            for step in range(max_steps):
+                # 获取所有球员的动作
+                actions = football_agent.get_actions(obs)
+                # for player_index, action in enumerate(actions):
+                #     role = obs[0]['left_team_roles'][player_index]
+                #     role_name = get_role_name(role)
+                #     action_name = get_action_name(action)
+                #     print(f"  球员 {player_index}: 角色={role_name}, 动作={action_name}")
+                
+                # 执行动作
+                step_obs = obs
+                obs, rewards, done, info = env.step(actions)
+                
+                # 记录决策时的观测、动作和得到的奖励
+                if writer is not None:
+                    writer.append(step_obs, actions, rewards, football_agent.action_history.last_branches())
+                
+                # 计算奖励
+                # time.sleep(0.1)
+                total_reward = sum(rewards) / 11
+                episode_reward += total_reward
+                episode_length += 1
+                
+                # 打印关键信息
+                if verbose and (step % 100 == 0 or total_reward != 0):
+                    print(f"步数: {step}, 奖励: {total_reward:.3f}, 比分: {obs[0]['score']}")
+                    # 打印每个球员的信息
+                    # for player_index, action in enumerate(actions):
+                    #     role = obs['left_team_roles'][player_index]
+                    #     role_name = get_role_name(role)
+                    #     action_name = get_action_name(action)
+                    #     print(f"  球员 {player_index}: 角色={role_name}, 动作={action_name}")
+                
+                # 检查比赛是否结束
+                if done:
+                    if verbose:
+                        print(f"比赛结束! 总步数: {episode_length}, 总奖励: {episode_reward:.3f}")
+                    break
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
     
-    return episode_reward, episode_length
+    score = [int(goals) for goals in obs[0]['score']]
+    if writer is not None:
+        writer.close({'score': score, 'reward': float(episode_reward), 'length': episode_length})
+    
+    return episode_reward, episode_length, score
 
 
 def main(args):
     """主函数"""
+    if getattr(args, 'evaluate', False):
+        # 多进程并行评估模式
+        from src.evaluation import run_evaluation
+        run_evaluation(args)
+        return
+    
     print("初始化Google Research Football环境...")
     
     # 创建环境
     env = create_environment(args)
     print("环境创建成功!")
     
+    # 录制比赛轨迹
+    recorder = None
+    if getattr(args, 'trace_dir', None):
+        from src.traces import TraceRecorder
+        recorder = TraceRecorder(args.trace_dir)
+        print(f"比赛轨迹将保存到 {args.trace_dir}")
+    
     # 运行比赛
     for episode in range(args.num_episodes):
         print(f"\n=== 第 {episode + 1} 局比赛 ===")
         
-        episode_reward, episode_length = run_episode(env, args.max_steps)
+        episode_reward, episode_length, score = run_episode(env, args.max_steps, recorder=recorder,
+                                                            episode_index=episode)
         
         print(f"第 {episode + 1} 局结束:")
+        print(f"  比分: {score[0]} - {score[1]}")
         print(f"  总奖励: {episode_reward:.3f}")
         print(f"  总步数: {episode_length}")
         print("-" * 50)
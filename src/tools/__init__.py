@@ -0,0 +1,4 @@
+"""
+Tools Package
+工具脚本包
+"""
@@ -0,0 +1,371 @@
+"""
+决策延迟基准测试 - 回放存储的原始观测语料，统计每步和每个角色决策函数的延迟分位数，
+并与保存的基线比较以发现性能回退
+
+用法:
+    # 在替身环境中录制语料（混合比赛模式、控球状态、拥挤/空旷场景）
+    python -m src.tools.benchmark record --output corpus.pkl.gz --steps 3000
+
+    # 输出路径不以 .pkl.gz 结尾时写成内存映射语料目录，回放时不读入内存
+    python -m src.tools.benchmark record --output corpus/ --steps 3000
+
+    # 由录制的 trace 生成的语料目录（见 src/traces/corpus.py）同样可以回放
+    python -m src.tools.benchmark run --corpus corpus/
+
+    # 只回放命中场景条件的帧（及其前后若干步），条件写法见 src/traces/query.py
+    python -m src.tools.benchmark run --corpus corpus/ --where "possession=ours,under_pressure=true"
+
+    # 回放语料并保存为基线
+    python -m src.tools.benchmark run --corpus corpus.pkl.gz --save-baseline baseline.json
+
+    # 回放语料并与基线比较，出现回退时退出码为 1
+    python -m src.tools.benchmark run --corpus corpus.pkl.gz --baseline baseline.json
+
+    # 额外做一次剖析回放，输出决策节点耗时/叶子分支统计，并导出火焰图折叠栈
+    python -m src.tools.benchmark run --corpus corpus.pkl.gz --profile decisions.folded
+"""
+
+import argparse
+import contextlib
+import gzip
+import json
+import logging
+import os
+import pickle
+import sys
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from src.gfootball_agent.config import GameMode
+from src.traces.corpus import CorpusWriter, open_corpus
+from src.traces.query import CorpusQuery
+
+PICKLE_SUFFIX = '.pkl.gz'
+
+# 需要单独计时的决策函数（@decision_node 节点名），由剖析器的 timing 模式记录每次调用的耗时
+TIMED_NODES = [
+    'goalkeeper_decision',
+    'defender_decision',
+    'midfielder_decision',
+    'forward_decision',
+    'set_piece_decision',
+]
+
+PERCENTILES = (50, 95, 99)
+
+# 默认回退容忍度：分位数超过基线 15% 视为回退
+DEFAULT_TOLERANCE = 0.15
+
+# 样本太少时分位数波动很大，不参与回退判断
+MIN_COMPARE_SAMPLES = 200
+
+
+# ===================== 语料 =====================
+
+def save_corpus(corpus, path):
+    """
+    保存观测语料（每个元素是一步的 11 个观测字典）
+
+    路径以 .pkl.gz 结尾时保存为 pickle，否则追加到内存映射语料目录
+    """
+    if not path.endswith(PICKLE_SUFFIX):
+        with CorpusWriter(path) as writer:
+            writer.append_observations(corpus, source='benchmark record')
+        return
+    with gzip.open(path, 'wb') as f:
+        pickle.dump(corpus, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_corpus(path):
+    """加载观测语料：目录以内存映射方式打开（帧视图可直接回放），否则读取 pickle"""
+    if os.path.isdir(path):
+        return open_corpus(path)
+    with gzip.open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def _crowd_around_ball(obs_list, rng):
+    """把一半对手拉到球附近，构造拥挤场景"""
+    ball = np.asarray(obs_list[0]['ball'][:2], dtype=float)
+    right_team = np.array(obs_list[0]['right_team'], dtype=float)
+    crowded = rng.choice(np.arange(1, len(right_team)), size=len(right_team) // 2, replace=False)
+    right_team[crowded] = ball + rng.normal(0, 0.04, (len(crowded), 2))
+    return [dict(obs, right_team=right_team) for obs in obs_list]
+
+
+def _with_game_mode(obs_list, game_mode):
+    return [dict(obs, game_mode=game_mode) for obs in obs_list]
+
+
+def record_corpus(num_steps, seed=0, sample_every=1, crowd_ratio=0.2, set_piece_ratio=0.1):
+    """
+    在替身环境中运行智能体并录制观测语料
+
+    参数:
+        num_steps: 录制的步数
+        seed: 随机种子
+        sample_every: 每隔多少步保存一次观测
+        crowd_ratio: 额外构造拥挤场景的比例
+        set_piece_ratio: 额外构造定位球场景的比例（替身环境中定位球较少）
+
+    返回:
+        corpus: 观测列表的列表
+    """
+    from src.envs import StandInFootballEnv
+    from src.gfootball_agent.agent import FootballAgent
+
+    rng = np.random.default_rng(seed)
+    env = StandInFootballEnv(seed=seed)
+    football_agent = FootballAgent()
+    set_piece_modes = [GameMode.KICK_OFF, GameMode.GOAL_KICK, GameMode.FREE_KICK,
+                       GameMode.CORNER, GameMode.THROW_IN, GameMode.PENALTY]
+
+    corpus = []
+    obs = env.reset()
+    football_agent.reset()
+    for step in range(num_steps):
+        if step % sample_every == 0:
+            corpus.append(obs)
+            if rng.random() < crowd_ratio:
+                corpus.append(_crowd_around_ball(obs, rng))
+            if rng.random() < set_piece_ratio:
+                corpus.append(_with_game_mode(obs, int(rng.choice(set_piece_modes))))
+
+        actions = football_agent.get_actions(obs)
+        obs, _, done, _ = env.step(actions)
+        if done:
+            obs = env.reset()
+            football_agent.reset()
+
+    return corpus
+
+
+# ===================== 计时 =====================
+
+@contextlib.contextmanager
+def quiet_agent_logs():
+    """回放期间不输出智能体的决策异常日志（异常次数仍由智能体和剖析器统计）"""
+    agent_logger = logging.getLogger('src.gfootball_agent.agent')
+    level = agent_logger.level
+    agent_logger.setLevel(logging.CRITICAL)
+    try:
+        yield
+    finally:
+        agent_logger.setLevel(level)
+
+
+def summarize_latencies(samples):
+    """计算延迟分位数（毫秒）"""
+    values = np.asarray(samples, dtype=float) * 1e3
+    if len(values) == 0:
+        return {'count': 0}
+    summary = {'count': int(len(values)), 'mean': float(values.mean())}
+    for p, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+        summary[f'p{p}'] = float(value)
+    return summary
+
+
+def run_benchmark(corpus, repeats=1, warmup=20):
+    """
+    回放语料，统计每步、每个角色决策函数和每种比赛模式的延迟
+
+    返回:
+        report: {'step': {...}, 'roles': {name: {...}}, 'game_modes': {mode: {...}},
+                 'feature_cache': {...}}
+    """
+    from src.gfootball_agent.agent import FootballAgent
+    from src.utils.feature_cache import feature_cache
+    from src.utils.profiling import profiler
+
+    football_agent = FootballAgent()
+    step_samples = []
+    mode_samples = defaultdict(list)
+    perf_counter = time.perf_counter
+
+    # 智能体的决策异常日志不计入测量输出
+    with quiet_agent_logs():
+        for obs_list in corpus[:warmup]:
+            football_agent.get_actions(obs_list)
+
+        feature_cache.reset_stats()
+        with profiler.timing(TIMED_NODES):
+            for _ in range(repeats):
+                for obs_list in corpus:
+                    start = perf_counter()
+                    football_agent.get_actions(obs_list)
+                    elapsed = perf_counter() - start
+                    step_samples.append(elapsed)
+                    mode_samples[int(obs_list[0]['game_mode'])].append(elapsed)
+
+    return {
+        'step': summarize_latencies(step_samples),
+        'roles': {name: summarize_latencies(profiler.latencies[name]) for name in TIMED_NODES},
+        'game_modes': {str(mode): summarize_latencies(samples)
+                       for mode, samples in sorted(mode_samples.items())},
+        'feature_cache': feature_cache.stats(),
+    }
+
+
+def profile_corpus(corpus, output=None, top=20):
+    """开启决策节点剖析回放一遍语料，打印统计并可导出折叠栈"""
+    from src.gfootball_agent.agent import FootballAgent
+    from src.utils.profiling import profiler
+
+    football_agent = FootballAgent()
+    # 决策异常由剖析器按类型计数，不逐条输出日志
+    with quiet_agent_logs(), profiler.profiling():
+        for obs_list in corpus:
+            football_agent.get_actions(obs_list)
+
+    profiler.print_report(top=top)
+    if output:
+        profiler.export_collapsed(output)
+        print(f"折叠栈已导出到 {output}")
+    return profiler.report()
+
+
+# ===================== 基线比较 =====================
+
+def compare_to_baseline(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    与基线比较各项分位数
+
+    基线中样本足够的项，本次缺失或样本不足时也算回退（分位数一栏为 'count'），
+    以免计时失效的项被悄悄跳过
+
+    返回:
+        regressions: [(名称, 分位数, 基线值, 当前值), ...]
+    """
+    regressions = []
+
+    def check(name, current, reference):
+        if current.get('count', 0) < MIN_COMPARE_SAMPLES:
+            if reference.get('count', 0) >= MIN_COMPARE_SAMPLES:
+                regressions.append((name, 'count', reference['count'], current.get('count', 0)))
+            return
+        for p in PERCENTILES:
+            key = f'p{p}'
+            if key in current and key in reference and current[key] > reference[key] * (1 + tolerance):
+                regressions.append((name, key, reference[key], current[key]))
+
+    check('step', report['step'], baseline.get('step', {}))
+    for group, prefix in (('roles', ''), ('game_modes', 'game_mode=')):
+        current_group, baseline_group = report[group], baseline.get(group, {})
+        for name in list(current_group) + [name for name in baseline_group if name not in current_group]:
+            check(f'{prefix}{name}', current_group.get(name, {}), baseline_group.get(name, {}))
+    return regressions
+
+
+def _format_row(name, summary, baseline=None):
+    if summary.get('count', 0) == 0:
+        return f"  {name:<22} {'-':>8}"
+    row = f"  {name:<22} {summary['count']:>8}"
+    for p in PERCENTILES:
+        key = f'p{p}'
+        row += f" {summary[key]:>9.3f}"
+        if baseline and key in baseline:
+            change = summary[key] / baseline[key] - 1 if baseline[key] > 0 else 0.0
+            row += f" ({change:+6.1%})"
+    return row
+
+
+def print_report(report, baseline=None):
+    """打印延迟报告（单位：毫秒）"""
+    baseline = baseline or {}
+    header = f"  {'':<22} {'count':>8}" + ''.join(f" {f'p{p}':>9}" for p in PERCENTILES)
+    print("决策延迟 (ms)")
+    print(header)
+    print(_format_row('get_actions', report['step'], baseline.get('step')))
+    print("角色决策函数:")
+    for name, summary in report['roles'].items():
+        print(_format_row(name, summary, baseline.get('roles', {}).get(name)))
+    print("比赛模式:")
+    for mode, summary in report['game_modes'].items():
+        print(_format_row(f'game_mode={mode}', summary, baseline.get('game_modes', {}).get(mode)))
+    cache = report.get('feature_cache')
+    if cache:
+        print(f"特征缓存: 命中 {cache['hits']} / 未命中 {cache['misses']} "
+              f"(命中率 {cache['hit_rate']:.1%})，淘汰 {cache['evictions']}")
+
+
+# ===================== 命令行 =====================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='决策延迟基准测试')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    record = subparsers.add_parser('record', help='在替身环境中录制观测语料')
+    record.add_argument('--output', required=True, help='语料输出路径 (.pkl.gz 或内存映射语料目录)')
+    record.add_argument('--steps', type=int, default=3000, help='录制步数 (默认: 3000)')
+    record.add_argument('--seed', type=int, default=0, help='随机种子 (默认: 0)')
+    record.add_argument('--sample_every', type=int, default=1, help='采样间隔 (默认: 1)')
+
+    run = subparsers.add_parser('run', help='回放语料并统计延迟')
+    run.add_argument('--corpus', required=True, help='语料路径 (.pkl.gz 或内存映射语料目录)')
+    run.add_argument('--repeats', type=int, default=3, help='回放次数 (默认: 3)')
+    run.add_argument('--baseline', help='用于比较的基线 JSON')
+    run.add_argument('--save-baseline', dest='save_baseline', help='把本次结果保存为基线 JSON')
+    run.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                     help=f'回退容忍度 (默认: {DEFAULT_TOLERANCE})')
+    run.add_argument('--profile', help='额外剖析回放一遍，并把火焰图折叠栈导出到该路径')
+    run.add_argument('--where', help='只回放命中场景条件的帧（仅内存映射语料目录）')
+    run.add_argument('--before', type=int, default=0, help='命中帧向前扩展的步数 (默认: 0)')
+    run.add_argument('--after', type=int, default=0, help='命中帧向后扩展的步数 (默认: 0)')
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.command == 'record':
+        corpus = record_corpus(args.steps, seed=args.seed, sample_every=args.sample_every)
+        save_corpus(corpus, args.output)
+        print(f"已录制 {len(corpus)} 步观测到 {args.output}")
+        return 0
+
+    corpus = load_corpus(args.corpus)
+    if args.where:
+        if not os.path.isdir(args.corpus):
+            print("--where 只支持内存映射语料目录", file=sys.stderr)
+            return 2
+        corpus = CorpusQuery(corpus).select(args.where).window_frames(args.before, args.after)
+        if not corpus:
+            print(f"没有帧满足条件: {args.where}", file=sys.stderr)
+            return 2
+    print(f"回放 {len(corpus)} 步观测 x {args.repeats}")
+    report = run_benchmark(corpus, repeats=args.repeats)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"基线已保存到 {args.save_baseline}")
+
+    if args.profile:
+        print()
+        profile_corpus(corpus, output=args.profile)
+
+    if baseline is not None:
+        regressions = compare_to_baseline(report, baseline, args.tolerance)
+        if regressions:
+            print(f"发现 {len(regressions)} 项性能回退 (容忍度 {args.tolerance:.0%}):")
+            for name, key, reference, current in regressions:
+                if key == 'count':
+                    print(f"  {name} 样本数: {reference} -> {current}（计时缺失或样本不足）")
+                else:
+                    print(f"  {name} {key}: {reference:.3f} -> {current:.3f} ms")
+            return 1
+        print("未发现性能回退")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
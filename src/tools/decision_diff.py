@@ -0,0 +1,497 @@
+"""
+离线决策差异 - 用两个版本的智能体回放同一份观测语料，统计哪些决策发生了变化
+
+版本写法（--a / --b）:
+    current              当前工作区的代码
+    recorded             语料中录制的动作（不重新决策）
+    rev:<git 版本>        某个 git 版本的 src/（git archive 导出到临时目录）
+    profile:<json 文件>   在配置类上覆盖常量，如 {"Distance": {"PRESSURE_DISTANCE": 0.2}}
+    两者可以用 + 组合，如 rev:HEAD~1+profile:tuned.json
+
+语料按 shard_size 帧切片，两个版本各自在独立的工作进程池中回放（spawn 启动，
+git 版本的工作进程从导出的代码树导入决策包）。切片按顺序比较后立即丢弃，
+同时在途的切片数有上限，内存占用与语料大小无关。每帧决策前用帧序号设置 random 种子，
+两边的随机选择一致。报告按角色、比赛模式统计动作变化率，并随机抽样若干差异帧。
+
+用法:
+    python -m src.tools.decision_diff --corpus corpus/ --a rev:HEAD --b current
+    # 与最初的基线版本比较（较早版本的智能体没有 error_count，决策异常数记为 0）
+    python -m src.tools.decision_diff --corpus corpus/ --a rev:e1985b4 --b current
+    python -m src.tools.decision_diff --corpus corpus/ --a current --b profile:tuned.json --workers 8
+    python -m src.tools.decision_diff --corpus corpus/ --a recorded --b current --output diff.json
+    # 只比较命中场景条件的帧（及其前后若干步），条件写法见 src/traces/query.py
+    python -m src.tools.decision_diff --corpus corpus/ --a rev:HEAD --b current --where "game_mode=corner" --after 30
+"""
+
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src.gfootball_agent.config import Action, GameMode, PlayerRole
+from src.traces.corpus import EPISODE_FIELD, open_corpus
+from src.traces.query import CorpusQuery
+from src.traces.recorder import ACTION_FIELD, BRANCH_FIELD, UNKNOWN_BRANCH
+
+CURRENT = 'current'
+RECORDED = 'recorded'
+
+DEFAULT_SHARD_SIZE = 2048
+DEFAULT_SAMPLES = 20
+
+# 每个工作进程最多同时排队的切片数（决定在途内存上限）
+IN_FLIGHT_PER_WORKER = 2
+
+ACTION_NAMES = {value: name for name, value in vars(Action).items() if not name.startswith('_')}
+ROLE_NAMES = {value: name for name, value in vars(PlayerRole).items() if not name.startswith('_')}
+GAME_MODE_NAMES = {value: name for name, value in vars(GameMode).items() if not name.startswith('_')}
+
+
+# ===================== 版本 =====================
+
+class AgentVersion:
+    """
+    参与比较的一个智能体版本
+
+    root: 导出的代码树目录（None 为当前工作区）
+    profile: 配置覆盖 {类名: {常量名: 值}}
+    """
+
+    def __init__(self, spec, root=None, profile=None, recorded=False):
+        self.spec = spec
+        self.root = root
+        self.profile = profile or {}
+        self.recorded = recorded
+
+
+def parse_version(spec, workdir):
+    """
+    解析版本写法；git 版本导出到 workdir 下
+
+    返回:
+        AgentVersion
+    """
+    if spec == RECORDED:
+        return AgentVersion(spec, recorded=True)
+
+    root = None
+    profile = {}
+    for part in spec.split('+'):
+        if part == CURRENT:
+            continue
+        kind, _, value = part.partition(':')
+        if kind == 'rev' and value:
+            root = export_revision(value, os.path.join(workdir, f"rev{len(os.listdir(workdir))}"))
+        elif kind == 'profile' and value:
+            with open(value) as f:
+                profile.update(json.load(f))
+        else:
+            raise ValueError(f"无法识别的版本写法: {spec}")
+    return AgentVersion(spec, root=root, profile=profile)
+
+
+def export_revision(revision, directory):
+    """把某个 git 版本的 src/ 导出到 directory，返回 directory"""
+    archive = subprocess.run(['git', 'archive', '--format=tar', revision, 'src'],
+                             capture_output=True, check=True).stdout
+    os.makedirs(directory)
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(directory)
+    return directory
+
+
+def apply_profile(profile):
+    """在配置类上覆盖常量（需在导入决策包之前调用，导入时读取的常量才会生效）"""
+    from src.gfootball_agent import config
+
+    for class_name, values in profile.items():
+        target = getattr(config, class_name, None)
+        if not isinstance(target, type):
+            raise ValueError(f"配置中没有类 {class_name}")
+        for name, value in values.items():
+            if not hasattr(target, name):
+                raise ValueError(f"配置类 {class_name} 中没有常量 {name}")
+            setattr(target, name, value)
+
+
+def _use_source_tree(root):
+    """
+    之后的 src.* 导入改为从 root 下的代码树加载
+
+    已加载的当前工作区模块（语料读取等）仍被本模块引用，可以继续使用
+    """
+    for name in list(sys.modules):
+        if name == 'src' or name.startswith('src.'):
+            del sys.modules[name]
+    sys.path.insert(0, root)
+
+
+# ===================== 工作进程 =====================
+
+_worker = {}
+
+
+def _init_worker(version, corpus_dir):
+    """工作进程初始化：切换代码树、应用配置覆盖、创建智能体"""
+    # 语料在切换代码树之前用当前工作区的代码打开
+    _worker['corpus'] = open_corpus(corpus_dir)
+    if version.root is not None:
+        _use_source_tree(version.root)
+    apply_profile(version.profile)
+
+    from src.gfootball_agent.agent import FootballAgent
+    _worker['agent'] = FootballAgent()
+    # 其他版本的代码不一定接受语料的帧视图，转换成普通观测字典
+    _worker['materialize'] = version.root is not None
+
+
+def _materialize(frame):
+    return [{key: value.copy() if isinstance(value, np.ndarray) else value
+             for key, value in player_obs.items()} for player_obs in frame]
+
+
+def _error_count(football_agent):
+    # 较早版本的智能体不统计决策异常次数（没有 error_count），记为 0
+    return getattr(football_agent, 'error_count', 0)
+
+
+def _replay_shard(start, stop):
+    """
+    在工作进程中回放 [start, stop) 帧
+
+    返回:
+        (actions, errors): (帧数, 球员数) 动作数组和决策异常次数
+    """
+    corpus = _worker['corpus']
+    football_agent = _worker['agent']
+    materialize = _worker['materialize']
+    episodes = corpus.columns[EPISODE_FIELD]
+
+    # 每局开始时重置智能体（切片可能从一局中间开始，决策不依赖之前的步）
+    actions = np.empty((stop - start, corpus.num_players), dtype=np.int16)
+    errors = 0
+    previous_episode = None
+    for row, frame in enumerate(corpus.frames(start, stop)):
+        episode = episodes[frame.index]
+        if episode != previous_episode:
+            errors += _error_count(football_agent)
+            football_agent.reset()
+            previous_episode = episode
+        random.seed(frame.index)
+        actions[row] = football_agent.get_actions(_materialize(frame) if materialize else frame)
+    return actions, errors + _error_count(football_agent)
+
+
+# ===================== 统计 =====================
+
+class DiffStats:
+    """
+    按 (角色, 比赛模式) 累计决策数和变化数，并对差异做有界的均匀抽样
+
+    抽样给每个差异分配一个随机键，只保留键最小的 num_samples 个，与流的长度无关
+    """
+
+    def __init__(self, num_samples=DEFAULT_SAMPLES, seed=0):
+        self.num_samples = num_samples
+        self.rng = np.random.default_rng(seed)
+        self.decisions = np.zeros((0, 0), dtype=np.int64)
+        self.changed = np.zeros((0, 0), dtype=np.int64)
+        self.transitions = {}
+        self.frames = 0
+        self.changed_frames = 0
+        self.errors = [0, 0]
+        self._sample_keys = np.zeros(0)
+        self._samples = np.zeros((0, 4), dtype=np.int64)  # 帧序号、球员、A 动作、B 动作
+
+    def _grow(self, roles, modes):
+        shape = (max(self.decisions.shape[0], roles), max(self.decisions.shape[1], modes))
+        if shape != self.decisions.shape:
+            for name in ('decisions', 'changed'):
+                grown = np.zeros(shape, dtype=np.int64)
+                old = getattr(self, name)
+                grown[:old.shape[0], :old.shape[1]] = old
+                setattr(self, name, grown)
+
+    def add(self, start, actions_a, actions_b, roles, game_modes):
+        """累计一个切片的比较结果"""
+        changed = actions_a != actions_b
+        roles = np.asarray(roles, dtype=np.int64)
+        modes = np.broadcast_to(np.asarray(game_modes, dtype=np.int64)[:, None], roles.shape)
+        self._grow(int(roles.max()) + 1, int(modes.max()) + 1)
+
+        num_modes = self.decisions.shape[1]
+        cells = (roles * num_modes + modes).ravel()
+        size = self.decisions.size
+        self.decisions += np.bincount(cells, minlength=size).reshape(self.decisions.shape)
+        self.changed += np.bincount(cells[changed.ravel()], minlength=size).reshape(self.decisions.shape)
+        self.frames += len(actions_a)
+        self.changed_frames += int(changed.any(axis=1).sum())
+
+        rows, players = np.nonzero(changed)
+        for pair in zip(actions_a[rows, players].tolist(), actions_b[rows, players].tolist()):
+            self.transitions[pair] = self.transitions.get(pair, 0) + 1
+
+        if self.num_samples and len(rows):
+            keys = np.concatenate([self._sample_keys, self.rng.random(len(rows))])
+            samples = np.concatenate([self._samples, np.stack(
+                [rows + start, players, actions_a[rows, players], actions_b[rows, players]], axis=1)])
+            keep = np.argsort(keys, kind='stable')[:self.num_samples]
+            self._sample_keys, self._samples = keys[keep], samples[keep]
+
+    @property
+    def samples(self):
+        """抽样的差异 [(帧序号, 球员, A 动作, B 动作), ...]，按帧序号排序"""
+        order = np.lexsort((self._samples[:, 1], self._samples[:, 0]))
+        return [tuple(int(v) for v in sample) for sample in self._samples[order]]
+
+    def rates(self, axis):
+        """沿某一维汇总：axis=1 按角色，axis=0 按比赛模式；返回 {值: (决策数, 变化数)}"""
+        decisions = self.decisions.sum(axis=axis)
+        changed = self.changed.sum(axis=axis)
+        return {value: (int(decisions[value]), int(changed[value]))
+                for value in range(len(decisions)) if decisions[value] > 0}
+
+
+def _shards(start, stop, shard_size):
+    for shard_start in range(start, stop, shard_size):
+        yield shard_start, min(shard_start + shard_size, stop)
+
+
+def _recorded_actions(corpus, start, stop):
+    return np.asarray(corpus.columns[ACTION_FIELD][start:stop], dtype=np.int16), 0
+
+
+class _Immediate:
+    """与 Future 接口一致的已完成结果（录制的动作不需要工作进程）"""
+
+    def __init__(self, value):
+        self.value = value
+
+    def result(self):
+        return self.value
+
+
+def run_diff(corpus_dir, version_a, version_b, workers=None, shard_size=DEFAULT_SHARD_SIZE,
+             num_samples=DEFAULT_SAMPLES, start=0, stop=None, seed=0, on_progress=None, ranges=None):
+    """
+    用两个版本回放语料并比较动作
+
+    参数:
+        corpus_dir: 内存映射语料目录
+        version_a / version_b: AgentVersion
+        workers: 工作进程总数，在需要回放的版本之间平分
+        shard_size: 每个切片的帧数
+        num_samples: 抽样的差异数
+        start / stop: 只比较这一段帧
+        ranges: 只比较这些 [start, stop) 片段（如 Selection.windows 的结果），与 start / stop 取交集
+        on_progress: 每比较完一个切片时的回调，参数为 (已比较帧数, 总帧数)
+
+    返回:
+        stats: DiffStats
+    """
+    corpus = open_corpus(corpus_dir)
+    stop = len(corpus) if stop is None else min(stop, len(corpus))
+    ranges = [(start, stop)] if ranges is None else [
+        (max(int(range_start), start), min(int(range_stop), stop)) for range_start, range_stop in ranges
+        if min(int(range_stop), stop) > max(int(range_start), start)]
+    total = sum(range_stop - range_start for range_start, range_stop in ranges)
+    workers = workers or os.cpu_count() or 1
+    replayed = [version for version in (version_a, version_b) if not version.recorded]
+    per_version = max(1, workers // max(1, len(replayed)))
+
+    context = multiprocessing.get_context('spawn')
+    pools = {}
+    for version in replayed:
+        pools[id(version)] = ProcessPoolExecutor(max_workers=per_version, mp_context=context,
+                                                 initializer=_init_worker,
+                                                 initargs=(version, corpus.directory))
+
+    def submit(version, shard_start, shard_stop):
+        if version.recorded:
+            return _Immediate(_recorded_actions(corpus, shard_start, shard_stop))
+        return pools[id(version)].submit(_replay_shard, shard_start, shard_stop)
+
+    stats = DiffStats(num_samples, seed)
+    roles = corpus.columns['left_team_roles']
+    game_modes = corpus.columns['game_mode']
+    window = deque()
+    compared = 0
+
+    def compare_oldest():
+        nonlocal compared
+        shard_start, shard_stop, future_a, future_b = window.popleft()
+        (actions_a, errors_a), (actions_b, errors_b) = future_a.result(), future_b.result()
+        stats.errors[0] += errors_a
+        stats.errors[1] += errors_b
+        stats.add(shard_start, actions_a, actions_b,
+                  roles[shard_start:shard_stop], game_modes[shard_start:shard_stop])
+        compared += shard_stop - shard_start
+        if on_progress is not None:
+            on_progress(compared, total)
+
+    try:
+        for range_start, range_stop in ranges:
+            for shard_start, shard_stop in _shards(range_start, range_stop, shard_size):
+                window.append((shard_start, shard_stop,
+                               submit(version_a, shard_start, shard_stop),
+                               submit(version_b, shard_start, shard_stop)))
+                if len(window) >= per_version * IN_FLIGHT_PER_WORKER:
+                    compare_oldest()
+        while window:
+            compare_oldest()
+    finally:
+        for pool in pools.values():
+            pool.shutdown(cancel_futures=True)
+    return stats
+
+
+# ===================== 报告 =====================
+
+def _rate_row(name, decisions, changed):
+    rate = changed / decisions if decisions else 0.0
+    return f"  {name:<20} {decisions:>12} {changed:>10} {rate:>9.2%}"
+
+
+def build_report(stats, corpus, version_a, version_b):
+    """把统计结果整理成可 JSON 序列化的报告"""
+    episodes = corpus.columns[EPISODE_FIELD]
+    steps = corpus.columns['step']
+    branches = corpus.columns[BRANCH_FIELD]
+    samples = []
+    for frame, player, action_a, action_b in stats.samples:
+        branch = int(branches[frame, player])
+        samples.append({
+            'frame': frame,
+            'episode': int(episodes[frame]),
+            'step': int(steps[frame]),
+            'player': player,
+            'role': ROLE_NAMES.get(int(corpus.columns['left_team_roles'][frame, player]), 'UNKNOWN'),
+            'game_mode': GAME_MODE_NAMES.get(int(corpus.columns['game_mode'][frame]), 'UNKNOWN'),
+            'a': ACTION_NAMES.get(action_a, str(action_a)),
+            'b': ACTION_NAMES.get(action_b, str(action_b)),
+            'recorded_branch': corpus.branch_names[branch] if branch != UNKNOWN_BRANCH else None,
+        })
+
+    decisions = int(stats.decisions.sum())
+    changed = int(stats.changed.sum())
+    transitions = sorted(stats.transitions.items(), key=lambda item: -item[1])
+    return {
+        'a': version_a.spec,
+        'b': version_b.spec,
+        'frames': stats.frames,
+        'changed_frames': stats.changed_frames,
+        'decisions': decisions,
+        'changed': changed,
+        'change_rate': changed / decisions if decisions else 0.0,
+        'errors': {'a': stats.errors[0], 'b': stats.errors[1]},
+        'roles': {ROLE_NAMES.get(role, str(role)): {'decisions': d, 'changed': c}
+                  for role, (d, c) in stats.rates(axis=1).items()},
+        'game_modes': {GAME_MODE_NAMES.get(mode, str(mode)): {'decisions': d, 'changed': c}
+                       for mode, (d, c) in stats.rates(axis=0).items()},
+        'role_game_modes': {
+            f"{ROLE_NAMES.get(role, str(role))}/{GAME_MODE_NAMES.get(mode, str(mode))}":
+                {'decisions': int(stats.decisions[role, mode]), 'changed': int(stats.changed[role, mode])}
+            for role, mode in zip(*np.nonzero(stats.decisions))
+        },
+        'transitions': [{'a': ACTION_NAMES.get(a, str(a)), 'b': ACTION_NAMES.get(b, str(b)), 'count': count}
+                        for (a, b), count in transitions],
+        'samples': samples,
+    }
+
+
+def print_report(report, top=10):
+    """打印决策差异报告"""
+    print(f"决策差异: A = {report['a']}, B = {report['b']}")
+    print(f"  帧数 {report['frames']}，有变化的帧 {report['changed_frames']}；"
+          f"球员决策 {report['decisions']}，变化 {report['changed']} ({report['change_rate']:.2%})")
+    if report['errors']['a'] or report['errors']['b']:
+        print(f"  决策异常: A {report['errors']['a']} 次, B {report['errors']['b']} 次")
+
+    header = f"  {'':<20} {'决策数':>12} {'变化':>10} {'变化率':>9}"
+    for title, key in (("按角色:", 'roles'), ("按比赛模式:", 'game_modes')):
+        print(title)
+        print(header)
+        for name, row in report[key].items():
+            print(_rate_row(name, row['decisions'], row['changed']))
+
+    if report['transitions']:
+        print(f"最常见的动作变化 (前 {top}):")
+        for row in report['transitions'][:top]:
+            print(f"  {row['a']:>16} -> {row['b']:<16} {row['count']:>8}")
+
+    if report['samples']:
+        print("差异帧抽样:")
+        for sample in report['samples']:
+            branch = f" [录制分支 {sample['recorded_branch']}]" if sample['recorded_branch'] else ''
+            print(f"  帧 {sample['frame']} (第 {sample['episode']} 局第 {sample['step']} 步) "
+                  f"球员 {sample['player']} {sample['role']} {sample['game_mode']}: "
+                  f"{sample['a']} -> {sample['b']}{branch}")
+
+
+# ===================== 命令行 =====================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='离线决策差异')
+    parser.add_argument('--corpus', required=True, help='内存映射语料目录')
+    parser.add_argument('--a', default=RECORDED, help=f'版本 A (默认: {RECORDED})')
+    parser.add_argument('--b', default=CURRENT, help=f'版本 B (默认: {CURRENT})')
+    parser.add_argument('--workers', type=int, default=None, help='工作进程总数 (默认: CPU核心数)')
+    parser.add_argument('--shard_size', type=int, default=DEFAULT_SHARD_SIZE,
+                        help=f'每个切片的帧数 (默认: {DEFAULT_SHARD_SIZE})')
+    parser.add_argument('--samples', type=int, default=DEFAULT_SAMPLES,
+                        help=f'抽样的差异数 (默认: {DEFAULT_SAMPLES})')
+    parser.add_argument('--start', type=int, default=0, help='起始帧 (默认: 0)')
+    parser.add_argument('--stop', type=int, default=None, help='结束帧 (默认: 语料末尾)')
+    parser.add_argument('--where', help='只比较命中场景条件的帧，如 "game_mode=corner,possession=ours"')
+    parser.add_argument('--before', type=int, default=0, help='命中帧向前扩展的步数 (默认: 0)')
+    parser.add_argument('--after', type=int, default=0, help='命中帧向后扩展的步数 (默认: 0)')
+    parser.add_argument('--seed', type=int, default=0, help='抽样随机种子 (默认: 0)')
+    parser.add_argument('--output', help='把报告保存为 JSON')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    ranges = None
+    if args.where:
+        selection = CorpusQuery(open_corpus(args.corpus)).select(args.where)
+        ranges = selection.windows(args.before, args.after)
+        print(f"场景条件命中 {len(selection)} 帧，{len(ranges)} 个片段", file=sys.stderr)
+    workdir = tempfile.mkdtemp(prefix='decision_diff_')
+    try:
+        version_a = parse_version(args.a, workdir)
+        version_b = parse_version(args.b, workdir)
+
+        def progress(done, total):
+            print(f"\r已比较 {done}/{total} 帧", end='', file=sys.stderr, flush=True)
+
+        stats = run_diff(args.corpus, version_a, version_b, workers=args.workers,
+                         shard_size=args.shard_size, num_samples=args.samples,
+                         start=args.start, stop=args.stop, seed=args.seed, on_progress=progress,
+                         ranges=ranges)
+        print(file=sys.stderr)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = build_report(stats, open_corpus(args.corpus), version_a, version_b)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"报告已保存到 {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+启动耗时报告 - 统计从冷启动到第一次决策的各阶段耗时
+
+依次计时：导入 numpy、配置、决策包、入口模块，导入环境模块（真实环境为 gfootball 引擎），
+创建环境、env.reset、第一次 get_actions，最后用若干步热身后的平均决策耗时作对比。
+每个阶段同时给出新加载的模块数。导入耗时只有在全新的解释器里才准确，
+因此本模块的顶层只导入标准库，被计时的模块都在对应阶段内才导入。
+
+用法:
+    python -m src.tools.startup --env stand_in
+    python -m src.tools.startup --env gfootball --steps 50
+    python run.py --env stand_in --startup_report
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+import time
+
+# 第一次决策之后再计时的步数，用于和冷启动的第一次决策对比
+DEFAULT_WARM_STEPS = 20
+
+FIRST_DECISION = '第一次决策 (get_actions)'
+
+
+class StartupReport:
+    """
+    按顺序记录各阶段的耗时（秒）和新加载的模块数
+
+    warm_decision: 热身后的平均决策耗时，只作对比，不计入合计
+    """
+
+    def __init__(self):
+        self.stages = []
+        self.warm_decision = None
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        modules_before = len(sys.modules)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stages.append((name, elapsed, len(sys.modules) - modules_before))
+
+    @property
+    def total(self):
+        return sum(elapsed for _, elapsed, _ in self.stages)
+
+    def as_dict(self):
+        stages = {name: {'ms': elapsed * 1e3, 'modules': modules}
+                  for name, elapsed, modules in self.stages}
+        warm = None if self.warm_decision is None else self.warm_decision * 1e3
+        return {'stages': stages, 'total_ms': self.total * 1e3, 'warm_decision_ms': warm}
+
+    def print(self):
+        """打印各阶段耗时（毫秒）及占比"""
+        total = self.total
+        print("启动耗时 (ms)")
+        print(f"  {'':<28} {'耗时':>10} {'占比':>8} {'新模块':>8}")
+        for name, elapsed, modules in self.stages:
+            share = elapsed / total if total > 0 else 0.0
+            print(f"  {name:<28} {elapsed * 1e3:>10.2f} {share:>8.1%} {modules:>8}")
+        print(f"  {'合计':<28} {total * 1e3:>10.2f}")
+
+        if self.warm_decision:
+            first = next((elapsed for name, elapsed, _ in self.stages if name == FIRST_DECISION), 0.0)
+            print(f"热身后平均决策耗时: {self.warm_decision * 1e3:.3f} ms "
+                  f"(第一次决策为其 {first / self.warm_decision:.1f} 倍)")
+
+
+def measure_startup(args, warm_steps=DEFAULT_WARM_STEPS):
+    """
+    按正常运行的顺序启动一次，记录各阶段耗时
+
+    参数:
+        args: 与 run.py 相同的命令行参数（使用 env / max_steps / render 等字段）
+        warm_steps: 第一次决策之后继续计时的步数
+
+    返回:
+        report: StartupReport
+    """
+    report = StartupReport()
+
+    with report.stage('import numpy'):
+        import numpy  # noqa: F401
+    with report.stage('import config'):
+        import src.gfootball_agent.config  # noqa: F401
+    with report.stage('import 决策包 (agent)'):
+        from src.gfootball_agent.agent import FootballAgent
+    with report.stage('import 入口 (src.main)'):
+        from src.main import create_environment
+
+    # create_environment 内部才导入环境模块，这里先单独计时导入
+    if getattr(args, 'env', 'gfootball') == 'stand_in':
+        with report.stage('import 替身环境'):
+            import src.envs  # noqa: F401
+    else:
+        with report.stage('import gfootball.env'):
+            import gfootball.env  # noqa: F401
+
+    with report.stage('创建环境'):
+        env = create_environment(args)
+    with report.stage('env.reset'):
+        obs = env.reset()
+
+    # 智能体的异常日志不计入测量输出
+    with contextlib.redirect_stdout(io.StringIO()):
+        with report.stage('创建智能体'):
+            football_agent = FootballAgent()
+            football_agent.reset()
+        with report.stage(FIRST_DECISION):
+            actions = football_agent.get_actions(obs)
+
+        elapsed = 0.0
+        steps = 0
+        for _ in range(warm_steps):
+            obs, _, done, _ = env.step(actions)
+            if done:
+                break
+            start = time.perf_counter()
+            actions = football_agent.get_actions(obs)
+            elapsed += time.perf_counter() - start
+            steps += 1
+
+    if steps:
+        report.warm_decision = elapsed / steps
+
+    close = getattr(env, 'close', None)
+    if close is not None:
+        close()
+    return report
+
+
+def run_startup_report(args, warm_steps=DEFAULT_WARM_STEPS):
+    """测量并打印启动耗时（run.py --startup_report 使用）"""
+    report = measure_startup(args, warm_steps=warm_steps)
+    report.print()
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='启动耗时报告')
+    parser.add_argument('--env', type=str, default='stand_in', choices=['gfootball', 'stand_in'],
+                        help='比赛环境 (默认: stand_in)')
+    parser.add_argument('--steps', type=int, default=DEFAULT_WARM_STEPS,
+                        help=f'第一次决策之后继续计时的步数 (默认: {DEFAULT_WARM_STEPS})')
+    parser.add_argument('--max_steps', type=int, default=3000, help='每局最大步数 (默认: 3000)')
+    parser.add_argument('--render', action='store_true', default=False, help='启用渲染 (默认: False)')
+    parser.add_argument('--write_video', action='store_true', default=False)
+    parser.add_argument('--logdir', type=str, default='')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    run_startup_report(args, warm_steps=args.steps)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
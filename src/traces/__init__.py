@@ -0,0 +1,7 @@
+"""
+Traces Package
+比赛轨迹包
+"""
+
+from src.traces.recorder import TraceRecorder, TraceWriter
+from src.traces.trace import Trace, load_trace
@@ -0,0 +1,469 @@
+"""
+内存映射观测语料 - 把大量原始观测帧按列存成定长数组文件，用 np.memmap 打开
+
+    corpus/
+    ├── meta.json            # 帧数、球员数、字段 dtype/形状、分支名称、每局的起始帧和比赛信息
+    ├── ball.bin             # (帧数, 3) float64，C 顺序原始字节
+    ├── left_team.bin        # (帧数, 11, 2)
+    ├── sticky_actions.bin   # (帧数, 11, 10)
+    ├── action.bin           # 录制时的动作（没有时为 NO_ACTION），reward / branch 同理
+    ├── episode.bin          # 每帧所属的局号
+    ├── step.bin             # 每帧在本局中的步数
+    ├── index/               # 场景索引（控球、球区域、比分、角色决策函数等，见 src/traces/index.py）
+    └── ...
+
+打开语料只映射文件，不读入内存。迭代得到的 ObservationFrame 是按帧的轻量视图，
+可以直接交给 FootballAgent.get_actions，字段在访问时才从映射中取出（数组字段为只读视图）；
+iter_batches 给出的堆叠观测可以直接交给 get_actions_batch。
+语料可以由 trace 文件或观测列表追加生成，已有语料上继续追加时只在文件末尾写入，
+同时为新帧计算场景索引，供 src/traces/query.py 按条件检索帧。
+
+用法:
+    python -m src.traces.corpus build --output corpus/ traces/
+    python -m src.traces.corpus info corpus/
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+
+from src.traces.index import IndexWriter
+from src.traces.recorder import (
+    ACTION_FIELD, BRANCH_FIELD, OBSERVATION_DTYPES, PLAYER_OBSERVATION_DTYPES, REWARD_FIELD,
+    STEP_DTYPES, TRACE_SUFFIX, UNKNOWN_BRANCH, fill_observation_row, observation_fields
+)
+from src.traces.trace import load_trace
+
+CORPUS_FORMAT = 'gfootball-agent-corpus'
+CORPUS_VERSION = 1
+
+# 每帧所属的局号和局内步数
+EPISODE_FIELD = 'episode'
+STEP_FIELD = 'step'
+INDEX_DTYPES = {
+    EPISODE_FIELD: np.int32,
+    STEP_FIELD: np.int32,
+}
+
+# 没有录制动作的帧
+NO_ACTION = -1
+
+# 堆叠观测（get_actions_batch 的输入）不包含的按球员字段，与 stack_observations 一致
+_UNBATCHED_FIELDS = ('active', 'designated')
+
+
+def column_path(directory, field):
+    return os.path.join(directory, f"{field}.bin")
+
+
+def read_corpus_meta(directory):
+    """读取并校验语料的元数据"""
+    with open(os.path.join(directory, 'meta.json')) as f:
+        meta = json.load(f)
+    if meta.get('format') != CORPUS_FORMAT:
+        raise ValueError(f"不是观测语料目录: {directory}")
+    if meta.get('version', 0) > CORPUS_VERSION:
+        raise ValueError(f"语料版本 {meta['version']} 高于支持的版本 {CORPUS_VERSION}: {directory}")
+    return meta
+
+
+def map_column(directory, field, spec, num_frames):
+    """以只读方式映射一列（返回普通 ndarray 视图，映射随数组存活）"""
+    dtype = np.dtype(spec['dtype'])
+    shape = (num_frames,) + tuple(spec['shape'])
+    if num_frames == 0:
+        # 空文件无法映射
+        return np.zeros(shape, dtype=dtype)
+    return np.asarray(np.memmap(column_path(directory, field), dtype=dtype, mode='r', shape=shape))
+
+
+# ===================== 视图 =====================
+
+class PlayerObservation(Mapping):
+    """
+    一名球员一帧的观测视图，行为与 raw 观测字典相同（只读）
+
+    标量字段返回 Python 数值，数组字段返回映射上的只读视图
+    """
+
+    __slots__ = ('_corpus', '_index', '_player')
+
+    def __init__(self, corpus, index, player):
+        self._corpus = corpus
+        self._index = index
+        self._player = player
+
+    def __getitem__(self, key):
+        column = self._corpus._shared.get(key)
+        if column is not None:
+            value = column[self._index]
+        else:
+            column = self._corpus._per_player.get(key)
+            if column is None:
+                raise KeyError(key)
+            value = column[self._index, self._player]
+        return value.item() if value.ndim == 0 else value
+
+    def __iter__(self):
+        yield from self._corpus._shared
+        yield from self._corpus._per_player
+
+    def __len__(self):
+        return len(self._corpus._shared) + len(self._corpus._per_player)
+
+
+class ObservationFrame(Sequence):
+    """
+    语料中一帧的观测列表视图（每名球员一个 PlayerObservation）
+
+    可以直接交给 FootballAgent.get_actions；index 为该帧在语料中的序号
+    """
+
+    __slots__ = ('_corpus', 'index')
+
+    def __init__(self, corpus, index):
+        self._corpus = corpus
+        self.index = index
+
+    def __len__(self):
+        return self._corpus.num_players
+
+    def __getitem__(self, player):
+        if isinstance(player, slice):
+            return [self[i] for i in range(*player.indices(len(self)))]
+        if player < 0:
+            player += len(self)
+        if not 0 <= player < len(self):
+            raise IndexError(player)
+        return PlayerObservation(self._corpus, self.index, player)
+
+    @property
+    def episode(self):
+        return int(self._corpus.columns[EPISODE_FIELD][self.index])
+
+    @property
+    def step(self):
+        return int(self._corpus.columns[STEP_FIELD][self.index])
+
+    @property
+    def actions(self):
+        """录制时的动作（没有录制时全为 NO_ACTION）"""
+        return self._corpus.columns[ACTION_FIELD][self.index]
+
+
+class ObservationCorpus:
+    """
+    以 np.memmap 打开的观测语料
+
+    columns: 字段名 -> (帧数, ...) 只读数组
+    episodes: 每局的 {'start', 'length', 'source', 'info'}
+    """
+
+    def __init__(self, directory):
+        self.directory = os.fspath(directory)
+        self.meta = read_corpus_meta(self.directory)
+        self.num_frames = self.meta['num_frames']
+        self.num_players = self.meta['num_players']
+        self.columns = {field: map_column(self.directory, field, spec, self.num_frames)
+                        for field, spec in self.meta['fields'].items()}
+        self._shared = {key: self.columns[key] for key in OBSERVATION_DTYPES if key in self.columns}
+        self._per_player = {key: self.columns[key] for key in PLAYER_OBSERVATION_DTYPES
+                            if key in self.columns}
+
+    def __len__(self):
+        return self.num_frames
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [ObservationFrame(self, i) for i in range(*index.indices(self.num_frames))]
+        if index < 0:
+            index += self.num_frames
+        if not 0 <= index < self.num_frames:
+            raise IndexError(index)
+        return ObservationFrame(self, index)
+
+    def __iter__(self):
+        return self.frames()
+
+    @property
+    def episodes(self):
+        return self.meta['episodes']
+
+    @property
+    def branch_names(self):
+        return self.meta['branch_names']
+
+    def frames(self, start=0, stop=None):
+        """依次给出 [start, stop) 的帧视图"""
+        stop = self.num_frames if stop is None else min(stop, self.num_frames)
+        for index in range(start, stop):
+            yield ObservationFrame(self, index)
+
+    def episode_frames(self, episode_index):
+        """某一局的全部帧视图"""
+        episode = self.episodes[episode_index]
+        return self.frames(episode['start'], episode['start'] + episode['length'])
+
+    def stacked(self, start, stop):
+        """[start, stop) 帧的堆叠观测（映射上的视图，不复制），可直接交给 get_actions_batch"""
+        batch = {key: column[start:stop] for key, column in self._shared.items()
+                 if key not in _UNBATCHED_FIELDS}
+        batch['sticky_actions'] = self.columns['sticky_actions'][start:stop]
+        return batch
+
+    def iter_batches(self, batch_size, start=0, stop=None):
+        """按 batch_size 帧一批给出堆叠观测"""
+        stop = self.num_frames if stop is None else min(stop, self.num_frames)
+        for batch_start in range(start, stop, batch_size):
+            yield self.stacked(batch_start, min(batch_start + batch_size, stop))
+
+
+def open_corpus(directory):
+    """打开观测语料（只映射文件，不读入内存）"""
+    return ObservationCorpus(directory)
+
+
+# ===================== 写入 =====================
+
+class CorpusWriter:
+    """
+    向语料目录追加整局的帧
+
+    目录中已有语料时在其后追加（字段必须一致），上次中断留下的超出 num_frames 的尾部数据会被截掉。
+    元数据在 flush / close 时写入，只有写入元数据后的帧才算进语料。
+    每追加一局同时追加这些帧的场景索引；已有语料的索引缺失或落后时先补齐。
+    """
+
+    def __init__(self, directory, num_players=11):
+        self.directory = os.fspath(directory)
+        os.makedirs(self.directory, exist_ok=True)
+        meta_path = os.path.join(self.directory, 'meta.json')
+        if os.path.exists(meta_path):
+            self.meta = read_corpus_meta(self.directory)
+        else:
+            self.meta = {
+                'format': CORPUS_FORMAT,
+                'version': CORPUS_VERSION,
+                'num_frames': 0,
+                'num_players': num_players,
+                'fields': None,
+                'branch_names': [],
+                'episodes': [],
+            }
+        self.num_players = self.meta['num_players']
+        self._branch_ids = {name: i for i, name in enumerate(self.meta['branch_names'])}
+        self._files = {}
+        if self.meta['fields'] is not None:
+            self._open_files()
+        self._index = IndexWriter(self.directory, self.num_players)
+        self._update_index()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def num_frames(self):
+        return self.meta['num_frames']
+
+    def _fields(self):
+        return {field: (np.dtype(spec['dtype']), tuple(spec['shape']))
+                for field, spec in self.meta['fields'].items()}
+
+    def _open_files(self):
+        for field, (dtype, shape) in self._fields().items():
+            path = column_path(self.directory, field)
+            row_bytes = dtype.itemsize * int(np.prod(shape, dtype=np.int64))
+            mode = 'r+b' if os.path.exists(path) else 'w+b'
+            f = open(path, mode)
+            f.truncate(self.num_frames * row_bytes)
+            f.seek(0, os.SEEK_END)
+            self._files[field] = f
+
+    def _update_index(self):
+        """为已有语料中还没有索引的帧补齐索引"""
+        if self._index.num_frames > self.num_frames:
+            self._index.reset()
+        if self._index.num_frames == self.num_frames:
+            return
+        columns = {field: map_column(self.directory, field, spec, self.num_frames)[self._index.num_frames:]
+                   for field, spec in self.meta['fields'].items()}
+        self._index.append(columns)
+
+    def _set_fields(self, fields):
+        """第一次写入时确定字段；之后的写入必须与之一致"""
+        specs = {field: {'dtype': dtype.str, 'shape': list(shape)} for field, (dtype, shape) in fields.items()}
+        if self.meta['fields'] is None:
+            self.meta['fields'] = specs
+            self._open_files()
+        elif specs != self.meta['fields']:
+            raise ValueError(f"字段与已有语料不一致: {self.directory}")
+
+    def branch_id(self, branch):
+        branch_id = self._branch_ids.get(branch)
+        if branch_id is None:
+            branch_id = len(self.meta['branch_names'])
+            self._branch_ids[branch] = branch_id
+            self.meta['branch_names'].append(branch)
+        return branch_id
+
+    def append_columns(self, columns, branch_names=(), info=None, source=None):
+        """
+        追加一局
+
+        参数:
+            columns: 字段名 -> (步数, ...) 数组，需包含观测字段以及 action / reward / branch
+            branch_names: columns['branch'] 中编号对应的分支名称
+            info: 比赛信息（比分等）
+            source: 来源（如 trace 文件路径）
+
+        返回:
+            episode_index: 本局在语料中的局号
+        """
+        length = len(columns[ACTION_FIELD])
+        episode_index = len(self.meta['episodes'])
+
+        # 分支编号换成语料内的编号（UNKNOWN_BRANCH 映射到末尾的 UNKNOWN_BRANCH）
+        lookup = np.array([self.branch_id(name) for name in branch_names] + [UNKNOWN_BRANCH], dtype=np.int16)
+        columns = dict(columns)
+        columns[BRANCH_FIELD] = lookup[np.asarray(columns[BRANCH_FIELD])]
+        columns[EPISODE_FIELD] = np.full(length, episode_index, dtype=np.int32)
+        columns[STEP_FIELD] = np.arange(length, dtype=np.int32)
+
+        fields = {}
+        for field, column in columns.items():
+            column = np.asarray(column)
+            if len(column) != length:
+                raise ValueError(f"字段 {field} 的步数 {len(column)} 与动作步数 {length} 不一致")
+            dtype = np.dtype(OBSERVATION_DTYPES.get(field) or PLAYER_OBSERVATION_DTYPES.get(field)
+                             or STEP_DTYPES.get(field) or INDEX_DTYPES[field])
+            fields[field] = (dtype, column.shape[1:])
+        self._set_fields(fields)
+
+        arrays = {}
+        for field, (dtype, _) in self._fields().items():
+            arrays[field] = np.ascontiguousarray(columns[field], dtype=dtype)
+            self._files[field].write(arrays[field].tobytes())
+        self._index.append(arrays)
+
+        self.meta['episodes'].append({
+            'start': self.num_frames,
+            'length': length,
+            'source': source,
+            'info': info or {},
+        })
+        self.meta['num_frames'] += length
+        return episode_index
+
+    def append_trace(self, trace):
+        """追加一个 trace（load_trace 的结果或 trace 文件路径）"""
+        if not hasattr(trace, 'columns'):
+            trace = load_trace(trace)
+        if trace.meta['num_players'] != self.num_players:
+            raise ValueError(f"trace 球员数 {trace.meta['num_players']} 与语料不一致: {trace.path}")
+        source = os.fspath(trace.path) if trace.path is not None else None
+        return self.append_columns(trace.columns, trace.branch_names, trace.info, source)
+
+    def append_observations(self, obs_lists, actions=None, info=None, source=None):
+        """
+        追加一组观测列表（作为一局）
+
+        参数:
+            obs_lists: 观测列表的序列
+            actions: 每帧的动作 (帧数, 球员数)，None 时为 NO_ACTION
+        """
+        if len(obs_lists) == 0:
+            return None
+        fields = observation_fields(obs_lists[0][0], self.num_players)
+        columns = {field: np.zeros((len(obs_lists),) + shape, dtype=dtype)
+                   for field, (dtype, shape) in fields.items()}
+        for row, obs_list in enumerate(obs_lists):
+            fill_observation_row(columns, row, obs_list, self.num_players)
+
+        shape = (len(obs_lists), self.num_players)
+        columns[ACTION_FIELD] = np.full(shape, NO_ACTION) if actions is None else np.asarray(actions)
+        columns[REWARD_FIELD] = np.zeros(shape)
+        columns[BRANCH_FIELD] = np.full(shape, UNKNOWN_BRANCH)
+        return self.append_columns(columns, info=info, source=source)
+
+    def flush(self):
+        """把数据写盘并更新元数据"""
+        for f in self._files.values():
+            f.flush()
+        meta_path = os.path.join(self.directory, 'meta.json')
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump(self.meta, f, ensure_ascii=False, indent=2)
+        os.replace(meta_path + '.tmp', meta_path)
+        self._index.flush()
+
+    def close(self):
+        if self.meta['fields'] is not None:
+            self.flush()
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+        self._index.close()
+
+
+def find_traces(paths):
+    """展开路径列表：目录取其中的 trace 文件（按文件名排序）"""
+    traces = []
+    for path in paths:
+        if os.path.isdir(path):
+            traces.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                 if name.endswith(TRACE_SUFFIX)))
+        else:
+            traces.append(path)
+    return traces
+
+
+def build_corpus(trace_paths, directory):
+    """把 trace 文件依次追加到语料目录，返回打开的语料"""
+    with CorpusWriter(directory) as writer:
+        for path in find_traces(trace_paths):
+            writer.append_trace(path)
+    return open_corpus(directory)
+
+
+# ===================== 命令行 =====================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='内存映射观测语料')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help='把 trace 文件追加到语料目录')
+    build.add_argument('--output', required=True, help='语料目录（已存在时追加）')
+    build.add_argument('traces', nargs='+', help='trace 文件或包含 trace 文件的目录')
+
+    info = subparsers.add_parser('info', help='打印语料概况')
+    info.add_argument('corpus', help='语料目录')
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.command == 'build':
+        before = read_corpus_meta(args.output)['num_frames'] if os.path.exists(
+            os.path.join(args.output, 'meta.json')) else 0
+        corpus = build_corpus(args.traces, args.output)
+        print(f"已追加 {len(corpus) - before} 帧，语料共 {len(corpus)} 帧 / {len(corpus.episodes)} 局: {args.output}")
+        return 0
+
+    corpus = open_corpus(args.corpus)
+    size = sum(column.nbytes for column in corpus.columns.values())
+    print(f"{args.corpus}: {len(corpus)} 帧, {len(corpus.episodes)} 局, {size / 1e6:.1f} MB")
+    for field, column in corpus.columns.items():
+        print(f"  {field:<24} {column.dtype.str:>5} {str(column.shape[1:]):>10}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,315 @@
+"""
+gfootball 比赛录像导入 - 把引擎写出的 pickle 录像（dump_full_episodes / dump_scores）批量转换成 trace 文件
+
+引擎的 .dump 文件是逐步追加的 pickle 流（与 gfootball 的 ScriptHelpers.load_dump 一致），每一步是一个字典:
+    observation: 整场的 raw 观测（left_team、ball、game_mode 等），以及受控球员的
+                 left_agent_controlled_player / left_agent_sticky_actions 列表
+    debug:       其中 action 为本步所有受控球员的动作
+    reward:      左队本步奖励
+
+转换时逐步反序列化（不把整局读入内存），只提取特征用到的 raw 观测字段，
+按球员序号还原每名球员的 active / sticky_actions，写成与 TraceRecorder 相同格式的 trace 文件。
+引擎自带的类（如动作对象）用占位类反序列化，不需要安装 gfootball。
+
+多个录像文件由进程池并行转换；输出目录中的 manifest.json 记录每个录像的转换结果，
+重新运行时跳过已完成且未改动的录像，中断后可以继续。
+
+用法:
+    python -m src.traces.gfootball_import --output store/ /path/to/tracesdir --workers 8
+    python -m src.traces.corpus build --output corpus/ store/
+"""
+
+import argparse
+import json
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from src.gfootball_agent.config import Action
+from src.traces.recorder import OBSERVATION_DTYPES, TRACE_SUFFIX, TraceWriter
+
+DUMP_SUFFIX = '.dump'
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_FORMAT = 'gfootball-agent-trace-store'
+MANIFEST_VERSION = 1
+
+DONE = 'done'
+FAILED = 'failed'
+
+# 录像中没有我方动作的球员（未受控）
+NO_ACTION = -1
+
+# 引擎动作名称 -> 动作编号（引擎动作对象的名称与 Action 的常量名一致，只是小写）
+ACTION_IDS = {name.lower(): value for name, value in vars(Action).items() if not name.startswith('_')}
+
+
+# ===================== 反序列化 =====================
+
+class EngineObject:
+    """gfootball / 引擎类的占位对象，保留构造参数和状态"""
+
+    def __init__(self, *args, **kwargs):
+        self.args = args
+        self.state = kwargs
+
+    def __setstate__(self, state):
+        if isinstance(state, tuple) and len(state) == 2:
+            # (dict, slots) 形式的状态
+            state = {**(state[0] or {}), **(state[1] or {})}
+        self.state = state if isinstance(state, dict) else {'value': state}
+
+
+class DumpUnpickler(pickle.Unpickler):
+    """把 gfootball 和引擎中的类替换为 EngineObject，其余类照常加载"""
+
+    def find_class(self, module, name):
+        if module.split('.')[0] in ('gfootball', 'gfootball_engine', '_gameplayfootball'):
+            return type(name, (EngineObject,), {})
+        return super().find_class(module, name)
+
+
+def iter_dump(path):
+    """逐步读出录像中的每一步（每步是单独的 pickle，各用一个新的 Unpickler）"""
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                yield DumpUnpickler(f).load()
+            except EOFError:
+                return
+
+
+def action_id(action):
+    """录像中的动作（整数或引擎动作对象）转换为动作编号，无法识别时为 NO_ACTION"""
+    if isinstance(action, (int, np.integer)):
+        return int(action)
+    if isinstance(action, EngineObject):
+        name = action.state.get('_name')
+        if name is None and action.args:
+            name = action.args[0]
+        if isinstance(name, str):
+            return ACTION_IDS.get(name.lower(), NO_ACTION)
+    return NO_ACTION
+
+
+def step_observations(observation, num_players):
+    """
+    把录像中一步的整场观测还原成每名球员的 raw 观测列表
+
+    第 i 个观测对应我方第 i 名球员（active 为 i）；未受控球员的 sticky_actions 为全 0
+    """
+    shared = {key: observation[key] for key in OBSERVATION_DTYPES if key in observation}
+    if 'designated' not in shared and 'left_team_designated_player' in observation:
+        shared['designated'] = observation['left_team_designated_player']
+
+    controlled = list(observation.get('left_agent_controlled_player', []))
+    sticky_rows = list(observation.get('left_agent_sticky_actions', []))
+    sticky = np.zeros((num_players, 10), dtype=bool)
+    for player_index, row in zip(controlled, sticky_rows):
+        if 0 <= player_index < num_players:
+            sticky[player_index] = row
+
+    obs_list = []
+    for player_index in range(num_players):
+        obs = dict(shared)
+        obs['active'] = player_index
+        obs['sticky_actions'] = sticky[player_index]
+        obs_list.append(obs)
+    return obs_list, controlled
+
+
+def step_actions(step, controlled, num_players):
+    """本步我方每名球员的动作（受控球员的动作排在 debug.action 的前面）"""
+    actions = np.full(num_players, NO_ACTION, dtype=np.int64)
+    dumped = (step.get('debug') or {}).get('action') or []
+    for player_index, action in zip(controlled, dumped):
+        if 0 <= player_index < num_players:
+            actions[player_index] = action_id(action)
+    return actions
+
+
+# ===================== 转换 =====================
+
+def convert_dump(dump_path, trace_path, num_players=11):
+    """
+    把一个录像文件转换成 trace 文件
+
+    返回:
+        结果字典 {'steps', 'score', 'reward'}
+    """
+    writer = TraceWriter(trace_path, num_players=num_players)
+    episode_reward = 0.0
+    score = None
+    try:
+        for step in iter_dump(dump_path):
+            observation = step['observation']
+            obs_list, controlled = step_observations(observation, num_players)
+            reward = float(np.sum(step.get('reward', 0.0)))
+            writer.append(obs_list, step_actions(step, controlled, num_players), reward)
+            episode_reward += reward
+            score = observation.get('score', score)
+    except BaseException:
+        writer.abort()
+        raise
+
+    score = [int(goals) for goals in score] if score is not None else None
+    info = {'score': score, 'reward': episode_reward, 'length': writer.num_steps,
+            'source': os.path.abspath(dump_path)}
+    writer.close(info)
+    return {'steps': info['length'], 'score': score, 'reward': episode_reward}
+
+
+def _convert_worker(dump_path, trace_path, num_players):
+    """工作进程：转换一个录像，返回 (录像路径, 结果, 耗时)"""
+    start = time.perf_counter()
+    result = convert_dump(dump_path, trace_path, num_players)
+    return dump_path, result, time.perf_counter() - start
+
+
+# ===================== 清单 =====================
+
+def load_manifest(directory):
+    """读取输出目录中的清单，没有时返回空清单"""
+    path = os.path.join(directory, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {'format': MANIFEST_FORMAT, 'version': MANIFEST_VERSION, 'entries': {}}
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest.get('format') != MANIFEST_FORMAT:
+        raise ValueError(f"不是 trace 存储目录: {directory}")
+    return manifest
+
+
+def save_manifest(directory, manifest):
+    """原子地写入清单"""
+    path = os.path.join(directory, MANIFEST_NAME)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def find_dumps(paths):
+    """展开路径列表：目录中递归查找 .dump 文件（按路径排序）"""
+    dumps = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                dumps.extend(os.path.join(root, name) for name in names if name.endswith(DUMP_SUFFIX))
+        else:
+            dumps.append(path)
+    return sorted(os.path.abspath(path) for path in dumps)
+
+
+def plan_imports(dump_paths, directory, manifest):
+    """
+    决定需要转换的录像，并为新录像分配不重名的 trace 文件名
+
+    返回:
+        [(录像路径, trace 路径), ...]
+    """
+    entries = manifest['entries']
+    used_names = {entry['trace'] for entry in entries.values()}
+    pending = []
+    for dump_path in dump_paths:
+        entry = entries.get(dump_path)
+        signature = _file_signature(dump_path)
+        if entry is not None:
+            trace_path = os.path.join(directory, entry['trace'])
+            if (entry['status'] == DONE and entry['size'] == signature['size']
+                    and entry['mtime'] == signature['mtime'] and os.path.exists(trace_path)):
+                continue
+            name = entry['trace']
+        else:
+            stem = os.path.basename(dump_path)[:-len(DUMP_SUFFIX)] if dump_path.endswith(DUMP_SUFFIX) \
+                else os.path.basename(dump_path)
+            name = stem + TRACE_SUFFIX
+            suffix = 1
+            while name in used_names:
+                name = f"{stem}_{suffix}{TRACE_SUFFIX}"
+                suffix += 1
+            used_names.add(name)
+        entries[dump_path] = dict(signature, trace=name, status=None)
+        pending.append((dump_path, os.path.join(directory, name)))
+    return pending
+
+
+def import_dumps(paths, directory, workers=None, num_players=11, on_result=None):
+    """
+    并行把录像转换成 trace 文件，每完成一个就更新清单
+
+    参数:
+        paths: 录像文件或目录
+        directory: 输出目录（trace 文件和 manifest.json）
+        workers: 进程数，None 表示使用全部 CPU 核心
+        on_result: 每个录像完成（或失败）时的回调，参数为 (录像路径, 清单条目)
+
+    返回:
+        (converted, skipped, failed): 本次转换成功、跳过、失败的录像数
+    """
+    os.makedirs(directory, exist_ok=True)
+    manifest = load_manifest(directory)
+    dump_paths = find_dumps(paths)
+    pending = plan_imports(dump_paths, directory, manifest)
+    skipped = len(dump_paths) - len(pending)
+    if not pending:
+        return 0, skipped, 0
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(pending)))
+    converted = failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_convert_worker, dump_path, trace_path, num_players): dump_path
+                   for dump_path, trace_path in pending}
+        for future in as_completed(futures):
+            dump_path = futures[future]
+            entry = manifest['entries'][dump_path]
+            try:
+                _, result, elapsed = future.result()
+            except Exception as e:
+                entry.update(status=FAILED, error=repr(e))
+                failed += 1
+            else:
+                entry.update(result, status=DONE, seconds=round(elapsed, 3))
+                entry.pop('error', None)
+                converted += 1
+            save_manifest(directory, manifest)
+            if on_result is not None:
+                on_result(dump_path, entry)
+    return converted, skipped, failed
+
+
+# ===================== 命令行 =====================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='把 gfootball 录像转换成 trace 文件')
+    parser.add_argument('dumps', nargs='+', help='.dump 文件或包含录像的目录')
+    parser.add_argument('--output', required=True, help='输出目录（已有清单时继续上次的转换）')
+    parser.add_argument('--workers', type=int, default=None, help='进程数 (默认: CPU核心数)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    def report(dump_path, entry):
+        if entry['status'] == DONE:
+            print(f"{os.path.basename(dump_path)} -> {entry['trace']}: {entry['steps']} 步, "
+                  f"比分 {entry['score']}, {entry['seconds']:.1f}秒")
+        else:
+            print(f"{os.path.basename(dump_path)}: 转换失败 {entry['error']}")
+
+    converted, skipped, failed = import_dumps(args.dumps, args.output, workers=args.workers,
+                                              on_result=report)
+    print(f"转换 {converted} 个，跳过已完成 {skipped} 个，失败 {failed} 个: {args.output}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""
+语料的二级索引 - 录制（追加到语料）时为每帧计算场景键，存成与语料帧对齐的定长数组文件
+
+    corpus/index/
+    ├── meta.json                   # 已索引帧数、字段 dtype/形状、角色决策函数名称
+    ├── possession.bin              # 控球方: -1 无人控球 / 0 我方 / 1 对方
+    ├── possessor.bin               # 持球球员序号（无人控球为 -1）
+    ├── possessor_role.bin          # 持球球员的角色
+    ├── ball_zone.bin               # 球所在区域（纵向三段 x 横向三路）
+    ├── score_diff.bin / score_state.bin
+    ├── pressure_distance.bin       # 持球球员到最近对方球员的距离（无人控球为 inf）
+    ├── under_pressure.bin          # pressure_distance < Distance.PRESSURE_DISTANCE
+    ├── role_function.bin           # (帧数, 11) 我方每名球员本帧使用的角色决策函数
+    ├── possessor_leaf.bin          # 我方持球球员的决策叶子分支（语料中的分支编号）
+    └── possessor_role_function.bin # 我方持球球员的角色决策函数
+
+CorpusWriter 每追加一局就为这些帧计算索引；已有语料缺少索引或索引落后时，打开写入器时补齐。
+角色决策函数按录制时的分发规则（get_decision_table）计算。
+"""
+
+import json
+import os
+
+import numpy as np
+
+from src.gfootball_agent.config import Distance, Field, Tactics
+
+INDEX_DIRECTORY = 'index'
+INDEX_FORMAT = 'gfootball-agent-corpus-index'
+INDEX_VERSION = 1
+
+# 逐帧索引字段（形状为 (帧数,)，role_function 为 (帧数, 球员数)）
+INDEX_KEY_DTYPES = {
+    'possession': np.int8,
+    'possessor': np.int8,
+    'possessor_role': np.int8,
+    'ball_zone': np.int8,
+    'score_diff': np.int8,
+    'score_state': np.int8,
+    'pressure_distance': np.float32,
+    'under_pressure': np.bool_,
+    'role_function': np.int8,
+    'possessor_leaf': np.int16,
+    'possessor_role_function': np.int8,
+}
+PER_PLAYER_KEYS = ('role_function',)
+
+# 没有持球球员 / 不适用时的值
+NONE = -1
+
+POSSESSION_NAMES = {'none': NONE, 'ours': 0, 'theirs': 1}
+SCORE_STATE_NAMES = {'trailing': -1, 'level': 0, 'leading': 1}
+
+# 区域：纵向按 Mid-Block / 进攻阈值分成三段，横向把场地宽度三等分
+ZONE_X_EDGES = (Tactics.MID_BLOCK_X_THRESHOLD, Tactics.ATTACK_X_THRESHOLD)
+ZONE_Y_EDGES = (Field.TOP_BOUNDARY / 3, Field.BOTTOM_BOUNDARY / 3)
+ZONE_THIRDS = ('defensive', 'middle', 'attacking')
+ZONE_LANES = ('top', 'centre', 'bottom')
+
+# 每次计算的帧数（限制中间数组的内存）
+BLOCK_FRAMES = 65536
+
+
+def zone_id(third, lane):
+    return third * len(ZONE_LANES) + lane
+
+
+def _decision_table(game_modes, roles):
+    # 决策模块较重，只在计算索引时载入
+    from src.gfootball_agent.decision_logic.top_level_logic import get_decision_table
+    decisions, table = get_decision_table(game_modes, roles)
+    return [decision.__name__ for decision in decisions], table
+
+
+def compute_index(columns, role_function_id):
+    """
+    计算一段帧的索引字段
+
+    参数:
+        columns: 字段名 -> (帧数, ...) 数组，需包含球、双方位置/角色、控球、比分、game_mode 和 branch
+        role_function_id: 角色决策函数名称 -> 编号 的函数
+
+    返回:
+        {索引字段: (帧数, ...) 数组}
+    """
+    num_frames = len(columns['ball'])
+    rows = np.arange(num_frames)
+
+    owned_team = np.asarray(columns['ball_owned_team'])
+    possession = np.where((owned_team == 0) | (owned_team == 1), owned_team, NONE)
+    ours = possession == 0
+    theirs = possession == 1
+    possessor = np.where(possession != NONE, np.asarray(columns['ball_owned_player']), NONE)
+    carrier = np.maximum(possessor, 0)
+
+    left_roles = np.asarray(columns['left_team_roles'])
+    right_roles = np.asarray(columns['right_team_roles'])
+    possessor_role = np.where(ours, left_roles[rows, carrier],
+                              np.where(theirs, right_roles[rows, carrier], NONE))
+
+    # 持球球员到最近对方球员的距离（与 StepContext 一致，不排除下场球员）
+    left_team = np.asarray(columns['left_team'])[..., :2]
+    right_team = np.asarray(columns['right_team'])[..., :2]
+    carrier_position = np.where(ours[:, None], left_team[rows, carrier], right_team[rows, carrier])
+    opponents = np.where(ours[:, None, None], right_team, left_team)
+    diff = opponents - carrier_position[:, None, :]
+    pressure_distance = np.sqrt((diff * diff).sum(axis=-1)).min(axis=-1)
+    pressure_distance = np.where(possession != NONE, pressure_distance, np.inf)
+
+    ball = np.asarray(columns['ball'])
+    third = np.digitize(ball[:, 0], ZONE_X_EDGES)
+    lane = np.digitize(ball[:, 1], ZONE_Y_EDGES)
+
+    score = np.asarray(columns['score'], dtype=np.int64)
+    score_diff = np.clip(score[:, 0] - score[:, 1], -127, 127)
+
+    names, table = _decision_table(np.asarray(columns['game_mode']), left_roles)
+    lookup = np.array([role_function_id(name) for name in names], dtype=np.int8)
+    role_function = lookup[table]
+
+    branches = np.asarray(columns['branch'])
+    possessor_leaf = np.where(ours, branches[rows, carrier], NONE)
+    possessor_role_function = np.where(ours, role_function[rows, carrier], NONE)
+
+    index = {
+        'possession': possession,
+        'possessor': possessor,
+        'possessor_role': possessor_role,
+        'ball_zone': zone_id(third, lane),
+        'score_diff': score_diff,
+        'score_state': np.sign(score_diff),
+        'pressure_distance': pressure_distance,
+        'under_pressure': pressure_distance < Distance.PRESSURE_DISTANCE,
+        'role_function': role_function,
+        'possessor_leaf': possessor_leaf,
+        'possessor_role_function': possessor_role_function,
+    }
+    return {key: np.asarray(value, dtype=INDEX_KEY_DTYPES[key]) for key, value in index.items()}
+
+
+def iter_index_blocks(columns, role_function_id):
+    """按 BLOCK_FRAMES 帧一块计算索引（compute_index 的结果依次给出）"""
+    num_frames = len(columns['ball'])
+    for start in range(0, num_frames, BLOCK_FRAMES):
+        yield compute_index({key: column[start:start + BLOCK_FRAMES] for key, column in columns.items()},
+                            role_function_id)
+
+
+def read_index_meta(directory):
+    """读取语料目录中的索引元数据，没有索引时返回 None"""
+    path = os.path.join(directory, INDEX_DIRECTORY, 'meta.json')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        meta = json.load(f)
+    if meta.get('format') != INDEX_FORMAT or meta.get('version', 0) > INDEX_VERSION:
+        return None
+    return meta
+
+
+class IndexWriter:
+    """
+    向语料的索引目录追加帧的索引（由 CorpusWriter 使用）
+
+    与语料相同，元数据在 flush 时写入，超出已索引帧数的尾部数据在打开时截掉。
+    """
+
+    def __init__(self, directory, num_players=11):
+        self.directory = os.path.join(os.fspath(directory), INDEX_DIRECTORY)
+        os.makedirs(self.directory, exist_ok=True)
+        self.meta = read_index_meta(os.fspath(directory)) or {
+            'format': INDEX_FORMAT,
+            'version': INDEX_VERSION,
+            'num_frames': 0,
+            'fields': {key: {'dtype': np.dtype(dtype).str,
+                             'shape': [num_players] if key in PER_PLAYER_KEYS else []}
+                       for key, dtype in INDEX_KEY_DTYPES.items()},
+            'role_functions': [],
+        }
+        self._role_function_ids = {name: i for i, name in enumerate(self.meta['role_functions'])}
+        self._files = {}
+        self._open_files()
+
+    @property
+    def num_frames(self):
+        return self.meta['num_frames']
+
+    def _open_files(self):
+        for key, spec in self.meta['fields'].items():
+            path = os.path.join(self.directory, f"{key}.bin")
+            row_bytes = np.dtype(spec['dtype']).itemsize * int(np.prod(spec['shape'], dtype=np.int64))
+            f = open(path, 'r+b' if os.path.exists(path) else 'w+b')
+            f.truncate(self.num_frames * row_bytes)
+            f.seek(0, os.SEEK_END)
+            self._files[key] = f
+
+    def reset(self):
+        """丢弃已有索引（语料被重建时）"""
+        for f in self._files.values():
+            f.truncate(0)
+            f.seek(0)
+        self.meta['num_frames'] = 0
+
+    def role_function_id(self, name):
+        role_function_id = self._role_function_ids.get(name)
+        if role_function_id is None:
+            role_function_id = len(self.meta['role_functions'])
+            self._role_function_ids[name] = role_function_id
+            self.meta['role_functions'].append(name)
+        return role_function_id
+
+    def append(self, columns):
+        """为一段帧（字段名 -> 数组）计算并追加索引"""
+        for block in iter_index_blocks(columns, self.role_function_id):
+            for key, value in block.items():
+                self._files[key].write(value.tobytes())
+            self.meta['num_frames'] += len(block['possession'])
+
+    def flush(self):
+        for f in self._files.values():
+            f.flush()
+        meta_path = os.path.join(self.directory, 'meta.json')
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump(self.meta, f, ensure_ascii=False, indent=2)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    def close(self):
+        self.flush()
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
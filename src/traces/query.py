@@ -0,0 +1,444 @@
+"""
+语料场景查询 - 用录制时建立的索引按条件检索帧和片段
+
+条件是逗号分隔的 `键 运算符 值`，运算符为 = != < <= > >=，等号可以用 | 给出多个值：
+
+    possession=ours,possessor_role_function=midfielder_decision,under_pressure=true,ball_x<0
+    game_mode=corner,possession=ours
+    score_state=trailing,ball_zone=attacking,leaf=forward_dribble_to_goal
+
+逐帧的键（possession、ball_zone、game_mode 等）有名称的值可以用名称（不区分大小写）；
+按球员的键（leaf、role_function、action）表示 "任一名我方球员满足"。
+查询先用最有选择性的等值条件取倒排表（每个键第一次使用时由索引列排序得到），
+再在候选帧上逐个检查其余条件，百万帧的语料上一次查询在毫秒级。
+
+命中的帧可以扩展成片段（前后各若干步，不跨局并合并重叠），
+导出为新的语料供 benchmark / decision_diff 只回放这些场景。
+
+用法:
+    python -m src.traces.query select corpus/ "game_mode=corner,possession=ours" --after 50
+    python -m src.traces.query select corpus/ "possession=ours,under_pressure=true" --export scenario/
+    python -m src.traces.query keys corpus/
+    python -m src.traces.query index corpus/
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+from src.gfootball_agent.config import Action, GameMode, PlayerRole
+from src.traces.corpus import EPISODE_FIELD, STEP_FIELD, CorpusWriter, map_column, open_corpus
+from src.traces.index import (
+    INDEX_DIRECTORY, INDEX_KEY_DTYPES, POSSESSION_NAMES, SCORE_STATE_NAMES,
+    ZONE_LANES, ZONE_THIRDS, iter_index_blocks, read_index_meta, zone_id
+)
+from src.traces.recorder import ACTION_FIELD, BRANCH_FIELD
+
+OPERATORS = {
+    '=': np.equal,
+    '!=': np.not_equal,
+    '<': np.less,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+}
+TERM_PATTERN = re.compile(r'^\s*([a-z_]+)\s*(!=|<=|>=|=|<|>)\s*(.+?)\s*$')
+
+
+def _names(constants):
+    return {name.lower(): value for name, value in vars(constants).items() if not name.startswith('_')}
+
+
+def _zone_names():
+    names = {}
+    for third, third_name in enumerate(ZONE_THIRDS):
+        names[third_name] = [zone_id(third, lane) for lane in range(len(ZONE_LANES))]
+        for lane, lane_name in enumerate(ZONE_LANES):
+            names[f"{third_name}_{lane_name}"] = [zone_id(third, lane)]
+    for lane, lane_name in enumerate(ZONE_LANES):
+        names[lane_name] = [zone_id(third, lane) for third in range(len(ZONE_THIRDS))]
+    return names
+
+
+BOOL_NAMES = {'false': 0, 'true': 1}
+
+
+def _number(text):
+    for convert in (int, float):
+        try:
+            return convert(text)
+        except ValueError:
+            pass
+    return None
+
+
+# ===================== 索引 =====================
+
+def load_index(corpus):
+    """
+    载入语料的索引列（只映射文件）
+
+    索引缺失或落后于语料时，缺少的部分在内存中计算（不写盘，
+    用 `python -m src.traces.query index` 或任意一次 CorpusWriter 追加把索引补齐到磁盘）
+
+    返回:
+        (columns, role_functions): 索引字段 -> 数组, 角色决策函数名称列表
+    """
+    meta = read_index_meta(corpus.directory)
+    indexed = 0 if meta is None else min(meta['num_frames'], corpus.num_frames)
+    role_functions = [] if meta is None else list(meta['role_functions'])
+    directory = os.path.join(corpus.directory, INDEX_DIRECTORY)
+    columns = {}
+    if meta is not None:
+        columns = {key: map_column(directory, key, spec, meta['num_frames'])[:indexed]
+                   for key, spec in meta['fields'].items()}
+    if indexed == corpus.num_frames:
+        return columns, role_functions
+
+    def role_function_id(name):
+        if name not in role_functions:
+            role_functions.append(name)
+        return role_functions.index(name)
+
+    blocks = list(iter_index_blocks({field: column[indexed:] for field, column in corpus.columns.items()},
+                                    role_function_id))
+    if columns:
+        blocks.insert(0, columns)
+    return {key: np.concatenate([block[key] for block in blocks]) for key in INDEX_KEY_DTYPES}, role_functions
+
+
+def build_index(directory):
+    """把语料的索引补齐到磁盘，返回已索引帧数"""
+    with CorpusWriter(directory) as writer:
+        return writer.num_frames
+
+
+# ===================== 查询 =====================
+
+class Selection:
+    """
+    一次查询命中的帧
+
+    frames: 升序的帧序号数组
+    """
+
+    def __init__(self, corpus, frames, elapsed=0.0):
+        self.corpus = corpus
+        self.frames = frames
+        self.elapsed = elapsed
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __iter__(self):
+        for index in self.frames:
+            yield self.corpus[int(index)]
+
+    @property
+    def episodes(self):
+        """命中帧所在的局号（升序、不重复）"""
+        return np.unique(self.corpus.columns[EPISODE_FIELD][self.frames])
+
+    def windows(self, before=0, after=0):
+        """
+        把命中帧扩展成片段：每帧向前 before 步、向后 after 步，截断在本局内，合并重叠或相邻的片段
+
+        返回:
+            (片段数, 2) 数组，每行为 [start, stop)
+        """
+        if len(self.frames) == 0:
+            return np.zeros((0, 2), dtype=np.int64)
+        episode_starts = np.array([episode['start'] for episode in self.corpus.episodes], dtype=np.int64)
+        episode_lengths = np.array([episode['length'] for episode in self.corpus.episodes], dtype=np.int64)
+        episodes = self.corpus.columns[EPISODE_FIELD][self.frames]
+        first = episode_starts[episodes]
+        starts = np.maximum(self.frames - before, first)
+        stops = np.minimum(self.frames + after + 1, first + episode_lengths[episodes])
+
+        # 帧升序时 starts / stops 也都不减，只需与前一个片段比较
+        new = np.ones(len(starts), dtype=bool)
+        new[1:] = (starts[1:] > stops[:-1]) | (episodes[1:] != episodes[:-1])
+        heads = np.flatnonzero(new)
+        tails = np.append(heads[1:] - 1, len(starts) - 1)
+        return np.stack([starts[heads], stops[tails]], axis=1)
+
+    def window_frames(self, before=0, after=0):
+        """片段内全部帧的视图列表（可直接作为 benchmark 的语料）"""
+        return [frame for start, stop in self.windows(before, after)
+                for frame in self.corpus.frames(int(start), int(stop))]
+
+    def export(self, directory, before=0, after=0):
+        """
+        把片段导出为新的语料，每个片段一局
+
+        返回:
+            片段数
+        """
+        corpus = self.corpus
+        windows = self.windows(before, after)
+        fields = [field for field in corpus.columns if field not in (EPISODE_FIELD, STEP_FIELD)]
+        with CorpusWriter(directory, corpus.num_players) as writer:
+            for start, stop in windows:
+                episode = corpus.episodes[int(corpus.columns[EPISODE_FIELD][start])]
+                steps = corpus.columns[STEP_FIELD]
+                info = dict(episode['info'], window=[int(steps[start]), int(steps[stop - 1]) + 1])
+                writer.append_columns({field: corpus.columns[field][start:stop] for field in fields},
+                                      corpus.branch_names, info=info, source=episode['source'])
+        return len(windows)
+
+
+class CorpusQuery:
+    """
+    语料上的场景查询
+
+    逐帧的整数键在第一次用于等值条件时建立倒排表（键值 -> 升序帧序号），之后的查询直接复用
+    """
+
+    def __init__(self, corpus):
+        self.corpus = corpus
+        index, role_functions = load_index(corpus)
+        columns = corpus.columns
+        self.columns = {
+            'game_mode': columns['game_mode'],
+            'episode': columns[EPISODE_FIELD],
+            'step': columns[STEP_FIELD],
+            'steps_left': columns['steps_left'],
+            'ball_x': columns['ball'][:, 0],
+            'ball_y': columns['ball'][:, 1],
+            'leaf': columns[BRANCH_FIELD],
+            'action': columns[ACTION_FIELD],
+            **index,
+        }
+        branch_ids = {name: i for i, name in enumerate(corpus.branch_names)}
+        role_function_ids = {name: i for i, name in enumerate(role_functions)}
+        self.vocabularies = {
+            'game_mode': _names(GameMode),
+            'possession': POSSESSION_NAMES,
+            'possessor_role': _names(PlayerRole),
+            'ball_zone': _zone_names(),
+            'score_state': SCORE_STATE_NAMES,
+            'under_pressure': BOOL_NAMES,
+            'leaf': branch_ids,
+            'possessor_leaf': branch_ids,
+            'role_function': role_function_ids,
+            'possessor_role_function': role_function_ids,
+            'action': _names(Action),
+        }
+        self._postings = {}
+
+    @property
+    def keys(self):
+        return list(self.columns)
+
+    def is_per_player(self, key):
+        return self.columns[key].ndim == 2
+
+    # ----- 条件 -----
+
+    def _values(self, key, raw):
+        """把条件中的值（名称或数字）换成键的取值列表"""
+        vocabulary = self.vocabularies.get(key, {})
+        values = []
+        for item in raw:
+            if isinstance(item, str):
+                name = item.strip()
+                value = vocabulary.get(name, vocabulary.get(name.lower()))
+                if value is None:
+                    value = _number(name)
+                if value is None:
+                    choices = ', '.join(sorted(vocabulary)) or '数值'
+                    raise ValueError(f"{key} 没有取值 {name!r}（可选: {choices}）")
+            else:
+                value = item
+            values.extend(value if isinstance(value, list) else [value])
+        return values
+
+    def parse(self, expression=None, **terms):
+        """
+        解析条件
+
+        参数:
+            expression: 条件字符串，如 "game_mode=corner,ball_x<0"
+            terms: 等值条件，值可以是名称、数字或它们的列表
+
+        返回:
+            [(键, 运算符, 取值列表), ...]
+        """
+        parsed = []
+        items = [] if not expression else [item for item in expression.split(',') if item.strip()]
+        for item in items:
+            match = TERM_PATTERN.match(item)
+            if match is None:
+                raise ValueError(f"无法解析条件: {item!r}")
+            key, op, raw = match.groups()
+            parsed.append((key, op, raw.split('|')))
+        for key, raw in terms.items():
+            parsed.append((key, '=', list(raw) if isinstance(raw, (list, tuple, set)) else [raw]))
+
+        result = []
+        for key, op, raw in parsed:
+            if key not in self.columns:
+                raise KeyError(f"没有查询键 {key!r}（可选: {', '.join(self.keys)}）")
+            values = self._values(key, raw)
+            if op not in ('=', '!=') and len(values) != 1:
+                raise ValueError(f"{key}{op} 只能给出一个值")
+            result.append((key, op, values))
+        return result
+
+    def _matches(self, key, op, values, frames=None):
+        column = self.columns[key]
+        if frames is not None:
+            column = column[frames]
+        if op in ('=', '!='):
+            mask = column == values[0] if len(values) == 1 else np.isin(column, values)
+            if op == '!=':
+                mask = ~mask
+        else:
+            mask = OPERATORS[op](column, values[0])
+        return mask.any(axis=1) if mask.ndim == 2 else mask
+
+    # ----- 倒排表 -----
+
+    def _postable(self, key, op):
+        column = self.columns[key]
+        return op == '=' and column.ndim == 1 and column.dtype.kind in 'biu'
+
+    def postings(self, key):
+        """
+        键的倒排表
+
+        返回:
+            (order, offsets, low): order[offsets[v - low]:offsets[v - low + 1]] 为取值 v 的升序帧序号
+        """
+        postings = self._postings.get(key)
+        if postings is None:
+            column = self.columns[key]
+            if column.dtype == np.bool_:
+                column = column.view(np.int8)
+            if len(column) == 0:
+                postings = (np.zeros(0, dtype=np.int64), np.zeros(1, dtype=np.int64), 0)
+            else:
+                low = int(column.min())
+                counts = np.bincount(column.astype(np.int64) - low)
+                order = np.argsort(column, kind='stable')
+                postings = (order, np.concatenate([[0], np.cumsum(counts)]), low)
+            self._postings[key] = postings
+        return postings
+
+    def _posting_frames(self, key, values):
+        order, offsets, low = self.postings(key)
+        parts = []
+        for value in values:
+            slot = int(value) - low
+            if 0 <= slot < len(offsets) - 1:
+                parts.append(order[offsets[slot]:offsets[slot + 1]])
+        if len(parts) == 1:
+            return parts[0]
+        return np.sort(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.int64)
+
+    def _posting_size(self, key, values):
+        _, offsets, low = self.postings(key)
+        size = 0
+        for value in values:
+            slot = int(value) - low
+            if 0 <= slot < len(offsets) - 1:
+                size += int(offsets[slot + 1] - offsets[slot])
+        return size
+
+    # ----- 执行 -----
+
+    def select(self, expression=None, **terms):
+        """
+        按条件选出帧
+
+        返回:
+            Selection
+        """
+        start_time = time.perf_counter()
+        conditions = self.parse(expression, **terms)
+
+        # 以最有选择性的等值条件的倒排表为候选，在候选帧上检查其余条件
+        postable = [i for i, (key, op, _) in enumerate(conditions) if self._postable(key, op)]
+        if postable:
+            best = min(postable, key=lambda i: self._posting_size(conditions[i][0], conditions[i][2]))
+            key, _, values = conditions[best]
+            frames = self._posting_frames(key, values)
+            for i, (key, op, values) in enumerate(conditions):
+                if i != best and len(frames):
+                    frames = frames[self._matches(key, op, values, frames)]
+        else:
+            mask = np.ones(self.corpus.num_frames, dtype=bool)
+            for key, op, values in conditions:
+                mask &= self._matches(key, op, values)
+            frames = np.flatnonzero(mask)
+        return Selection(self.corpus, np.asarray(frames, dtype=np.int64), time.perf_counter() - start_time)
+
+    def count(self, expression=None, **terms):
+        return len(self.select(expression, **terms))
+
+
+def query_corpus(directory, expression=None, **terms):
+    """打开语料并执行一次查询"""
+    return CorpusQuery(open_corpus(directory)).select(expression, **terms)
+
+
+# ===================== 命令行 =====================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='按场景条件检索语料中的帧')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    select = subparsers.add_parser('select', help='检索满足条件的帧和片段')
+    select.add_argument('corpus', help='语料目录')
+    select.add_argument('where', help='条件，如 "game_mode=corner,possession=ours"')
+    select.add_argument('--before', type=int, default=0, help='片段向前扩展的步数 (默认: 0)')
+    select.add_argument('--after', type=int, default=0, help='片段向后扩展的步数 (默认: 0)')
+    select.add_argument('--show', type=int, default=10, help='打印前几个片段 (默认: 10)')
+    select.add_argument('--export', help='把片段导出为新的语料目录')
+
+    keys = subparsers.add_parser('keys', help='列出查询键和有名称的取值')
+    keys.add_argument('corpus', help='语料目录')
+
+    index = subparsers.add_parser('index', help='为已有语料补齐磁盘上的索引')
+    index.add_argument('corpus', help='语料目录')
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.command == 'index':
+        start = time.perf_counter()
+        num_frames = build_index(args.corpus)
+        print(f"已索引 {num_frames} 帧，{time.perf_counter() - start:.1f}秒: {args.corpus}")
+        return 0
+
+    query = CorpusQuery(open_corpus(args.corpus))
+    if args.command == 'keys':
+        for key in query.keys:
+            kind = '按球员' if query.is_per_player(key) else '逐帧'
+            names = ', '.join(query.vocabularies.get(key, {}))
+            print(f"  {key:<24} {kind:<4} {names}")
+        return 0
+
+    selection = query.select(args.where)
+    windows = selection.windows(args.before, args.after)
+    frames = int((windows[:, 1] - windows[:, 0]).sum())
+    print(f"命中 {len(selection)} 帧 / {len(selection.episodes)} 局，查询 {selection.elapsed * 1000:.1f}毫秒；"
+          f"{len(windows)} 个片段共 {frames} 帧")
+    episodes, steps = query.columns['episode'], query.columns['step']
+    for start, stop in windows[:args.show]:
+        print(f"  帧 [{start}, {stop})  第 {episodes[start]} 局 第 {steps[start]}-{steps[stop - 1]} 步")
+    if args.export:
+        count = selection.export(args.export, args.before, args.after)
+        print(f"已导出 {count} 个片段: {args.export}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+读取 trace 文件 - 按需解压字段并拼接成整局的列数组
+"""
+
+import json
+import zipfile
+
+import numpy as np
+
+from src.traces.recorder import (
+    ACTION_FIELD, BRANCH_FIELD, OBSERVATION_DTYPES, PLAYER_OBSERVATION_DTYPES,
+    REWARD_FIELD, TRACE_FORMAT, TRACE_VERSION, chunk_member
+)
+
+
+class Trace:
+    """
+    一局比赛的列式轨迹
+
+    columns: 字段名 -> 数组，第一维为步数
+    meta: trace 文件的元数据（字段 dtype/形状、分支名称、比赛信息等）
+    """
+
+    def __init__(self, columns, meta, path=None):
+        self.columns = columns
+        self.meta = meta
+        self.path = path
+
+    def __len__(self):
+        return self.meta['num_steps']
+
+    def __getitem__(self, field):
+        return self.columns[field]
+
+    def __contains__(self, field):
+        return field in self.columns
+
+    @property
+    def num_steps(self):
+        return self.meta['num_steps']
+
+    @property
+    def branch_names(self):
+        return self.meta['branch_names']
+
+    @property
+    def info(self):
+        return self.meta['info']
+
+    @property
+    def actions(self):
+        return self.columns[ACTION_FIELD]
+
+    @property
+    def rewards(self):
+        return self.columns[REWARD_FIELD]
+
+    @property
+    def branches(self):
+        return self.columns[BRANCH_FIELD]
+
+    def branch_name(self, branch_id):
+        """分支编号对应的名称（未知分支为 None）"""
+        return self.branch_names[branch_id] if branch_id >= 0 else None
+
+    def observations(self, step):
+        """
+        还原某一步的观测列表（每名球员一个 raw 观测字典），可直接交给 agent.get_actions
+
+        需要载入全部观测字段
+        """
+        shared = {}
+        for key in OBSERVATION_DTYPES:
+            column = self.columns.get(key)
+            if column is None:
+                continue
+            value = column[step]
+            shared[key] = value.item() if value.ndim == 0 else value.copy()
+        if 'score' in shared:
+            shared['score'] = shared['score'].tolist()
+
+        num_players = self.meta['num_players']
+        player_columns = {key: self.columns[key][step] for key in PLAYER_OBSERVATION_DTYPES
+                          if key in self.columns}
+        obs_list = []
+        for player_index in range(num_players):
+            obs = dict(shared)
+            for key, column in player_columns.items():
+                value = column[player_index]
+                obs[key] = value.item() if value.ndim == 0 else value.copy()
+            obs_list.append(obs)
+        return obs_list
+
+
+def read_meta(archive):
+    """读取并校验 trace 的元数据"""
+    meta = json.loads(archive.read('meta.json'))
+    if meta.get('format') != TRACE_FORMAT:
+        raise ValueError(f"不是 trace 文件: {archive.filename}")
+    if meta.get('version', 0) > TRACE_VERSION:
+        raise ValueError(f"trace 版本 {meta['version']} 高于支持的版本 {TRACE_VERSION}: {archive.filename}")
+    return meta
+
+
+def read_column(archive, meta, field):
+    """解压一个字段的全部块，依次填入整局的数组"""
+    spec = meta['fields'][field]
+    dtype = np.dtype(spec['dtype'])
+    shape = tuple(spec['shape'])
+    column = np.empty((meta['num_steps'],) + shape, dtype=dtype)
+    start = 0
+    for chunk_index in range(meta['num_chunks']):
+        chunk = np.frombuffer(archive.read(chunk_member(field, chunk_index)), dtype=dtype)
+        chunk = chunk.reshape((-1,) + shape)
+        column[start:start + len(chunk)] = chunk
+        start += len(chunk)
+    if start != meta['num_steps']:
+        raise ValueError(f"字段 {field} 的步数 {start} 与元数据不符: {archive.filename}")
+    return column
+
+
+def load_trace(path, fields=None):
+    """
+    载入 trace 文件
+
+    参数:
+        path: trace 文件路径
+        fields: 只载入这些字段，None 表示全部
+
+    返回:
+        trace: Trace
+    """
+    with zipfile.ZipFile(path) as archive:
+        meta = read_meta(archive)
+        names = list(meta['fields']) if fields is None else list(fields)
+        unknown = [name for name in names if name not in meta['fields']]
+        if unknown:
+            raise KeyError(f"trace 中没有这些字段: {unknown}")
+        columns = {name: read_column(archive, meta, name) for name in names}
+    return Trace(columns, meta, path=path)
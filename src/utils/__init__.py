@@ -4,4 +4,5 @@ Utilities Package
 """
 
 from .features import *
+from .step_context import StepContext, as_step_context
 from .actions import action_manager, ActionManager 
\ No newline at end of file
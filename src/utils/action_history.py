@@ -0,0 +1,143 @@
+"""
+动作历史模块 - 以固定大小的环形缓冲区记录每名球员最近的动作
+
+每名球员保存最近 depth 条记录（动作、步数、决策分支），存储在
+(球员数, depth) 的 NumPy 数组中，写入只覆盖一格，不分配新对象。
+查询（距上次某类动作的步数、重复动作的连续长度等）对全队一次性计算，
+供防抖等需要较长历史的决策逻辑使用。
+"""
+
+import numpy as np
+
+# 默认每名球员保存的记录数
+DEFAULT_DEPTH = 10
+
+# 空记录 / 未知分支
+NO_ACTION = -1
+UNKNOWN_BRANCH = -1
+
+
+class ActionHistory:
+    """
+    全队的动作环形缓冲区
+
+    actions / steps / branches: (num_players, depth) 数组，第 count % depth 列为下一次写入位置
+    count: 每名球员累计记录的条数
+    step: 下一次 record_step 使用的步数
+    分支以名称记录，内部保存为整数编号（branch_names[编号] 为名称）。
+    """
+
+    def __init__(self, num_players=11, depth=DEFAULT_DEPTH):
+        if depth < 1:
+            raise ValueError(f"历史深度必须为正数: {depth}")
+        self.num_players = num_players
+        self.depth = depth
+        self.actions = np.full((num_players, depth), NO_ACTION, dtype=np.int16)
+        self.steps = np.full((num_players, depth), -1, dtype=np.int64)
+        self.branches = np.full((num_players, depth), UNKNOWN_BRANCH, dtype=np.int32)
+        self.count = np.zeros(num_players, dtype=np.int64)
+        self.step = 0
+        self.branch_names = []
+        self._branch_ids = {}
+        self._players = np.arange(num_players)
+        self._offsets = np.arange(depth)
+
+    def clear(self):
+        """清空所有记录（分支编号保留）"""
+        self.actions.fill(NO_ACTION)
+        self.steps.fill(-1)
+        self.branches.fill(UNKNOWN_BRANCH)
+        self.count.fill(0)
+        self.step = 0
+
+    def branch_id(self, branch):
+        """分支名称对应的编号（None 为 UNKNOWN_BRANCH）"""
+        if branch is None:
+            return UNKNOWN_BRANCH
+        branch_id = self._branch_ids.get(branch)
+        if branch_id is None:
+            branch_id = len(self.branch_names)
+            self._branch_ids[branch] = branch_id
+            self.branch_names.append(branch)
+        return branch_id
+
+    # ===================== 写入 =====================
+
+    def record(self, player_index, action, branch=None, step=None):
+        """记录单名球员的一条动作"""
+        column = self.count[player_index] % self.depth
+        self.actions[player_index, column] = action
+        self.steps[player_index, column] = self.step if step is None else step
+        self.branches[player_index, column] = self.branch_id(branch)
+        self.count[player_index] += 1
+
+    def record_step(self, actions, branches=None, mask=None):
+        """
+        记录全队一步的动作并推进步数
+
+        参数:
+            actions: 长度为 num_players 的动作序列
+            branches: 每名球员的决策分支名称（可为 None）
+            mask: 只记录这些球员（布尔数组），默认全部记录
+        """
+        players = self._players if mask is None else np.flatnonzero(mask)
+        columns = self.count[players] % self.depth
+        self.actions[players, columns] = np.asarray(actions)[players]
+        self.steps[players, columns] = self.step
+        if branches is not None:
+            self.branches[players, columns] = [self.branch_id(branches[i]) for i in players]
+        else:
+            self.branches[players, columns] = UNKNOWN_BRANCH
+        self.count[players] += 1
+        self.step += 1
+
+    # ===================== 查询 =====================
+
+    def _ordered(self, array):
+        """按从新到旧排列的记录 (num_players, depth) 和有效位置掩码"""
+        columns = (self.count[:, None] - 1 - self._offsets) % self.depth
+        valid = self._offsets < np.minimum(self.count, self.depth)[:, None]
+        return array[self._players[:, None], columns], valid
+
+    def get(self, player_index):
+        """球员的动作历史，从旧到新排列"""
+        filled = min(int(self.count[player_index]), self.depth)
+        columns = (self.count[player_index] - filled + self._offsets[:filled]) % self.depth
+        return self.actions[player_index, columns].tolist()
+
+    def last_actions(self):
+        """每名球员最近一次的动作（没有记录时为 NO_ACTION）"""
+        last = self.actions[self._players, (self.count - 1) % self.depth]
+        return np.where(self.count > 0, last, NO_ACTION)
+
+    def last_branches(self):
+        """每名球员最近一次动作的决策分支名称（未知或没有记录时为 None）"""
+        last = self.branches[self._players, (self.count - 1) % self.depth]
+        return [self.branch_names[branch_id] if count > 0 and branch_id >= 0 else None
+                for branch_id, count in zip(last.tolist(), self.count.tolist())]
+
+    def steps_since(self, actions):
+        """
+        每名球员距离上一次执行 actions 中任一动作的步数
+
+        以当前步（下一次 record_step 的步数）为准，上一步执行过时为 1；
+        缓冲区内没有这类动作时为 -1
+        """
+        matched = np.zeros(self.actions.shape, dtype=bool)
+        for action in actions:
+            matched |= self.actions == action
+        last_step = np.where(matched, self.steps, -1).max(axis=1)
+        return np.where(last_step >= 0, self.step - last_step, -1)
+
+    def streak_lengths(self):
+        """每名球员最近一次动作连续重复的次数（没有记录时为 0）"""
+        recent, valid = self._ordered(self.actions)
+        repeated = valid & (recent == recent[:, :1])
+        return np.cumprod(repeated, axis=1).sum(axis=1)
+
+    def action_counts(self, actions):
+        """每名球员缓冲区内执行 actions 中任一动作的次数"""
+        matched = np.zeros(self.actions.shape, dtype=bool)
+        for action in actions:
+            matched |= self.actions == action
+        return matched.sum(axis=1)
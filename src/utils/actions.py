@@ -2,9 +2,56 @@
 动作管理模块 - 封装动作ID和粘性动作逻辑
 """
 
+import numpy as np
+
 from src.gfootball_agent.config import Action, StickyActions
 
 
+# 动作 -> 对应的粘性动作索引（-1 表示没有）
+NUM_ACTIONS = 19
+MOVEMENT_ACTION_TO_STICKY = {
+    Action.LEFT: StickyActions.LEFT,
+    Action.TOP_LEFT: StickyActions.TOP_LEFT,
+    Action.TOP: StickyActions.TOP,
+    Action.TOP_RIGHT: StickyActions.TOP_RIGHT,
+    Action.RIGHT: StickyActions.RIGHT,
+    Action.BOTTOM_RIGHT: StickyActions.BOTTOM_RIGHT,
+    Action.BOTTOM: StickyActions.BOTTOM,
+    Action.BOTTOM_LEFT: StickyActions.BOTTOM_LEFT,
+}
+STICKY_TO_MOVEMENT_ACTION = {sticky: action for action, sticky in MOVEMENT_ACTION_TO_STICKY.items()}
+ACTION_TO_STICKY = {
+    **MOVEMENT_ACTION_TO_STICKY,
+    Action.SPRINT: StickyActions.SPRINT,
+    Action.DRIBBLE: StickyActions.DRIBBLE,
+}
+
+ACTION_STICKY_INDEX = np.full(NUM_ACTIONS, -1, dtype=np.int64)
+for _action, _sticky in ACTION_TO_STICKY.items():
+    ACTION_STICKY_INDEX[_action] = _sticky
+
+BALL_ACTIONS = (Action.SHOT, Action.LONG_PASS, Action.HIGH_PASS,
+                Action.SHORT_PASS, Action.DRIBBLE, Action.RELEASE_DRIBBLE)
+DEFENSIVE_ACTIONS = (Action.SLIDING,)
+
+IS_BALL_ACTION = np.zeros(NUM_ACTIONS, dtype=bool)
+IS_BALL_ACTION[list(BALL_ACTIONS)] = True
+IS_DEFENSIVE_ACTION = np.zeros(NUM_ACTIONS, dtype=bool)
+IS_DEFENSIVE_ACTION[list(DEFENSIVE_ACTIONS)] = True
+
+# 查表过滤：FILTER_TABLE[期望动作, 是否持球, 对应粘性动作是否激活] -> 实际动作
+# 没有对应粘性动作的动作读第 0 列，两种激活状态下结果相同
+STICKY_COLUMN = np.maximum(ACTION_STICKY_INDEX, 0)
+FILTER_TABLE = np.zeros((NUM_ACTIONS, 2, 2), dtype=np.int64)
+for _action in range(NUM_ACTIONS):
+    for _owns_ball in (False, True):
+        _valid = not ((IS_BALL_ACTION[_action] and not _owns_ball) or
+                      (IS_DEFENSIVE_ACTION[_action] and _owns_ball))
+        FILTER_TABLE[_action, int(_owns_ball), 0] = _action if _valid else Action.IDLE
+        FILTER_TABLE[_action, int(_owns_ball), 1] = (
+            _action if _valid and ACTION_STICKY_INDEX[_action] < 0 else Action.IDLE)
+
+
 class ActionManager:
     """动作管理器 - 处理粘性动作和动作转换"""
     
@@ -14,99 +61,28 @@ class ActionManager:
     def get_action_with_sticky_management(self, player_index, desired_action, obs):
         """
         根据期望动作和当前粘性动作状态，返回实际应该执行的动作
-        """
-        current_sticky = obs['sticky_actions']
         
-        # 如果期望动作是IDLE，保持当前状态
-        if desired_action == Action.IDLE:
+        移动、冲刺、盘带在对应的粘性动作已经激活时返回 IDLE 保持状态，
+        其他动作直接执行（批量版本见 filter_actions）
+        """
+        sticky_index = ACTION_TO_STICKY.get(desired_action)
+        if sticky_index is not None and obs['sticky_actions'][sticky_index]:
+            # 已经在执行期望的动作，返回IDLE保持状态
             return Action.IDLE
-        
-        # 处理移动动作
-        if self._is_movement_action(desired_action):
-            return self._handle_movement_action(desired_action, current_sticky)
-        
-        # 处理冲刺动作
-        if desired_action == Action.SPRINT:
-            return self._handle_sprint_action(current_sticky)
-        
-        # 处理停止冲刺
-        if desired_action == Action.RELEASE_SPRINT:
-            return Action.RELEASE_SPRINT
-        
-        # 处理盘带动作
-        if desired_action == Action.DRIBBLE:
-            return self._handle_dribble_action(current_sticky)
-        
-        # 处理停止盘带
-        if desired_action == Action.RELEASE_DRIBBLE:
-            return Action.RELEASE_DRIBBLE
-        
-        # 处理停止移动
-        if desired_action == Action.RELEASE_DIRECTION:
-            return Action.RELEASE_DIRECTION
-        
-        # 其他动作（传球、射门、铲球等）直接执行
         return desired_action
     
     def _is_movement_action(self, action):
         """判断是否为移动动作"""
-        movement_actions = [
-            Action.LEFT, Action.TOP_LEFT, Action.TOP, Action.TOP_RIGHT,
-            Action.RIGHT, Action.BOTTOM_RIGHT, Action.BOTTOM, Action.BOTTOM_LEFT
-        ]
-        return action in movement_actions
-    
-    def _handle_movement_action(self, desired_action, current_sticky):
-        """处理移动动作"""
-        # 检查当前是否已经在执行这个方向的移动
-        desired_sticky_index = self._action_to_sticky_index(desired_action)
-        
-        if desired_sticky_index is not None and current_sticky[desired_sticky_index]:
-            # 已经在执行期望的移动方向，返回IDLE保持状态
-            return Action.IDLE
-        else:
-            # 需要改变移动方向或开始移动
-            return desired_action
-    
-    def _handle_sprint_action(self, current_sticky):
-        """处理冲刺动作"""
-        if current_sticky[StickyActions.SPRINT]:
-            # 已经在冲刺，返回IDLE保持状态
-            return Action.IDLE
-        else:
-            # 开始冲刺
-            return Action.SPRINT
-    
-    def _handle_dribble_action(self, current_sticky):
-        """处理盘带动作"""
-        if current_sticky[StickyActions.DRIBBLE]:
-            # 已经在盘带，返回IDLE保持状态
-            return Action.IDLE
-        else:
-            # 开始盘带
-            return Action.DRIBBLE
+        return action in MOVEMENT_ACTION_TO_STICKY
     
     def _action_to_sticky_index(self, action):
-        """将动作转换为对应的粘性动作索引"""
-        action_to_sticky_map = {
-            Action.LEFT: StickyActions.LEFT,
-            Action.TOP_LEFT: StickyActions.TOP_LEFT,
-            Action.TOP: StickyActions.TOP,
-            Action.TOP_RIGHT: StickyActions.TOP_RIGHT,
-            Action.RIGHT: StickyActions.RIGHT,
-            Action.BOTTOM_RIGHT: StickyActions.BOTTOM_RIGHT,
-            Action.BOTTOM: StickyActions.BOTTOM,
-            Action.BOTTOM_LEFT: StickyActions.BOTTOM_LEFT,
-        }
-        return action_to_sticky_map.get(action)
+        """将移动动作转换为对应的粘性动作索引"""
+        return MOVEMENT_ACTION_TO_STICKY.get(action)
     
     def should_stop_current_movement(self, current_sticky):
         """判断是否应该停止当前移动"""
         # 检查是否有移动方向的粘性动作处于激活状态
-        for sticky_idx in StickyActions.MOVEMENT_ACTIONS:
-            if current_sticky[sticky_idx]:
-                return True
-        return False
+        return bool(np.any(np.asarray(current_sticky)[StickyActions.MOVEMENT_ACTIONS]))
     
     def get_current_movement_direction(self, current_sticky):
         """获取当前移动方向"""
@@ -117,17 +93,7 @@ class ActionManager:
     
     def _sticky_index_to_action(self, sticky_index):
         """将粘性动作索引转换为对应的动作"""
-        sticky_to_action_map = {
-            StickyActions.LEFT: Action.LEFT,
-            StickyActions.TOP_LEFT: Action.TOP_LEFT,
-            StickyActions.TOP: Action.TOP,
-            StickyActions.TOP_RIGHT: Action.TOP_RIGHT,
-            StickyActions.RIGHT: Action.RIGHT,
-            StickyActions.BOTTOM_RIGHT: Action.BOTTOM_RIGHT,
-            StickyActions.BOTTOM: Action.BOTTOM,
-            StickyActions.BOTTOM_LEFT: Action.BOTTOM_LEFT,
-        }
-        return sticky_to_action_map.get(sticky_index, Action.IDLE)
+        return STICKY_TO_MOVEMENT_ACTION.get(sticky_index, Action.IDLE)
 
 
 def combine_actions(primary_action, secondary_action=None):
@@ -149,17 +115,12 @@ def combine_actions(primary_action, secondary_action=None):
 
 def is_ball_action(action):
     """判断是否为与球相关的动作"""
-    ball_actions = [
-        Action.SHOT, Action.LONG_PASS, Action.HIGH_PASS, 
-        Action.SHORT_PASS, Action.DRIBBLE, Action.RELEASE_DRIBBLE
-    ]
-    return action in ball_actions
+    return action in BALL_ACTIONS
 
 
 def is_defensive_action(action):
     """判断是否为防守动作"""
-    defensive_actions = [Action.SLIDING]
-    return action in defensive_actions
+    return action in DEFENSIVE_ACTIONS
 
 
 def validate_action_for_situation(action, obs, player_index):
@@ -186,4 +147,56 @@ def validate_action_for_situation(action, obs, player_index):
 
 
 # 创建全局动作管理器实例
-action_manager = ActionManager() 
\ No newline at end of file
+action_manager = ActionManager()
+
+
+def owns_ball_mask(ball_owned_team, ball_owned_player, num_players=11):
+    """
+    球员是否持球的布尔数组
+
+    参数:
+        ball_owned_team / ball_owned_player: 标量，或 (B,) 数组（批量）
+
+    返回:
+        (num_players,) 或 (B, num_players) 布尔数组
+    """
+    if not isinstance(ball_owned_team, np.ndarray) and not isinstance(ball_owned_player, np.ndarray):
+        mask = np.zeros(num_players, dtype=bool)
+        if ball_owned_team == 0 and 0 <= ball_owned_player < num_players:
+            mask[ball_owned_player] = True
+        return mask
+    players = np.arange(num_players)
+    ball_owned_team = np.asarray(ball_owned_team)
+    ball_owned_player = np.asarray(ball_owned_player)
+    return (ball_owned_team == 0)[..., None] & (ball_owned_player[..., None] == players)
+
+
+def filter_actions(actions, sticky_actions, owns_ball):
+    """
+    查表完成的动作验证 + 粘性动作过滤，一次数组运算处理全队
+    （与 validate_action_for_situation 和
+    ActionManager.get_action_with_sticky_management 的规则一致）
+
+    参数:
+        actions: (11,) 或 (B,11) 期望动作
+        sticky_actions: (11,10) 或 (B,11,10) 每名球员当前的粘性动作
+        owns_ball: (11,) 或 (B,11) 布尔数组，球员是否持球（见 owns_ball_mask）
+
+    返回:
+        actions: 与输入形状相同的实际应该执行的动作（int64 数组）
+    """
+    actions = np.asarray(actions, dtype=np.int64)
+    # 负数按无符号数解释后一定超出表的范围，一次归约即可检查
+    if actions.size and actions.view(np.uint64).max() >= NUM_ACTIONS:
+        # 表外的动作编号不做任何处理，原样返回
+        known = (actions >= 0) & (actions < NUM_ACTIONS)
+        filtered = filter_actions(np.where(known, actions, Action.IDLE), sticky_actions, owns_ball)
+        return np.where(known, filtered, actions)
+
+    # 每名球员期望动作对应的粘性动作是否已经激活
+    sticky_actions = np.asarray(sticky_actions)
+    flat_sticky = sticky_actions.reshape(-1, sticky_actions.shape[-1])
+    active = flat_sticky[np.arange(len(flat_sticky)), STICKY_COLUMN[actions].ravel()]
+    # 布尔数组按 int8 解释作为表的下标（不复制）
+    active = (active.reshape(actions.shape) != 0).view(np.int8)
+    return FILTER_TABLE[actions, np.asarray(owns_ball, dtype=bool).view(np.int8), active]
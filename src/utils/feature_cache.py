@@ -0,0 +1,110 @@
+"""
+特征记忆化模块 - 按观测对象和参数缓存纯特征函数的结果
+
+用 @memoize_feature 标记只依赖 (obs, 其余参数) 的特征函数。缓存键为
+(函数, 观测对象的身份, 参数)，条目同时保存观测对象的引用，
+因此观测对象存活期间它的 id 不会被复用。
+FootballAgent 每步开始时调用 feature_cache.new_step() 推进代数并清空条目；
+条目总数有上限，超出时淘汰最久未使用的条目。
+被缓存的返回值在调用方之间共享，不能原地修改。
+"""
+
+import functools
+from collections import OrderedDict
+
+import numpy as np
+
+# 默认最多缓存的条目数
+DEFAULT_MAX_SIZE = 4096
+
+
+class _Unhashable(Exception):
+    """参数无法转换为缓存键"""
+
+
+def _freeze(value):
+    """把参数转换为可哈希的缓存键"""
+    if isinstance(value, np.ndarray):
+        return ('ndarray', value.shape, tuple(value.ravel().tolist()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    try:
+        hash(value)
+    except TypeError:
+        raise _Unhashable
+    return value
+
+
+class FeatureCache:
+    """带代数失效和容量上限的特征缓存"""
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE):
+        self.enabled = True
+        self.max_size = max_size
+        self.generation = 0
+        self._entries = OrderedDict()  # 键 -> (观测对象, 结果)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def new_step(self):
+        """进入新的一步：推进代数，丢弃上一步的全部条目"""
+        self.generation += 1
+        self._entries.clear()
+
+    def reset_stats(self):
+        """清空命中统计"""
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def call(self, func, obs, args, kwargs):
+        """查询缓存，未命中时调用 func(obs, *args, **kwargs) 并保存结果"""
+        try:
+            key = (func, self.generation, id(obs), _freeze(args),
+                   _freeze(tuple(sorted(kwargs.items()))) if kwargs else None)
+        except _Unhashable:
+            self.misses += 1
+            return func(obs, *args, **kwargs)
+
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] is obs:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        result = func(obs, *args, **kwargs)
+        self._entries[key] = (obs, result)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return result
+
+    def stats(self):
+        """返回命中统计"""
+        total = self.hits + self.misses
+        return {
+            'generation': self.generation,
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+
+def memoize_feature(func):
+    """标记纯特征函数 func(obs, ...)：在同一步内对相同的观测和参数只计算一次"""
+
+    @functools.wraps(func)
+    def wrapper(obs, *args, **kwargs):
+        if not feature_cache.enabled:
+            return func(obs, *args, **kwargs)
+        return feature_cache.call(func, obs, args, kwargs)
+
+    return wrapper
+
+
+# 创建全局特征缓存实例
+feature_cache = FeatureCache()
@@ -2,14 +2,22 @@
 特征工程模块 - 计算距离、角度等派生特征
 """
 
-import numpy as np
 import math
-from src.gfootball_agent.config import Field, PlayerRole
+import random
+
+import numpy as np
+
+from src.gfootball_agent.config import Action, Angle, Distance, Field, PlayerRole, Tactics
+from src.utils.feature_cache import memoize_feature
+from src.utils.geometry import distances_from, point_distance
+from src.utils.pass_lanes import get_pass_table, lanes_clear
+from src.utils.spatial_index import RIGHT_TEAM, get_spatial_index
+from src.utils.step_context import StepContext, as_step_context
 
 
 def distance_to(pos1, pos2):
     """计算两个位置之间的欧几里得距离"""
-    return np.linalg.norm(np.array(pos1) - np.array(pos2))
+    return point_distance(pos1, pos2)
 
 
 def angle_between_vectors(v1, v2):
@@ -31,6 +39,8 @@ def angle_to_goal(player_pos, goal_x=Field.RIGHT_GOAL_X):
 
 def get_ball_info(obs):
     """获取球的位置和状态信息"""
+    if isinstance(obs, StepContext):
+        return obs.ball_info
     return {
         'position': obs['ball'][:2],  # 只取x,y坐标
         'direction': obs['ball_direction'][:2],
@@ -41,6 +51,8 @@ def get_ball_info(obs):
 
 def get_player_info(obs, player_index):
     """获取指定球员的详细信息"""
+    if isinstance(obs, StepContext):
+        return obs.player_info(player_index)
     return {
         'position': obs['left_team'][player_index],
         'direction': obs['left_team_direction'][player_index],
@@ -52,40 +64,33 @@ def get_player_info(obs, player_index):
 
 def find_closest_player(reference_pos, team_positions, exclude_indices=None):
     """找到距离参考位置最近的球员"""
-    if exclude_indices is None:
-        exclude_indices = []
+    if len(team_positions) == 0:
+        return -1, float('inf')
     
-    min_distance = float('inf')
-    closest_index = -1
+    distances = distances_from(reference_pos, team_positions)
+    if exclude_indices:
+        distances[list(exclude_indices)] = np.inf
     
-    for i, pos in enumerate(team_positions):
-        if i in exclude_indices:
-            continue
-        
-        dist = distance_to(reference_pos, pos)
-        if dist < min_distance:
-            min_distance = dist
-            closest_index = i
+    closest_index = int(distances.argmin())
+    min_distance = distances[closest_index]
+    if np.isinf(min_distance):
+        return -1, float('inf')
     
     return closest_index, min_distance
 
 
 def find_closest_teammate(obs, player_index):
     """找到最近的队友"""
-    player_pos = obs['left_team'][player_index]
-    closest_idx, closest_dist = find_closest_player(
-        player_pos, obs['left_team'], exclude_indices=[player_index]
-    )
-    return closest_idx, closest_dist
+    ctx = as_step_context(obs)
+    return (int(ctx.nearest_teammate_index[player_index]),
+            ctx.nearest_teammate_distance[player_index])
 
 
 def find_closest_opponent(obs, player_index):
     """找到最近的对手"""
-    player_pos = obs['left_team'][player_index]
-    closest_idx, closest_dist = find_closest_player(
-        player_pos, obs['right_team']
-    )
-    return closest_idx, closest_dist
+    ctx = as_step_context(obs)
+    return (int(ctx.nearest_opponent_index[player_index]),
+            ctx.nearest_opponent_distance[player_index])
 
 
 def is_in_opponent_half(position):
@@ -98,6 +103,16 @@ def is_in_own_half(position):
     return position[0] < Field.CENTER_X
 
 
+def is_ball_in_penalty_area(ball_pos):
+    """判断球是否在己方禁区内"""
+    # 简化的禁区定义（实际禁区更复杂）
+    penalty_area_x = Field.LEFT_GOAL_X + 0.165  # 禁区长度约0.165
+    penalty_area_y = 0.2  # 禁区宽度的一半
+    
+    return (ball_pos[0] < penalty_area_x and 
+            abs(ball_pos[1]) < penalty_area_y)
+
+
 def can_shoot(player_pos, ball_pos, obs):
     """判断是否处于合理的射门位置"""
     # 必须在对方半场
@@ -109,13 +124,11 @@ def can_shoot(player_pos, ball_pos, obs):
     distance_to_goal = distance_to(player_pos, goal_center)
     
     # 距离球门太远不适合射门
-    from src.gfootball_agent.config import Distance
     if distance_to_goal > Distance.SHOT_RANGE:
         return False
     
     # 检查射门角度
     shot_angle = abs(angle_to_goal(player_pos))
-    from src.gfootball_agent.config import Angle
     if shot_angle > Angle.SHOT_ANGLE_THRESHOLD:
         return False
     
@@ -124,107 +137,16 @@ def can_shoot(player_pos, ball_pos, obs):
 
 def get_best_pass_target(obs, player_index):
     """找到最佳的传球目标 - 优化版本，更加激进的前传"""
-    player_pos = obs['left_team'][player_index]
-    ball_info = get_ball_info(obs)
-    
-    best_target = -1
-    best_score = -1
-    
-    for i, teammate_pos in enumerate(obs['left_team']):
-        if i == player_index:  # 跳过自己
-            continue
-            
-        if not obs['left_team_active'][i]:  # 跳过非活跃球员
-            continue
-        
-        # 计算传球距离
-        pass_distance = distance_to(player_pos, teammate_pos)
-        
-        # 计算向前推进的程度
-        forward_progress = teammate_pos[0] - player_pos[0]
-        
-        # 检查传球路线是否清晰
-        is_clear_path = check_pass_path_clear(player_pos, teammate_pos, obs['right_team'])
-        
-        # 检查接球队友周围的空间
-        teammate_space = get_space_around_player(obs, i)
-        
-        # 获取队友角色
-        teammate_role = obs['left_team_roles'][i]
-        
-        # 综合评分 - 大幅提高前传权重
-        score = 0
-        
-        # 1. 向前传球奖励（显著提高权重）
-        if forward_progress > 0:
-            score += forward_progress * 5  # 从2提高到5
-            
-            # 对于显著的前传给予额外奖励
-            if forward_progress > 0.2:
-                score += 3
-            elif forward_progress > 0.1:
-                score += 1.5
-                
-        # 2. 严厉惩罚回传，特别是在己方半场
-        elif forward_progress < 0:
-            penalty = abs(forward_progress) * 3  # 回传惩罚
-            if is_in_own_half(player_pos):  # 在己方半场回传惩罚更重
-                penalty *= 2
-            score -= penalty
-            
-        # 3. 高价值目标奖励
-        if teammate_role == PlayerRole.CENTRAL_FORWARD:
-            score += 2.5  # 传给前锋高奖励
-        elif teammate_role == PlayerRole.ATTACK_MIDFIELD:
-            score += 2.0  # 传给攻击中场
-        elif teammate_role in [PlayerRole.LEFT_MIDFIELD, PlayerRole.RIGHT_MIDFIELD]:
-            if is_in_opponent_half(teammate_pos):
-                score += 1.5  # 传给在前场的边路中场
-                
-        # 4. 路线清晰性
-        if is_clear_path:
-            score += 1.5  # 提高清晰路线的奖励
-        else:
-            score -= 1.0  # 路线不清晰的惩罚
-            
-        # 5. 队友周围空间奖励
-        score += teammate_space * 2  # 空间越大奖励越高
-        
-        # 6. 在对方半场的位置奖励
-        if is_in_opponent_half(teammate_pos):
-            score += 2.0  # 提高在对方半场的奖励
-            
-        # 7. 距离因素优化
-        from src.gfootball_agent.config import Distance
-        if pass_distance < Distance.SHORT_PASS_RANGE:
-            if Distance.SHORT_PASS_RANGE * 0.3 < pass_distance < Distance.SHORT_PASS_RANGE * 0.8:
-                score += 0.8  # 适中距离的短传
-        elif pass_distance < Distance.LONG_PASS_RANGE:
-            if forward_progress > 0.3:  # 只有显著前传的长传才有奖励
-                score += 1.0
-                
-        # 8. 避免传给受压的队友
-        closest_opp_to_teammate, dist_to_closest_opp = find_closest_opponent(obs, i)
-        if dist_to_closest_opp < Distance.PRESSURE_DISTANCE * 1.5:
-            score -= 2.0  # 队友受压惩罚
-        
-        if score > best_score:
-            best_score = score
-            best_target = i
-    
-    return best_target
+    # 评分规则见 pass_lanes.PassTable，每步对所有传球者一次性计算
+    return get_pass_table(obs).best_target(player_index)
 
 
 def get_space_around_player(obs, player_index):
     """计算球员周围的空间大小"""
-    player_pos = obs['left_team'][player_index]
+    ctx = as_step_context(obs)
     
-    # 计算最近对手的距离
-    min_distance_to_opponent = float('inf')
-    for opp_pos in obs['right_team']:
-        dist = distance_to(player_pos, opp_pos)
-        if dist < min_distance_to_opponent:
-            min_distance_to_opponent = dist
+    # 最近对手的距离
+    min_distance_to_opponent = ctx.nearest_opponent_distance[player_index]
     
     # 将距离转换为空间评分（0-1）
     max_useful_distance = 0.15  # 超过这个距离就认为空间很好了
@@ -233,6 +155,7 @@ def get_space_around_player(obs, player_index):
     return space_score
 
 
+@memoize_feature
 def check_dribble_space(obs, player_index, direction_vector=None):
     """
     检查球员前方是否有盘带空间
@@ -245,54 +168,27 @@ def check_dribble_space(obs, player_index, direction_vector=None):
     返回:
         (has_space, distance_to_obstacle): 是否有空间，到障碍的距离
     """
-    player_pos = obs['left_team'][player_index]
+    ctx = as_step_context(obs)
+    player_pos = ctx.left_team[player_index]
     
     # 默认向前（向对方球门方向）
     if direction_vector is None:
         direction_vector = [1.0, 0.0]  # 向右（对方球门方向）
     
-    # 标准化方向向量
-    direction_norm = np.linalg.norm(direction_vector)
-    if direction_norm == 0:
+    # 零向量没有前进方向
+    if np.linalg.norm(direction_vector) == 0:
         return False, 0.0
     
-    direction_unit = np.array(direction_vector) / direction_norm
-    
     # 检查前方锥形区域
     cone_angle = 30  # 度
     cone_distance = 0.1  # 检查距离
     min_safe_distance = 0.05  # 最小安全距离
     
-    # 计算锥形的边界向量
-    angle_rad = math.radians(cone_angle / 2)
-    left_boundary = [
-        direction_unit[0] * math.cos(angle_rad) - direction_unit[1] * math.sin(angle_rad),
-        direction_unit[0] * math.sin(angle_rad) + direction_unit[1] * math.cos(angle_rad)
-    ]
-    right_boundary = [
-        direction_unit[0] * math.cos(-angle_rad) - direction_unit[1] * math.sin(-angle_rad),
-        direction_unit[0] * math.sin(-angle_rad) + direction_unit[1] * math.cos(-angle_rad)
-    ]
-    
-    # 检查锥形区域内是否有对手
-    min_distance_to_opponent = float('inf')
-    
-    for opp_pos in obs['right_team']:
-        # 计算到对手的向量
-        to_opponent = np.array(opp_pos) - np.array(player_pos)
-        distance_to_opp = np.linalg.norm(to_opponent)
-        
-        if distance_to_opp == 0:
-            continue
-        
-        # 检查对手是否在锥形范围内
-        to_opponent_unit = to_opponent / distance_to_opp
-        
-        # 计算与方向向量的角度
-        dot_product = np.dot(to_opponent_unit, direction_unit)
-        if dot_product > math.cos(angle_rad):  # 在锥形范围内
-            if distance_to_opp < cone_distance:
-                min_distance_to_opponent = min(min_distance_to_opponent, distance_to_opp)
+    # 锥形区域内最近的对手
+    in_cone = get_spatial_index(ctx).in_cone(
+        player_pos, direction_vector, math.radians(cone_angle / 2), cone_distance, team=RIGHT_TEAM
+    )
+    min_distance_to_opponent = in_cone[0][2] if in_cone else float('inf')
     
     # 判断是否有足够空间
     has_space = min_distance_to_opponent > min_safe_distance
@@ -300,6 +196,7 @@ def check_dribble_space(obs, player_index, direction_vector=None):
     return has_space, min_distance_to_opponent
 
 
+@memoize_feature
 def is_safe_to_clear_ball(obs, player_index):
     """
     判断是否应该解围（在危险区域且没有好的传球选择）
@@ -311,7 +208,8 @@ def is_safe_to_clear_ball(obs, player_index):
     返回:
         should_clear: 是否应该解围
     """
-    player_pos = obs['left_team'][player_index]
+    ctx = as_step_context(obs)
+    player_pos = ctx.left_team[player_index]
     
     # 检查是否在危险区域（己方禁区或接近禁区）
     danger_zone_x = Field.LEFT_GOAL_X + 0.2  # 禁区 + 缓冲区
@@ -321,39 +219,27 @@ def is_safe_to_clear_ball(obs, player_index):
         return False
     
     # 检查是否被对手紧逼
-    closest_opp_idx, closest_opp_dist = find_closest_opponent(obs, player_index)
-    from src.gfootball_agent.config import Distance
+    closest_opp_dist = ctx.nearest_opponent_distance[player_index]
     is_under_pressure = closest_opp_dist < Distance.PRESSURE_DISTANCE * 1.5
     
     if not is_under_pressure:
         return False
     
     # 检查是否有安全的传球选择
-    safe_pass_found = False
+    table = get_pass_table(ctx)
+    roles = ctx.left_team_roles
     
-    for i, teammate_pos in enumerate(obs['left_team']):
-        if i == player_index or not obs['left_team_active'][i]:
-            continue
-        
-        # 不能传给守门员（如果自己不是守门员）
-        teammate_role = obs['left_team_roles'][i]
-        if teammate_role == PlayerRole.GOALKEEPER and obs['left_team_roles'][player_index] != PlayerRole.GOALKEEPER:
-            continue
-        
-        # 检查队友是否在安全位置
-        teammate_to_goal_dist = distance_to(teammate_pos, [Field.LEFT_GOAL_X, Field.CENTER_Y])
-        player_to_goal_dist = distance_to(player_pos, [Field.LEFT_GOAL_X, Field.CENTER_Y])
-        
-        # 队友不能比自己更接近球门（避免乌龙球）
-        if teammate_to_goal_dist < player_to_goal_dist:
-            continue
-        
-        # 检查传球距离和路线
-        pass_distance = distance_to(player_pos, teammate_pos)
-        if pass_distance < Distance.SHORT_PASS_RANGE:
-            if check_pass_path_clear(player_pos, teammate_pos, obs['right_team']):
-                safe_pass_found = True
-                break
+    # 不能传给守门员（如果自己不是守门员）
+    allowed_role = ((roles != PlayerRole.GOALKEEPER) |
+                    (roles[player_index] == PlayerRole.GOALKEEPER))
+    # 队友不能比自己更接近球门（避免乌龙球）
+    not_closer_to_goal = table.goal_distances >= table.goal_distances[player_index]
+    # 检查传球距离和路线
+    short_and_clear = ((table.pass_distances[player_index] < Distance.SHORT_PASS_RANGE) &
+                       table.clear[player_index])
+    
+    safe_pass_found = bool((table.valid[player_index] & allowed_role &
+                            not_closer_to_goal & short_and_clear).any())
     
     # 如果没有安全传球选择，应该解围
     return not safe_pass_found
@@ -362,8 +248,6 @@ def is_safe_to_clear_ball(obs, player_index):
 def get_clearance_target_position():
     """获取解围的目标位置（对方半场边路）"""
     # 选择对方半场的边路位置
-    import random
-    
     target_x = 0.6 + random.random() * 0.3  # 对方半场
     target_y = (0.3 + random.random() * 0.1) * (1 if random.random() > 0.5 else -1)  # 边路
     
@@ -372,34 +256,14 @@ def get_clearance_target_position():
 
 def check_pass_path_clear(start_pos, end_pos, opponent_positions, threshold=0.05):
     """检查传球路径是否被对手阻挡"""
-    path_vector = np.array(end_pos) - np.array(start_pos)
-    path_length = np.linalg.norm(path_vector)
-    
-    if path_length == 0:
-        return True
-    
-    path_unit = path_vector / path_length
-    
-    for opp_pos in opponent_positions:
-        # 计算对手到传球路径的距离
-        to_opponent = np.array(opp_pos) - np.array(start_pos)
-        projection_length = np.dot(to_opponent, path_unit)
-        
-        # 只考虑在传球路径上的对手
-        if 0 <= projection_length <= path_length:
-            closest_point = np.array(start_pos) + projection_length * path_unit
-            distance_to_path = distance_to(opp_pos, closest_point)
-            
-            if distance_to_path < threshold:
-                return False
-    
-    return True
+    return bool(lanes_clear([start_pos[:2]], [end_pos[:2]], opponent_positions, threshold)[0, 0])
 
 
 def get_defensive_position(obs, player_index):
     """计算防守位置"""
+    obs = as_step_context(obs)
     ball_pos = get_ball_info(obs)['position']
-    player_role = obs['left_team_roles'][player_index]
+    player_role = obs.left_team_roles[player_index]
     
     # 基础防守原则：在球和己方球门之间
     goal_center = [Field.LEFT_GOAL_X, Field.CENTER_Y]
@@ -441,8 +305,6 @@ def get_goalkeeper_position(ball_pos):
 
 def get_defender_position(ball_pos, player_role, obs):
     """计算后卫的防守位置"""
-    from src.gfootball_agent.config import Tactics
-    
     # 防线的X坐标基于球的位置动态调整
     defensive_x = min(ball_pos[0] - 0.1, Tactics.MID_BLOCK_X_THRESHOLD)
     defensive_x = max(defensive_x, Field.LEFT_GOAL_X + 0.15)  # 不能太靠近自己球门
@@ -461,8 +323,6 @@ def get_defender_position(ball_pos, player_role, obs):
 
 def get_midfielder_defensive_position(ball_pos, player_role, obs):
     """计算中场球员的防守位置"""
-    from src.gfootball_agent.config import Tactics
-    
     # 中场防守位置稍微靠前
     defensive_x = ball_pos[0] - 0.05
     defensive_x = max(defensive_x, Tactics.MID_BLOCK_X_THRESHOLD)
@@ -480,8 +340,8 @@ def get_midfielder_defensive_position(ball_pos, player_role, obs):
 
 def is_player_tired(obs, player_index):
     """判断球员是否疲劳"""
-    from src.gfootball_agent.config import Tactics
-    return obs['left_team_tired_factor'][player_index] > Tactics.TIRED_THRESHOLD
+    obs = as_step_context(obs)
+    return obs.left_team_tired_factor[player_index] > Tactics.TIRED_THRESHOLD
 
 
 def get_movement_direction(current_pos, target_pos):
@@ -500,7 +360,6 @@ def get_movement_direction(current_pos, target_pos):
     angle_degrees = math.degrees(angle)
     
     # 将角度转换为动作
-    from src.gfootball_agent.config import Action
     if -22.5 <= angle_degrees < 22.5:
         return Action.RIGHT
     elif 22.5 <= angle_degrees < 67.5:
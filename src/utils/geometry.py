@@ -0,0 +1,101 @@
+"""
+批量几何计算模块 - 以数组运算一次性计算所有球员/候选点之间的距离关系
+"""
+
+import math
+
+import numpy as np
+
+
+def as_points(positions):
+    """将位置（单个点或点列表）转换为 (N,2) 的浮点数组"""
+    points = np.asarray(positions, dtype=float)
+    if points.ndim == 1:
+        points = points[None, :]
+    return points[:, :2]
+
+
+def point_distance(pos1, pos2):
+    """计算两个点之间的欧几里得距离（标量版本，不分配数组）"""
+    return math.dist(pos1, pos2)
+
+
+def pairwise_distances(points_a, points_b=None):
+    """
+    计算两组点之间的距离矩阵
+
+    参数:
+        points_a: (N,2) 点集
+        points_b: (M,2) 点集，None 表示与 points_a 自身配对
+
+    返回:
+        distances: (N,M) 距离矩阵
+    """
+    points_a = as_points(points_a)
+    points_b = points_a if points_b is None else as_points(points_b)
+    diff = points_a[:, None, :] - points_b[None, :, :]
+    return np.sqrt((diff * diff).sum(axis=-1))
+
+
+def distances_from(point, points):
+    """计算一个点到一组点的距离，返回 (M,)"""
+    diff = as_points(points) - np.asarray(point, dtype=float)[:2]
+    return np.sqrt((diff * diff).sum(axis=-1))
+
+
+def min_distances(points, others):
+    """计算每个点到另一组点的最近距离，返回 (N,)"""
+    return pairwise_distances(points, others).min(axis=1)
+
+
+def nearest_k(distances, k=1, exclude_mask=None):
+    """
+    按行查找距离最近的 k 个点
+
+    参数:
+        distances: (N,M) 距离矩阵
+        k: 每行返回的最近点数量
+        exclude_mask: (N,M) 布尔矩阵，True 的位置不参与比较
+
+    返回:
+        (indices, nearest): 均为 (N,k)，按距离从近到远排列；
+        可选点不足 k 个时索引为 -1，距离为 inf
+    """
+    distances = np.asarray(distances, dtype=float)
+    if exclude_mask is not None:
+        distances = np.where(exclude_mask, np.inf, distances)
+
+    k = min(k, distances.shape[1])
+    # 稳定排序保证距离相同时取索引较小的点
+    indices = np.argsort(distances, axis=1, kind='stable')[:, :k]
+    nearest = np.take_along_axis(distances, indices, axis=1)
+    indices = np.where(np.isinf(nearest), -1, indices)
+    return indices, nearest
+
+
+def nearest_index(distances, exclude_mask=None):
+    """按行查找最近点，返回 (indices, nearest)，均为 (N,)"""
+    distances = np.asarray(distances, dtype=float)
+    if exclude_mask is not None:
+        distances = np.where(exclude_mask, np.inf, distances)
+    indices = distances.argmin(axis=1)
+    nearest = distances[np.arange(len(distances)), indices]
+    indices = np.where(np.isinf(nearest), -1, indices)
+    return indices, nearest
+
+
+def offset_points(origin, offsets):
+    """以 origin 为原点生成一组候选点，返回 (K,2)"""
+    return np.asarray(origin, dtype=float)[:2] + np.asarray(offsets, dtype=float)
+
+
+def first_argmax_above(values, threshold):
+    """
+    返回第一个取到最大值的索引，要求最大值严格大于 threshold，否则返回 -1
+    （与“逐个比较 score > best_score”的循环语义一致）
+    """
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        return -1
+    index = int(values.argmax())
+    return index if values[index] > threshold else -1
@@ -0,0 +1,88 @@
+"""
+防线模型 - 每步一次性汇总双方防线：对方的越位线、后卫线成员和空隙，
+以及我方防线的高度，供前锋、中场和后卫的决策以常数时间查询
+"""
+
+import numpy as np
+
+from src.gfootball_agent.config import Field, PlayerRole, Tactics
+from src.utils.geometry import point_distance
+from src.utils.step_context import as_step_context
+
+DEFENDER_ROLES = [PlayerRole.CENTRE_BACK, PlayerRole.LEFT_BACK, PlayerRole.RIGHT_BACK]
+
+# 越位判断的保守余量：距离越位线不足该值也视为越位
+OFFSIDE_MARGIN = 0.02
+
+
+class LineModel:
+    """
+    一步内的防线汇总
+
+    对方（向左进攻，防守 x = 1 的球门）：
+        second_last_defender_x: 对方倒数第二名球员（通常守门员是最后一名）的 x
+        offside_x: 越位线，取倒数第二名防守球员、球和中线中最靠前的位置
+        back_line: 对方后卫按 y 排序后的位置 (K,2)
+        back_line_indices: 对应的对方球员索引
+        gaps: 任意两名后卫之间的空隙 [(中心点, 宽度), ...]，按球员索引成对排列
+
+    我方：
+        own_line_x: 我方后卫线的平均高度（没有活跃后卫时为 None）
+        centre_backs_in_position: 位于中场防守线以内的中后卫数量
+    """
+
+    def __init__(self, ctx):
+        obs = ctx.obs
+        right_x = ctx.right_team[:, 0]
+
+        # 对方越位线
+        if len(right_x) >= 2:
+            self.second_last_defender_x = float(np.sort(right_x)[-2])
+        elif len(right_x) == 1:
+            self.second_last_defender_x = float(right_x[0])
+        else:
+            self.second_last_defender_x = Field.RIGHT_GOAL_X
+        self.offside_x = max(self.second_last_defender_x, float(ctx.ball_position[0]), Field.CENTER_X)
+
+        # 对方后卫线
+        right_roles = obs.get('right_team_roles')
+        if right_roles is None:
+            indices = np.zeros(0, dtype=int)
+        else:
+            indices = np.flatnonzero(np.isin(np.asarray(right_roles), DEFENDER_ROLES))
+        indices = indices[np.argsort(ctx.right_team[indices, 1], kind='stable')]
+        self.back_line_indices = indices
+        self.back_line = ctx.right_team[indices, :2]
+
+        # 不只是相邻的后卫，任意两名后卫之间都可能有可利用的空隙
+        members = ctx.right_team[np.sort(indices), :2].tolist()
+        self.gaps = []
+        for i in range(len(members)):
+            for j in range(i + 1, len(members)):
+                first, second = members[i], members[j]
+                center = [(first[0] + second[0]) / 2, (first[1] + second[1]) / 2]
+                self.gaps.append((center, point_distance(first, second)))
+
+        # 我方防线
+        own_x = ctx.left_team[ctx.role_mask(DEFENDER_ROLES) & ctx.left_team_active, 0]
+        self.own_line_x = float(own_x.mean()) if len(own_x) else None
+        self.centre_backs_in_position = int((ctx.role_mask([PlayerRole.CENTRE_BACK]) &
+                                             (ctx.left_team[:, 0] < Tactics.MID_BLOCK_X_THRESHOLD)).sum())
+
+    def is_offside(self, position):
+        """位置是否处于（或接近）越位位置"""
+        return position[0] > self.offside_x - OFFSIDE_MARGIN
+
+    def gaps_wider_than(self, width):
+        """宽度大于 width 的后卫空隙"""
+        return [(center, gap_width) for center, gap_width in self.gaps if gap_width > width]
+
+
+def get_line_model(obs):
+    """获取本步的防线模型（每步只计算一次）"""
+    ctx = as_step_context(obs)
+    model = ctx.cache.get('line_model')
+    if model is None:
+        model = LineModel(ctx)
+        ctx.cache['line_model'] = model
+    return model
@@ -0,0 +1,242 @@
+"""
+传球线路引擎 - 一次向量化计算 传球者×接球者×对手 的线路距离张量，
+并为每个可能的传球者给出所有传球选项的评分表
+"""
+
+import numpy as np
+
+from src.gfootball_agent.config import Distance, Field, PlayerRole
+from src.utils.geometry import distances_from, first_argmax_above
+from src.utils.step_context import as_step_context
+
+# 传球路线被视为阻挡的对手距离阈值
+PASS_LANE_THRESHOLD = 0.05
+
+DEFENDER_ROLES = [PlayerRole.CENTRE_BACK, PlayerRole.LEFT_BACK, PlayerRole.RIGHT_BACK]
+MIDFIELDER_ROLES = [PlayerRole.CENTRAL_MIDFIELD, PlayerRole.LEFT_MIDFIELD, PlayerRole.RIGHT_MIDFIELD]
+WING_MIDFIELDER_ROLES = [PlayerRole.LEFT_MIDFIELD, PlayerRole.RIGHT_MIDFIELD]
+
+OWN_GOAL = [Field.LEFT_GOAL_X, Field.CENTER_Y]
+
+
+def segment_distances(starts, ends, opponents):
+    """
+    计算每条线段到每个对手的距离
+
+    参数:
+        starts: (P,2) 线段起点
+        ends: (R,2) 线段终点
+        opponents: (M,2) 对手位置
+
+    返回:
+        (segment_distance, lengths):
+            segment_distance 为 (P,R,M)，对手投影落在线段外时为 inf；
+            lengths 为 (P,R) 线段长度
+    """
+    starts = np.asarray(starts, dtype=float)
+    ends = np.asarray(ends, dtype=float)
+    opponents = np.asarray(opponents, dtype=float)
+
+    path = ends[None, :, :] - starts[:, None, :]                   # (P,R,2)
+    lengths = np.sqrt((path * path).sum(axis=-1))                  # (P,R)
+    safe_lengths = np.where(lengths == 0, 1.0, lengths)
+    unit = path / safe_lengths[..., None]                          # (P,R,2)
+
+    to_opponent = opponents[None, :, :] - starts[:, None, :]       # (P,M,2)
+    projection = np.einsum('prk,pmk->prm', unit, to_opponent)      # (P,R,M)
+
+    closest = starts[:, None, None, :] + projection[..., None] * unit[:, :, None, :]
+    offset = opponents[None, None, :, :] - closest
+    distance = np.sqrt((offset * offset).sum(axis=-1))             # (P,R,M)
+
+    # 只考虑投影落在传球路径上的对手
+    on_path = (projection >= 0) & (projection <= lengths[..., None])
+    return np.where(on_path, distance, np.inf), lengths
+
+
+def lanes_clear(starts, ends, opponents, threshold=PASS_LANE_THRESHOLD):
+    """批量判断线段是否未被对手阻挡，返回 (P,R) 布尔矩阵"""
+    segment_distance, lengths = segment_distances(starts, ends, opponents)
+    return (segment_distance.min(axis=-1) >= threshold) | (lengths == 0)
+
+
+class PassTable:
+    """
+    传球选项评分表
+
+    每个矩阵都是 (传球者, 接球者) 形状，无效的选项（自己、非活跃队友、
+    规则排除的队友）评分为 -inf。
+    """
+
+    def __init__(self, ctx):
+        left_team = ctx.left_team
+        roles = ctx.left_team_roles
+        num_players = ctx.num_left
+
+        segment_distance, lengths = segment_distances(left_team, left_team, ctx.right_team)
+        self.segment_distances = segment_distance
+        self.lane_clearance = segment_distance.min(axis=-1)
+        self.clear = (self.lane_clearance >= PASS_LANE_THRESHOLD) | (lengths == 0)
+        self.pass_distances = ctx.team_distances
+        self.forward_progress = left_team[None, :, 0] - left_team[:, None, 0]
+
+        # 接球者属性
+        receiver_pressure = ctx.nearest_opponent_distance
+        receiver_space = np.minimum(receiver_pressure / 0.15, 1.0)
+        self.goal_distances = distances_from(OWN_GOAL, left_team)
+
+        # 基本有效性：不传给自己和非活跃队友
+        self.valid = np.broadcast_to(ctx.left_team_active, (num_players, num_players)).copy()
+        np.fill_diagonal(self.valid, False)
+
+        self.attack_scores = self._attack_scores(ctx, receiver_space, receiver_pressure)
+        self.safety_scores = self._safety_scores(receiver_pressure)
+        self.goalkeeper_scores = self._goalkeeper_scores(ctx, roles, receiver_space)
+        self.under_pressure_scores = self._under_pressure_scores(ctx, roles, receiver_pressure)
+
+    def _attack_scores(self, ctx, receiver_space, receiver_pressure):
+        """进攻传球评分（get_best_pass_target 的评分规则）"""
+        left_team = ctx.left_team
+        roles = ctx.left_team_roles
+        progress = self.forward_progress
+        pass_distance = self.pass_distances
+        receiver_x = left_team[:, 0]
+
+        score = np.zeros_like(progress)
+
+        # 1. 向前传球奖励，显著前传额外奖励
+        forward = progress > 0
+        score += np.where(forward, progress * 5, 0.0)
+        score += np.where(forward & (progress > 0.2), 3.0,
+                          np.where(forward & (progress > 0.1), 1.5, 0.0))
+
+        # 2. 回传惩罚，在己方半场更重
+        own_half = (left_team[:, 0] < Field.CENTER_X)[:, None]
+        penalty = np.abs(progress) * 3 * np.where(own_half, 2, 1)
+        score -= np.where(progress < 0, penalty, 0.0)
+
+        # 3. 高价值目标奖励
+        role_bonus = np.where(roles == PlayerRole.CENTRAL_FORWARD, 2.5,
+                     np.where(roles == PlayerRole.ATTACK_MIDFIELD, 2.0,
+                     np.where(ctx.role_mask(WING_MIDFIELDER_ROLES) & (receiver_x > Field.CENTER_X),
+                              1.5, 0.0)))
+        score += role_bonus[None, :]
+
+        # 4. 路线清晰性
+        score += np.where(self.clear, 1.5, -1.0)
+
+        # 5. 队友周围空间
+        score += (receiver_space * 2)[None, :]
+
+        # 6. 在对方半场的位置奖励
+        score += np.where(receiver_x > Field.CENTER_X, 2.0, 0.0)[None, :]
+
+        # 7. 距离因素
+        short = pass_distance < Distance.SHORT_PASS_RANGE
+        medium_short = ((Distance.SHORT_PASS_RANGE * 0.3 < pass_distance) &
+                        (pass_distance < Distance.SHORT_PASS_RANGE * 0.8))
+        long_forward = (~short & (pass_distance < Distance.LONG_PASS_RANGE) & (progress > 0.3))
+        score += np.where(short & medium_short, 0.8, 0.0)
+        score += np.where(long_forward, 1.0, 0.0)
+
+        # 8. 接球队友受压惩罚
+        score -= np.where(receiver_pressure < Distance.PRESSURE_DISTANCE * 1.5, 2.0, 0.0)[None, :]
+
+        return np.where(self.valid, score, -np.inf)
+
+    def _safety_scores(self, receiver_pressure):
+        """安全传球评分（find_safest_pass_target 的评分规则）"""
+        pass_distance = self.pass_distances
+        moderate = ((Distance.SHORT_PASS_RANGE * 0.5 < pass_distance) &
+                    (pass_distance < Distance.SHORT_PASS_RANGE))
+        score = receiver_pressure[None, :] + np.where(moderate, 0.02, 0.0)
+        return np.where(self.valid, score, -np.inf)
+
+    def _goalkeeper_scores(self, ctx, roles, receiver_space):
+        """守门员出球评分（get_safe_goalkeeper_pass_target 的评分规则）"""
+        goal_distances = self.goal_distances
+        pass_distance = self.pass_distances
+
+        # 绝对不传给距离己方球门更近的队友（防止乌龙球）
+        farther_from_goal = goal_distances[None, :] > goal_distances[:, None] + 0.02
+
+        score = (goal_distances * 3)[None, :] + np.zeros_like(pass_distance)
+        role_bonus = np.where(ctx.role_mask(DEFENDER_ROLES), 2.0,
+                     np.where(ctx.role_mask(MIDFIELDER_ROLES), 1.5, 0.0))
+        score += role_bonus[None, :]
+        score += (receiver_space * 2)[None, :]
+        moderate = ((Distance.SHORT_PASS_RANGE * 0.5 < pass_distance) &
+                    (pass_distance < Distance.SHORT_PASS_RANGE * 1.2))
+        score += np.where(moderate, 1.0, 0.0)
+        score += np.where(self.clear, 1.5, -1.0)
+        score -= np.where(np.abs(ctx.left_team[:, 1]) > 0.35, 0.5, 0.0)[None, :]
+
+        return np.where(self.valid & farther_from_goal, score, -np.inf)
+
+    def _under_pressure_scores(self, ctx, roles, receiver_pressure):
+        """被逼抢时的安全出球评分（defender_under_pressure 的评分规则）"""
+        left_team = ctx.left_team
+        goal_distances = self.goal_distances
+        pass_distance = self.pass_distances
+
+        # 不传给守门员（除非自己是守门员），不传给更接近球门的队友
+        is_goalkeeper = roles == PlayerRole.GOALKEEPER
+        allowed_role = ~is_goalkeeper[None, :] | is_goalkeeper[:, None]
+        farther_from_goal = goal_distances[None, :] > goal_distances[:, None] + 0.02
+
+        score = (receiver_pressure * 5)[None, :] + np.zeros_like(pass_distance)
+        score += (goal_distances * 3)[None, :]
+        score += np.where(np.abs(left_team[:, 1]) > 0.2, 1.0, 0.0)[None, :]
+        same_lane = np.abs(left_team[None, :, 1] - left_team[:, None, 1]) < 0.1
+        score -= np.where(same_lane, 0.5, 0.0)
+        score -= np.where(pass_distance > Distance.SHORT_PASS_RANGE * 1.5, 1.0, 0.0)
+        score -= np.where(self.clear, 0.0, 2.0)
+
+        return np.where(self.valid & allowed_role & farther_from_goal, score, -np.inf)
+
+    def ranked(self, passer_index, scores=None):
+        """
+        返回某个传球者所有有效传球选项，按评分从高到低排列
+
+        返回:
+            [(receiver_index, score), ...]
+        """
+        if scores is None:
+            scores = self.attack_scores
+        row = scores[passer_index]
+        order = np.argsort(-row, kind='stable')
+        return [(int(i), float(row[i])) for i in order if np.isfinite(row[i])]
+
+    def best_target(self, passer_index):
+        """最佳进攻传球目标，没有时返回 -1"""
+        return first_argmax_above(self.attack_scores[passer_index], -1)
+
+    def safest_target(self, passer_index):
+        """最安全的传球目标，没有时返回 -1"""
+        return first_argmax_above(self.safety_scores[passer_index], 0)
+
+    def goalkeeper_target(self, passer_index):
+        """守门员最安全的出球目标，没有时返回 -1"""
+        return first_argmax_above(self.goalkeeper_scores[passer_index], -1)
+
+    def under_pressure_target(self, passer_index):
+        """
+        被逼抢时的出球目标
+
+        返回:
+            (target_index, score)，没有有效目标时为 (-1, -1)
+        """
+        target = first_argmax_above(self.under_pressure_scores[passer_index], -1)
+        if target == -1:
+            return -1, -1
+        return target, self.under_pressure_scores[passer_index, target]
+
+
+def get_pass_table(obs):
+    """获取本步的传球评分表（每步只计算一次）"""
+    ctx = as_step_context(obs)
+    table = ctx.cache.get('pass_table')
+    if table is None:
+        table = PassTable(ctx)
+        ctx.cache['pass_table'] = table
+    return table
@@ -0,0 +1,222 @@
+"""
+决策树性能剖析模块 - 可选开启的决策节点插桩
+
+用 @decision_node 标记决策树中返回动作的函数。开启后记录每个节点的
+调用次数、累计耗时和自身耗时，统计每次决策最终由哪个叶子分支给出
+（例如 defender_under_pressure -> LONG_PASS），并可导出火焰图使用的
+折叠栈格式（flamegraph.pl / speedscope 均可读取）。
+也可以只记录指定节点每次调用的耗时（基准测试统计各角色决策函数的延迟分位数）。
+关闭时每次调用只多一次布尔判断。
+"""
+
+import functools
+from collections import defaultdict
+from contextlib import contextmanager
+from time import perf_counter
+
+from src.gfootball_agent.config import Action
+
+ACTION_NAMES = {value: name for name, value in vars(Action).items() if not name.startswith('_')}
+
+
+def action_name(action):
+    """获取动作名称"""
+    return ACTION_NAMES.get(action, str(action))
+
+
+def _same_action(a, b):
+    # True == 1 == Action.LEFT，需要同时比较类型
+    return type(a) is type(b) and a == b
+
+
+class _Frame:
+    """调用栈中的一个决策节点"""
+    __slots__ = ('name', 'path', 'child_time', 'child_leaf', 'child_result')
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.child_time = 0.0
+        self.child_leaf = None
+        self.child_result = None
+
+
+class DecisionProfiler:
+    """决策节点剖析器"""
+
+    def __init__(self):
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        """清空统计数据"""
+        self.stats = {}                      # 节点名 -> [调用次数, 累计耗时, 自身耗时]
+        self.stacks = defaultdict(float)     # 折叠栈 -> 自身耗时
+        self.branches = defaultdict(int)     # (叶子节点, 动作) -> 次数
+        self.errors = defaultdict(int)       # 异常类型 -> 次数
+        self.last_leaf = None                # 最近一次顶层决策的叶子分支
+        self.latencies = defaultdict(list)   # 节点名 -> 每次调用的耗时（只在 timing 中记录）
+        self._stack = []
+        self._timed_nodes = None
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        self._stack.clear()
+        self._timed_nodes = None
+
+    @contextmanager
+    def profiling(self, reset=True):
+        """在 with 代码块内开启剖析"""
+        if reset:
+            self.reset()
+        self.enable()
+        try:
+            yield self
+        finally:
+            self.disable()
+
+    @contextmanager
+    def timing(self, nodes, reset=True):
+        """
+        在 with 代码块内只记录 nodes 中节点每次调用的耗时（见 latencies），
+        不维护调用栈和分支统计，其余节点直接调用
+        """
+        if reset:
+            self.reset()
+        self._timed_nodes = frozenset(nodes)
+        self.enable()
+        try:
+            yield self
+        finally:
+            self.disable()
+
+    def call(self, name, func, args, kwargs):
+        """执行并记录一次决策节点调用"""
+        if self._timed_nodes is not None:
+            return self._time(name, func, args, kwargs)
+
+        stack = self._stack
+        path = f"{stack[-1].path};{name}" if stack else name
+        frame = _Frame(name, path)
+        stack.append(frame)
+
+        start = perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException:
+            self._exit(frame, perf_counter() - start, None, failed=True)
+            raise
+        self._exit(frame, perf_counter() - start, result)
+        return result
+
+    def _time(self, name, func, args, kwargs):
+        if name not in self._timed_nodes:
+            return func(*args, **kwargs)
+        start = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.latencies[name].append(perf_counter() - start)
+
+    def _exit(self, frame, elapsed, result, failed=False):
+        stack = self._stack
+        stack.pop()
+
+        self_time = elapsed - frame.child_time
+        stat = self.stats.get(frame.name)
+        if stat is None:
+            stat = self.stats[frame.name] = [0, 0.0, 0.0]
+        stat[0] += 1
+        stat[1] += elapsed
+        stat[2] += self_time
+        self.stacks[frame.path] += self_time
+
+        # 最后返回的子节点给出了相同动作时，动作来自该子节点的叶子分支
+        if frame.child_leaf is not None and _same_action(frame.child_result, result):
+            leaf = frame.child_leaf
+        else:
+            leaf = frame.name
+
+        if stack:
+            parent = stack[-1]
+            parent.child_time += elapsed
+            parent.child_leaf = leaf
+            parent.child_result = result
+        elif failed:
+            self.last_leaf = None
+        else:
+            self.last_leaf = leaf
+            self.branches[(leaf, result)] += 1
+
+    def record_error(self, error):
+        """记录一次决策异常"""
+        if self.enabled:
+            self.errors[type(error).__name__] += 1
+
+    def report(self):
+        """
+        返回统计结果
+
+        返回:
+            {'nodes': [{name, calls, cumulative, self}, ...]（按累计耗时排序）,
+             'branches': [{leaf, action, count}, ...]（按次数排序）,
+             'errors': {异常类型: 次数}}
+        """
+        nodes = [
+            {'name': name, 'calls': calls, 'cumulative': cumulative, 'self': self_time}
+            for name, (calls, cumulative, self_time) in self.stats.items()
+        ]
+        nodes.sort(key=lambda node: node['cumulative'], reverse=True)
+
+        branches = [
+            {'leaf': leaf, 'action': action_name(action), 'count': count}
+            for (leaf, action), count in self.branches.items()
+        ]
+        branches.sort(key=lambda branch: branch['count'], reverse=True)
+
+        return {'nodes': nodes, 'branches': branches, 'errors': dict(self.errors)}
+
+    def print_report(self, top=20):
+        """打印耗时最多的节点和最常见的叶子分支"""
+        report = self.report()
+        print(f"{'决策节点':<40} {'调用':>8} {'累计(ms)':>10} {'自身(ms)':>10}")
+        for node in report['nodes'][:top]:
+            print(f"{node['name']:<40} {node['calls']:>8} "
+                  f"{node['cumulative'] * 1e3:>10.2f} {node['self'] * 1e3:>10.2f}")
+
+        total = sum(branch['count'] for branch in report['branches']) or 1
+        print(f"\n{'叶子分支':<50} {'次数':>8} {'占比':>7}")
+        for branch in report['branches'][:top]:
+            label = f"{branch['leaf']} -> {branch['action']}"
+            print(f"{label:<50} {branch['count']:>8} {branch['count'] / total:>7.1%}")
+
+        if report['errors']:
+            print(f"\n决策异常: {report['errors']}")
+
+    def export_collapsed(self, path):
+        """导出折叠栈格式（每行 '根;子;叶 自身耗时微秒'），用于生成火焰图"""
+        with open(path, 'w') as f:
+            for stack, self_time in sorted(self.stacks.items()):
+                microseconds = int(round(self_time * 1e6))
+                if microseconds > 0:
+                    f.write(f"{stack} {microseconds}\n")
+
+
+def decision_node(func):
+    """标记决策树节点：剖析开启时记录耗时和分支，关闭时直接调用原函数"""
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not profiler.enabled:
+            return func(*args, **kwargs)
+        return profiler.call(name, func, args, kwargs)
+
+    return wrapper
+
+
+# 创建全局剖析器实例
+profiler = DecisionProfiler()
@@ -0,0 +1,171 @@
+"""
+空间/控球权网格 - 每步一次性在整个场地的规则网格上计算空间和控球权，
+角色逻辑通过 O(1) 的格子查询和双线性插值给候选点打分
+"""
+
+import numpy as np
+
+from src.gfootball_agent.config import Field
+from src.utils.step_context import as_step_context
+
+# 网格分辨率（x 方向列数，y 方向行数）
+GRID_COLUMNS = 64
+GRID_ROWS = 28
+
+# 控球权模型参数：球员先按当前速度惯性移动 REACTION_STEPS 步，再以 PLAYER_MAX_SPEED 直线跑向格子
+PLAYER_MAX_SPEED = 0.012
+REACTION_STEPS = 3
+# 到达时间差（步）的温度，越小控球权越接近 0/1
+CONTROL_TEMPERATURE = 4.0
+
+# 查询点不超过该数量时走标量插值
+SCALAR_QUERY_LIMIT = 2
+
+
+class SpaceGrid:
+    """
+    一步内的场地网格
+
+    两个图层都在格子中心采样，形状为 (GRID_ROWS, GRID_COLUMNS)：
+        space:   格子中心到最近对手的距离
+        control: 我方控球权 [0,1]，由双方最快到达时间之差经 logistic 得到
+    图层在第一次查询时才计算。场外的点按最近的场地边缘取值。
+    """
+
+    def __init__(self, ctx, columns=GRID_COLUMNS, rows=GRID_ROWS):
+        self.ctx = ctx
+        self.columns = columns
+        self.rows = rows
+        self.cell_width = (Field.RIGHT_BOUNDARY - Field.LEFT_BOUNDARY) / columns
+        self.cell_height = (Field.BOTTOM_BOUNDARY - Field.TOP_BOUNDARY) / rows
+
+        self.x = Field.LEFT_BOUNDARY + (np.arange(columns) + 0.5) * self.cell_width
+        self.y = Field.TOP_BOUNDARY + (np.arange(rows) + 0.5) * self.cell_height
+
+        self._space = None
+        self._control = None
+        self._layer_rows = {}
+
+    # ===================== 图层 =====================
+
+    @property
+    def space(self):
+        """格子中心到最近对手的距离"""
+        if self._space is None:
+            self._space = self._nearest_distance(self.ctx.right_team)
+        return self._space
+
+    @property
+    def control(self):
+        """我方控球权"""
+        if self._control is None:
+            obs = self.ctx.obs
+            team_time = self._arrival_time(self.ctx.left_team, obs.get('left_team_direction'),
+                                           self.ctx.left_team_active)
+            opponent_time = self._arrival_time(self.ctx.right_team, obs.get('right_team_direction'),
+                                               obs.get('right_team_active'))
+            advantage = (opponent_time - team_time) / CONTROL_TEMPERATURE
+            self._control = 1.0 / (1.0 + np.exp(-np.clip(advantage, -50.0, 50.0)))
+        return self._control
+
+    def _nearest_distance(self, positions):
+        # 距离平方按坐标轴可分离：(P,rows,1) + (P,1,columns)，只对最小值开方
+        positions = np.asarray(positions, dtype=float)
+        dx = self.x[None, :] - positions[:, 0, None]
+        dy = self.y[None, :] - positions[:, 1, None]
+        squared = (dy * dy)[:, :, None] + (dx * dx)[:, None, :]
+        return np.sqrt(squared.min(axis=0))
+
+    def _arrival_time(self, positions, directions, active):
+        """每个格子被该队最快到达的步数"""
+        positions = np.asarray(positions, dtype=float)[:, :2]
+        if directions is not None:
+            positions = positions + np.asarray(directions, dtype=float)[:, :2] * REACTION_STEPS
+        if active is not None:
+            positions = positions[np.asarray(active, dtype=bool)]
+        if len(positions) == 0:
+            return np.full((self.rows, self.columns), np.inf)
+        return REACTION_STEPS + self._nearest_distance(positions) / PLAYER_MAX_SPEED
+
+    # ===================== 查询 =====================
+
+    def cell_of(self, point):
+        """点所在的格子 (row, column)"""
+        column = int((point[0] - Field.LEFT_BOUNDARY) / self.cell_width)
+        row = int((point[1] - Field.TOP_BOUNDARY) / self.cell_height)
+        return min(max(row, 0), self.rows - 1), min(max(column, 0), self.columns - 1)
+
+    def sample(self, layer, points):
+        """
+        在格子中心之间双线性插值
+
+        参数:
+            layer: (rows, columns) 图层
+            points: (K,2) 查询点
+
+        返回:
+            values: (K,)
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        if len(points) <= SCALAR_QUERY_LIMIT:
+            # 少量点时逐点插值比数组运算的固定开销更小
+            return np.array([self.sample_point(layer, x, y) for x, y in points.tolist()])
+
+        u = ((points[:, 0] - Field.LEFT_BOUNDARY) / self.cell_width - 0.5).clip(0, self.columns - 1)
+        v = ((points[:, 1] - Field.TOP_BOUNDARY) / self.cell_height - 0.5).clip(0, self.rows - 1)
+        column = np.minimum(u.astype(np.intp), self.columns - 2)
+        row = np.minimum(v.astype(np.intp), self.rows - 2)
+        fu = u - column
+        fv = v - row
+
+        index = row * self.columns + column
+        flat = layer.ravel()
+        top = flat[index] + (flat[index + 1] - flat[index]) * fu
+        bottom = flat[index + self.columns] + (flat[index + self.columns + 1] - flat[index + self.columns]) * fu
+        return top + (bottom - top) * fv
+
+    def sample_point(self, layer, x, y):
+        """单点双线性插值（标量版本）"""
+        rows = self._rows_of(layer)
+        u = min(max((x - Field.LEFT_BOUNDARY) / self.cell_width - 0.5, 0.0), self.columns - 1)
+        v = min(max((y - Field.TOP_BOUNDARY) / self.cell_height - 0.5, 0.0), self.rows - 1)
+        column = min(int(u), self.columns - 2)
+        row = min(int(v), self.rows - 2)
+        fu = u - column
+        fv = v - row
+
+        upper = rows[row]
+        lower = rows[row + 1]
+        top = upper[column] + (upper[column + 1] - upper[column]) * fu
+        bottom = lower[column] + (lower[column + 1] - lower[column]) * fu
+        return top + (bottom - top) * fv
+
+    def _rows_of(self, layer):
+        """图层的嵌套列表形式（标量查询用，按图层缓存）"""
+        rows = self._layer_rows.get(id(layer))
+        if rows is None:
+            rows = layer.tolist()
+            self._layer_rows[id(layer)] = rows
+        return rows
+
+    def space_at(self, points):
+        """候选点到最近对手的距离（插值），返回 (K,)"""
+        return self.sample(self.space, points)
+
+    def space_at_point(self, point):
+        """单个点到最近对手的距离（插值）"""
+        return self.sample_point(self.space, point[0], point[1])
+
+    def control_at(self, points):
+        """候选点的我方控球权（插值），返回 (K,)"""
+        return self.sample(self.control, points)
+
+
+def get_space_grid(obs):
+    """获取本步的空间网格（每步只构建一次）"""
+    ctx = as_step_context(obs)
+    grid = ctx.cache.get('space_grid')
+    if grid is None:
+        grid = SpaceGrid(ctx)
+        ctx.cache['space_grid'] = grid
+    return grid
@@ -0,0 +1,180 @@
+"""
+均匀网格空间索引 - 每步把双方 22 名球员和球放进边长固定的格子，
+供锥形内和矩形内的查询使用
+
+查询只访问与查询范围相交的格子，候选数量随场上人数增加而基本不变。
+最近球员、到球距离等逐球员查询由 StepContext 的距离矩阵直接给出，不经过本索引。
+"""
+
+import math
+
+from src.utils.step_context import as_step_context
+
+# 实体类别
+LEFT_TEAM = 0
+RIGHT_TEAM = 1
+BALL = 2
+
+# 格子边长
+CELL_SIZE = 0.1
+
+
+class SpatialIndex:
+    """
+    一步内的空间索引
+
+    所有查询都支持以下过滤参数：
+        team: LEFT_TEAM / RIGHT_TEAM / BALL，None 表示双方所有球员（不含球）
+        roles: 只保留这些角色的球员
+        active_only: 只保留场上活跃的球员
+        exclude: 要排除的队内球员索引
+
+    查询结果为 (team, index, distance) 列表，index 为队内索引，
+    distance 为到查询点的距离（矩形查询为 None）。
+    """
+
+    def __init__(self, ctx, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        obs = ctx.obs
+
+        positions = ctx.left_team[:, :2].tolist() + ctx.right_team[:, :2].tolist()
+        positions.append(ctx.ball_position[:2].tolist())
+        self.positions = positions
+
+        self.num_left = ctx.num_left
+        self.teams = [LEFT_TEAM] * ctx.num_left + [RIGHT_TEAM] * ctx.num_right + [BALL]
+        self.indices = list(range(ctx.num_left)) + list(range(ctx.num_right)) + [0]
+
+        right_roles = obs.get('right_team_roles')
+        if right_roles is None:
+            right_roles = [None] * ctx.num_right
+        self.roles = list(ctx.left_team_roles.tolist()) + list(right_roles) + [None]
+
+        right_active = obs.get('right_team_active')
+        if right_active is None:
+            right_active = [True] * ctx.num_right
+        self.active = [bool(a) for a in ctx.left_team_active] + [bool(a) for a in right_active] + [True]
+
+        # 格子 -> 实体编号列表（按编号升序）
+        self.cells = {}
+        for entity, (x, y) in enumerate(positions):
+            self.cells.setdefault(self._cell(x, y), []).append(entity)
+        columns = [cell[0] for cell in self.cells]
+        rows = [cell[1] for cell in self.cells]
+        self._bounds = (min(columns), max(columns), min(rows), max(rows))
+
+    def _cell(self, x, y):
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    # ===================== 过滤 =====================
+
+    def _filter(self, team, roles, active_only, exclude):
+        """返回实体过滤函数"""
+        roles = None if roles is None else set(roles)
+        exclude = set(exclude) if exclude else None
+        teams, indices, entity_roles, active = self.teams, self.indices, self.roles, self.active
+
+        def accept(entity):
+            entity_team = teams[entity]
+            if team is None:
+                if entity_team == BALL:
+                    return False
+            elif entity_team != team:
+                return False
+            if roles is not None and entity_roles[entity] not in roles:
+                return False
+            if active_only and not active[entity]:
+                return False
+            if exclude is not None and indices[entity] in exclude:
+                return False
+            return True
+
+        return accept
+
+    def _entities_in_box(self, x_min, x_max, y_min, y_max):
+        """与包围盒相交的格子中的实体"""
+        column_min, column_max, row_min, row_max = self._bounds
+        # 先把包围盒裁剪到有实体的格子范围（也允许无穷大的边界）
+        low_x, high_x = column_min * self.cell_size, (column_max + 1) * self.cell_size
+        low_y, high_y = row_min * self.cell_size, (row_max + 1) * self.cell_size
+        first_column, first_row = self._cell(min(max(x_min, low_x), high_x), min(max(y_min, low_y), high_y))
+        last_column, last_row = self._cell(min(max(x_max, low_x), high_x), min(max(y_max, low_y), high_y))
+        entities = []
+        for column in range(max(first_column, column_min), min(last_column, column_max) + 1):
+            for row in range(max(first_row, row_min), min(last_row, row_max) + 1):
+                entities.extend(self.cells.get((column, row), ()))
+        return entities
+
+    def _distance(self, entity, point):
+        x, y = self.positions[entity]
+        dx = x - point[0]
+        dy = y - point[1]
+        return math.sqrt(dx * dx + dy * dy)
+
+    def _result(self, entity, distance):
+        return self.teams[entity], self.indices[entity], distance
+
+    def _in_radius(self, point, radius, team, roles, active_only, exclude):
+        """到 point 的距离小于 radius 的实体，按距离从近到远排列（锥形查询的候选）"""
+        accept = self._filter(team, roles, active_only, exclude)
+        found = []
+        for entity in self._entities_in_box(point[0] - radius, point[0] + radius,
+                                            point[1] - radius, point[1] + radius):
+            if accept(entity):
+                distance = self._distance(entity, point)
+                if distance < radius:
+                    found.append((distance, entity))
+        found.sort()
+        return [self._result(entity, distance) for distance, entity in found]
+
+    # ===================== 查询 =====================
+
+    def in_cone(self, origin, direction, half_angle, radius, team=None, roles=None,
+                active_only=False, exclude=None):
+        """
+        以 origin 为顶点、沿 direction 张开 half_angle（弧度）的锥形内、
+        距离小于 radius 的实体，按距离从近到远排列（与 origin 重合的实体不计入）
+        """
+        norm = math.hypot(direction[0], direction[1])
+        if norm == 0:
+            return []
+        unit_x = direction[0] / norm
+        unit_y = direction[1] / norm
+        cos_half = math.cos(half_angle)
+
+        found = []
+        for entity_team, index, distance in self._in_radius(origin, radius, team, roles, active_only, exclude):
+            if distance == 0:
+                continue
+            x, y = self.position(entity_team, index)
+            dot = (x - origin[0]) / distance * unit_x + (y - origin[1]) / distance * unit_y
+            if dot > cos_half:
+                found.append((entity_team, index, distance))
+        return found
+
+    def in_rect(self, x_min, x_max, y_min, y_max, team=None, roles=None, active_only=False, exclude=None):
+        """位于开矩形 (x_min, x_max) × (y_min, y_max) 内的实体，按编号排列"""
+        accept = self._filter(team, roles, active_only, exclude)
+        found = []
+        for entity in sorted(self._entities_in_box(x_min, x_max, y_min, y_max)):
+            x, y = self.positions[entity]
+            if x_min < x < x_max and y_min < y < y_max and accept(entity):
+                found.append(self._result(entity, None))
+        return found
+
+    def position(self, team, index):
+        """实体位置"""
+        if team == BALL:
+            return self.positions[-1]
+        offset = 0 if team == LEFT_TEAM else self.num_left
+        return self.positions[offset + index]
+
+
+def get_spatial_index(obs):
+    """获取本步的空间索引（每步只构建一次）"""
+    ctx = as_step_context(obs)
+    index = ctx.cache.get('spatial_index')
+    if index is None:
+        index = SpatialIndex(ctx)
+        ctx.cache['spatial_index'] = index
+    return index
@@ -0,0 +1,342 @@
+"""
+每步共享特征上下文 - 每个决策步只从观测构建一次，供所有球员的决策共用
+"""
+
+import numpy as np
+
+from src.utils.geometry import (
+    distances_from, min_distances, nearest_index, pairwise_distances
+)
+
+
+# 按需计算的字段：字段名 -> (同时算出的字段名, 计算函数)
+_LAZY_FIELDS = {}
+
+
+def _lazy(*names):
+    """注册按需计算的字段：第一次访问时调用，结果写入同名槽位，之后直接读取"""
+    def register(func):
+        for name in names:
+            _LAZY_FIELDS[name] = (names, func)
+        return func
+    return register
+
+
+# ===================== 球 =====================
+
+@_lazy('ball_position')
+def _ball_position(ctx):
+    return np.asarray(ctx.obs['ball'][:2], dtype=float)
+
+
+@_lazy('ball_direction')
+def _ball_direction(ctx):
+    return np.asarray(ctx.obs['ball_direction'][:2], dtype=float)
+
+
+@_lazy('ball_owned_team')
+def _ball_owned_team(ctx):
+    return ctx.obs['ball_owned_team']
+
+
+@_lazy('ball_owned_player')
+def _ball_owned_player(ctx):
+    return ctx.obs['ball_owned_player']
+
+
+@_lazy('ball_info')
+def _ball_info(ctx):
+    return {
+        'position': ctx.ball_position,
+        'direction': ctx.ball_direction,
+        'owned_team': ctx.ball_owned_team,
+        'owned_player': ctx.ball_owned_player
+    }
+
+
+@_lazy('game_mode')
+def _game_mode(ctx):
+    return ctx.obs['game_mode']
+
+
+# ===================== 双方球员 =====================
+
+@_lazy('left_team')
+def _left_team(ctx):
+    return np.ascontiguousarray(ctx.obs['left_team'], dtype=float)
+
+
+@_lazy('right_team')
+def _right_team(ctx):
+    return np.ascontiguousarray(ctx.obs['right_team'], dtype=float)
+
+
+@_lazy('left_team_direction')
+def _left_team_direction(ctx):
+    return np.ascontiguousarray(ctx.obs['left_team_direction'], dtype=float)
+
+
+@_lazy('left_team_tired_factor')
+def _left_team_tired_factor(ctx):
+    return np.ascontiguousarray(ctx.obs['left_team_tired_factor'], dtype=float)
+
+
+@_lazy('left_team_roles')
+def _left_team_roles(ctx):
+    return np.asarray(ctx.obs['left_team_roles'])
+
+
+@_lazy('left_team_active')
+def _left_team_active(ctx):
+    return np.asarray(ctx.obs['left_team_active'], dtype=bool)
+
+
+@_lazy('num_left')
+def _num_left(ctx):
+    return len(ctx.left_team)
+
+
+@_lazy('num_right')
+def _num_right(ctx):
+    return len(ctx.right_team)
+
+
+@_lazy('sticky_actions')
+def _sticky_actions(ctx):
+    # 每名球员自己的粘性动作（不足时沿用第一名球员的观测）
+    sticky_rows = [player_obs['sticky_actions'] for player_obs in ctx.obs_list]
+    sticky_rows += [sticky_rows[0]] * (ctx.num_left - len(sticky_rows))
+    return np.asarray(sticky_rows)
+
+
+# ===================== 距离 =====================
+
+@_lazy('all_positions', 'distance_matrix')
+def _distance_matrix(ctx):
+    # 前 num_left 行/列为我方，其余为对方
+    all_positions = np.concatenate([ctx.left_team, ctx.right_team])
+    return all_positions, pairwise_distances(all_positions)
+
+
+@_lazy('ball_distances')
+def _ball_distances(ctx):
+    return distances_from(ctx.ball_position, ctx.left_team)
+
+
+@_lazy('nearest_opponent_index', 'nearest_opponent_distance')
+def _nearest_opponent(ctx):
+    return nearest_index(ctx.opponent_distances)
+
+
+@_lazy('nearest_teammate_index', 'nearest_teammate_distance')
+def _nearest_teammate(ctx):
+    # 排除自己
+    return nearest_index(ctx.team_distances, exclude_mask=np.eye(ctx.num_left, dtype=bool))
+
+
+@_lazy('team_distances')
+def _team_distances(ctx):
+    return ctx.distance_matrix[:ctx.num_left, :ctx.num_left]
+
+
+@_lazy('opponent_distances')
+def _opponent_distances(ctx):
+    return ctx.distance_matrix[:ctx.num_left, ctx.num_left:]
+
+
+class StepContext:
+    """
+    每步特征上下文（按需计算的观测视图）
+
+    包装 obs_list[0]，全队共享的球状态、双方位置数组、22x22 距离矩阵、
+    每名球员的最近对手/队友等字段都在第一次访问时才计算，
+    每个字段每步最多转换/计算一次，之后作为普通槽位读取。
+    粘性动作是按球员区分的字段，从每名球员自己的观测中收集。
+
+    支持 obs['key'] 形式的下标访问（转发到原始观测），
+    因此可以直接替代原始观测字典传入决策函数。
+    """
+
+    __slots__ = ('obs', 'obs_list', 'cache', 'role_registry', '_player_infos') + tuple(_LAZY_FIELDS)
+
+    def __init__(self, obs_list, features=None):
+        """
+        参数:
+            obs_list: 观测数据列表（每个元素对应一个球员），或单个观测字典
+            features: 批量预先计算好的本场特征（见 compute_batch_features），
+                      None 时按需从观测计算
+        """
+        if isinstance(obs_list, dict):
+            obs_list = [obs_list]
+        self.obs_list = obs_list
+        self.obs = obs_list[0]
+
+        # 本步内的派生特征缓存（如最佳传球目标）
+        self.cache = {}
+
+        # 按局维护的角色索引表，由 FootballAgent 挂载（见 role_registry）
+        self.role_registry = None
+
+        self._player_infos = {}
+
+        if features is not None:
+            for name, value in features.items():
+                setattr(self, name, value)
+
+    def __getattr__(self, name):
+        # 只有槽位尚未赋值时才会调用：计算字段并写入槽位
+        lazy = _LAZY_FIELDS.get(name)
+        if lazy is None:
+            raise AttributeError(f"'StepContext' object has no attribute '{name}'")
+        names, compute = lazy
+        values = compute(self)
+        if len(names) == 1:
+            values = (values,)
+        for field, value in zip(names, values):
+            setattr(self, field, value)
+        return values[names.index(name)]
+
+    def __getitem__(self, key):
+        return self.obs[key]
+
+    def __contains__(self, key):
+        return key in self.obs
+
+    def get(self, key, default=None):
+        return self.obs.get(key, default)
+
+    def player_info(self, player_index):
+        """球员的位置、方向、角色等信息（本步内缓存，勿原地修改）"""
+        info = self._player_infos.get(player_index)
+        if info is None:
+            info = {
+                'position': self.left_team[player_index],
+                'direction': self.left_team_direction[player_index],
+                'role': self.left_team_roles[player_index],
+                'tired_factor': self.left_team_tired_factor[player_index],
+                'active': self.left_team_active[player_index]
+            }
+            self._player_infos[player_index] = info
+        return info
+
+    def role_mask(self, roles):
+        """返回我方球员角色是否属于给定角色组的布尔数组（本步内缓存，勿原地修改）"""
+        if self.role_registry is not None:
+            return self.role_registry.mask(roles)
+        key = ('role_mask', tuple(roles))
+        mask = self.cache.get(key)
+        if mask is None:
+            mask = np.zeros(len(self.left_team_roles), dtype=bool)
+            for role in roles:
+                mask |= self.left_team_roles == role
+            self.cache[key] = mask
+        return mask
+
+    def opponent_distances_from(self, position):
+        """计算任意位置到所有对手的距离"""
+        return distances_from(position, self.right_team)
+
+    def min_opponent_distances(self, points):
+        """计算每个候选点到最近对手的距离，返回 (K,)"""
+        return min_distances(points, self.right_team)
+
+
+def as_step_context(obs):
+    """将原始观测转换为 StepContext，已经是 StepContext 时直接返回"""
+    if isinstance(obs, StepContext):
+        return obs
+    return StepContext(obs)
+
+
+# 堆叠时不需要的按球员字段（粘性动作单独堆叠）和图像
+_UNSTACKED_KEYS = ('active', 'designated', 'sticky_actions', 'frame')
+
+
+def stack_observations(obs_batch):
+    """
+    将 B 场比赛的观测列表堆叠为数组字典
+
+    共享字段取每场比赛第一名球员的观测，形状为 (B, ...)，
+    如 left_team 为 (B,11,2)、ball_owned_team 为 (B,)；
+    sticky_actions 为 (B,11,10)，不足 11 名球员时沿用第一名球员的观测。
+    """
+    first = [obs_list[0] for obs_list in obs_batch]
+    stacked = {
+        key: np.stack([np.asarray(obs[key]) for obs in first])
+        for key in first[0] if key not in _UNSTACKED_KEYS
+    }
+
+    num_left = stacked['left_team'].shape[1]
+    sticky = []
+    for obs_list in obs_batch:
+        rows = [player_obs['sticky_actions'] for player_obs in obs_list[:num_left]]
+        rows += [rows[0]] * (num_left - len(rows))
+        sticky.append(rows)
+    stacked['sticky_actions'] = np.asarray(sticky)
+    return stacked
+
+
+def match_observation(stacked, match_index):
+    """从堆叠的观测中取出一场比赛的共享观测字典（数组视图，不复制）"""
+    return {key: value[match_index] for key, value in stacked.items()}
+
+
+def compute_batch_features(stacked):
+    """
+    一次性计算 B 场比赛的几何特征
+
+    返回:
+        features: 长度为 B 的列表，每个元素是一场比赛的特征字典，
+                  可直接传给 StepContext(obs, features=...)
+    """
+    left_team = np.asarray(stacked['left_team'], dtype=float)[..., :2]
+    right_team = np.asarray(stacked['right_team'], dtype=float)[..., :2]
+    num_left = left_team.shape[1]
+
+    # (B,22,22) 距离矩阵
+    all_positions = np.concatenate([left_team, right_team], axis=1)
+    diff = all_positions[:, :, None, :] - all_positions[:, None, :, :]
+    distance_matrix = np.sqrt((diff * diff).sum(axis=-1))
+
+    # (B,11) 我方球员到球的距离
+    ball = np.asarray(stacked['ball'], dtype=float)[:, None, :2]
+    ball_diff = left_team - ball
+    ball_distances = np.sqrt((ball_diff * ball_diff).sum(axis=-1))
+
+    # (B,11) 最近对手/队友
+    opponent_distances = distance_matrix[:, :num_left, num_left:]
+    nearest_opponent_index = opponent_distances.argmin(axis=-1)
+    nearest_opponent_distance = np.take_along_axis(
+        opponent_distances, nearest_opponent_index[..., None], axis=-1)[..., 0]
+    nearest_opponent_index = np.where(np.isinf(nearest_opponent_distance), -1, nearest_opponent_index)
+
+    team_distances = np.where(np.eye(num_left, dtype=bool), np.inf,
+                              distance_matrix[:, :num_left, :num_left])
+    nearest_teammate_index = team_distances.argmin(axis=-1)
+    nearest_teammate_distance = np.take_along_axis(
+        team_distances, nearest_teammate_index[..., None], axis=-1)[..., 0]
+    nearest_teammate_index = np.where(np.isinf(nearest_teammate_distance), -1, nearest_teammate_index)
+
+    sticky_actions = np.asarray(stacked['sticky_actions'])
+    return [
+        {
+            'sticky_actions': sticky_actions[b],
+            'all_positions': all_positions[b],
+            'distance_matrix': distance_matrix[b],
+            'ball_distances': ball_distances[b],
+            'nearest_opponent_index': nearest_opponent_index[b],
+            'nearest_opponent_distance': nearest_opponent_distance[b],
+            'nearest_teammate_index': nearest_teammate_index[b],
+            'nearest_teammate_distance': nearest_teammate_distance[b],
+        }
+        for b in range(len(distance_matrix))
+    ]
+
+
+def build_step_contexts(stacked):
+    """为堆叠观测中的每场比赛构建 StepContext，几何特征批量计算"""
+    features = compute_batch_features(stacked)
+    return [
+        StepContext(match_observation(stacked, b), features=features[b])
+        for b in range(len(features))
+    ]